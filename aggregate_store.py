@@ -0,0 +1,637 @@
+"""
+Partitioned monthly aggregate store with incremental ingestion.
+
+`monthly_aggregates.csv` is split once into one Parquet file per YearMonth,
+indexed by a manifest that records each partition's file and content digest:
+
+    python aggregate_store.py init monthly_aggregates.csv
+
+After that, a new month (or a late correction) is ingested as a delta, and
+only the months present in the delta are rewritten:
+
+    python aggregate_store.py ingest orders_2025-01.csv
+
+A delta is either order-level (websales export columns, see
+orders_backend.ORDER_COLUMNS) or already aggregated (monthly_aggregates.csv
+columns). Each YearMonth in a delta replaces that month as a whole. An
+order-level delta also replaces the month in orders_parquet/ (when present)
+and appends new members to the dim_*.csv tables. It also refreshes the
+yearly coverage tables from per-month counters. Rows without a valid date
+(order_date, or YearMonth in an aggregated delta) belong to no month; they
+are left out, counted in the summary and reported with a warning.
+
+Coverage counters (COVERAGE_COUNTERS: orders with a Customer_ID, coupon
+orders with a code) are stored per cell next to the measures, so the cube
+sums them for any filter selection like any other additive measure.
+
+Readers (`AggregateStore`) poll the manifest. They reload only the
+partitions whose digest changed and splice them into the existing cube, so
+running dashboards pick up a new version without a full reload.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import re
+import threading
+import warnings
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import data_store
+from cube import Cube
+from orders_backend import ORDERS_DIR_NAME, OrderStore, open_order_csv, replace_months
+
+AGGREGATES_DIR_NAME = "aggregates_parquet"
+MANIFEST_NAME = "manifest.json"
+
+# The store holds the same rows (and typing) as this dataset.
+MONTHLY_NAME = "monthly_aggregates.csv"
+
+MONTHLY_KEYS = ["YearMonth", "Company", "Brands", "shop", "shipping_country", "has_coupon", "campaign_type_clean"]
+
+MONTHLY_MEASURES = [
+    "orders",
+    "net_revenue_gbp",
+    "order_total_gbp",
+    "refund_gbp",
+    "avg_discount_rate",
+    "aov_gbp",
+    "refund_rate",
+]
+
+# Extra additive columns kept when a month is aggregated from order-level data.
+COVERAGE_COUNTERS = ["orders_with_customer_id", "orders_has_coupon_with_code"]
+
+# Per-month coverage entry in the manifest (summed into the yearly tables).
+COVERAGE_FIELDS = ["orders_total", "orders_has_coupon", *COVERAGE_COUNTERS]
+
+CUSTOMER_COVERAGE_CSV = "customer_id_coverage_by_year.csv"
+COUPON_COVERAGE_CSV = "coupon_code_coverage_by_year.csv"
+
+# dim table -> column of the order data it lists.
+DIM_TABLES = data_store.DIM_TABLES
+
+DIM_DATE = "dim_date.csv"
+
+
+# ============================================================
+# Files
+# ============================================================
+def _write_atomic(path: Path, write) -> None:
+    tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+    write(tmp)
+    os.replace(tmp, path)
+
+
+def read_manifest(root: Path) -> dict:
+    path = Path(root) / MANIFEST_NAME
+    if not path.exists():
+        return {"version": 0, "partitions": {}, "retired": [], "coverage_baseline": {}, "baseline_months": []}
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def _write_manifest(root: Path, manifest: dict) -> None:
+    manifest["updated"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+    def write(tmp: Path) -> None:
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(manifest, fh, indent=1, sort_keys=True)
+
+    _write_atomic(Path(root) / MANIFEST_NAME, write)
+
+
+def _digest(frame: pd.DataFrame) -> str:
+    """Content digest of a partition (independent of the Parquet writer)."""
+    hashed = pd.util.hash_pandas_object(frame, index=False).to_numpy()
+    cols = ",".join(frame.columns).encode()
+    return hashlib.sha256(cols + hashed.tobytes()).hexdigest()
+
+
+def _write_partition(root: Path, ym: str, frame: pd.DataFrame) -> dict:
+    digest = _digest(frame)
+    rel = f"YearMonth={ym}/part-{digest[:16]}.parquet"
+    path = Path(root) / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    _write_atomic(path, lambda tmp: pq.write_table(table, tmp))
+    return {"file": rel, "rows": int(len(frame)), "digest": digest, "coverage": _month_coverage(frame)}
+
+
+def read_partition(root: Path, entry: dict) -> pd.DataFrame:
+    return pq.read_table(Path(root) / entry["file"]).to_pandas()
+
+
+# ============================================================
+# Aggregation
+# ============================================================
+def _not_blank(s: pd.Series) -> pd.Series:
+    return s.notna() & (s.astype("string").str.strip() != "")
+
+
+def aggregate_orders(orders: pd.DataFrame) -> pd.DataFrame:
+    """Order rows (one per order) -> monthly_aggregates rows plus COVERAGE_COUNTERS."""
+    need = ["YearMonth", "Order Total (GBP)", "Refund (GBP)", "net_revenue_gbp"]
+    missing = [c for c in need if c not in orders.columns]
+    if missing:
+        raise ValueError(f"Order delta is missing {missing}.")
+    keys = [k for k in MONTHLY_KEYS if k in orders.columns]
+    has_coupon = orders["has_coupon"].fillna(False).astype(bool) if "has_coupon" in orders.columns else False
+    src = orders[keys].assign(
+        orders=1,
+        net_revenue_gbp=orders["net_revenue_gbp"],
+        order_total_gbp=orders["Order Total (GBP)"],
+        refund_gbp=orders["Refund (GBP)"],
+        avg_discount_rate=orders.get("Discount_rate"),
+        orders_with_customer_id=_not_blank(orders["Customer_ID"]) if "Customer_ID" in orders.columns else False,
+        orders_has_coupon_with_code=(
+            has_coupon & _not_blank(orders["coupon_code"]) if "coupon_code" in orders.columns else False
+        ),
+    )
+    out = (
+        src.groupby(keys, observed=True, dropna=False, sort=True)
+        .agg(
+            orders=("orders", "sum"),
+            net_revenue_gbp=("net_revenue_gbp", "sum"),
+            order_total_gbp=("order_total_gbp", "sum"),
+            refund_gbp=("refund_gbp", "sum"),
+            avg_discount_rate=("avg_discount_rate", "mean"),
+            orders_with_customer_id=("orders_with_customer_id", "sum"),
+            orders_has_coupon_with_code=("orders_has_coupon_with_code", "sum"),
+        )
+        .reset_index()
+    )
+    out["aov_gbp"] = out["net_revenue_gbp"] / out["orders"]
+    out["refund_rate"] = out["refund_gbp"] / out["order_total_gbp"].where(out["order_total_gbp"] != 0)
+    return out[keys + MONTHLY_MEASURES + COVERAGE_COUNTERS]
+
+
+def _month_coverage(frame: pd.DataFrame) -> Optional[dict]:
+    """Coverage counters of one month partition, or None when it has no order-level counters."""
+    if not all(c in frame.columns for c in COVERAGE_COUNTERS):
+        return None
+    flag = frame["has_coupon"].astype(bool) if "has_coupon" in frame.columns else False
+    return {
+        "orders_total": int(frame["orders"].sum()),
+        "orders_has_coupon": int(frame["orders"].where(flag, 0).sum()),
+        **{c: int(frame[c].sum()) for c in COVERAGE_COUNTERS},
+    }
+
+
+def _order_store_counters(store: OrderStore) -> pd.DataFrame:
+    """Per-cell (MONTHLY_KEYS) coverage counters from the order partitions (one projected scan)."""
+    keys = [k for k in MONTHLY_KEYS if k in store.columns]
+    parts = []
+    for batch in store.scan(columns=keys + ["Customer_ID", "coupon_code"]):
+        b = batch.to_pandas()
+        flag = b["has_coupon"].fillna(False).astype(bool)
+        parts.append(
+            b[keys]
+            .assign(
+                has_coupon=flag,
+                orders_with_customer_id=_not_blank(b["Customer_ID"]).astype("int64"),
+                orders_has_coupon_with_code=(flag & _not_blank(b["coupon_code"])).astype("int64"),
+            )
+            .groupby(keys, dropna=False, observed=True)
+            .sum()
+        )
+    if not parts:
+        return pd.DataFrame(columns=keys + COVERAGE_COUNTERS)
+    return pd.concat(parts).groupby(level=keys, dropna=False).sum().reset_index()
+
+
+def _clean_keys(frame: pd.DataFrame) -> pd.DataFrame:
+    """MONTHLY_KEYS of `frame` with labels cleaned like orders_backend.clean_batch."""
+    keys = {}
+    for k in [k for k in MONTHLY_KEYS if k in frame.columns]:
+        if k == "has_coupon":
+            keys[k] = frame[k].fillna(False).astype(bool)
+            continue
+        s = frame[k].astype("string").str.strip()
+        if k == "campaign_type_clean":
+            s = s.str.replace(r"(?i)^no coupon$", "No campaign", regex=True)
+        keys[k] = s
+    return pd.DataFrame(keys, index=frame.index)
+
+
+def attach_counters(frame: pd.DataFrame, counters: pd.DataFrame) -> pd.DataFrame:
+    """
+    Add per-cell COVERAGE_COUNTERS to monthly rows. Cells the order data has
+    no rows for get 0; months it does not cover at all stay NaN (unknown).
+    """
+    keys = _clean_keys(frame)
+    on = list(keys.columns)
+    right = counters.astype({k: "string" for k in on if k != "has_coupon"})
+    vals = keys.merge(right, on=on, how="left")[COVERAGE_COUNTERS].fillna(0)
+    # Rows that only differ before cleaning share one cell; count it once.
+    vals[keys.duplicated().to_numpy()] = 0
+    known = keys["YearMonth"].isin(set(right["YearMonth"].dropna())).to_numpy()
+    return frame.assign(**{c: np.where(known, vals[c].to_numpy(), np.nan) for c in COVERAGE_COUNTERS})
+
+
+_MONTH_RE = r"^\d{4}-(0[1-9]|1[0-2])$"
+
+
+def _undated(frame: pd.DataFrame) -> pd.Series:
+    """Rows whose YearMonth (and order_date, for order rows) is missing or not a valid date."""
+    bad = ~frame["YearMonth"].astype("string").str.strip().str.fullmatch(_MONTH_RE).fillna(False)
+    if "order_date" in frame.columns:
+        bad |= pd.to_datetime(frame["order_date"], format="mixed", errors="coerce").isna()
+    return bad.astype(bool)
+
+
+def read_delta(path: Path) -> Tuple[pd.DataFrame, Optional[pd.DataFrame], int]:
+    """
+    Read a delta CSV. Returns (monthly rows, order rows, undated rows); order
+    rows are None when the delta is already aggregated. Undated rows are
+    dropped from both and only counted.
+    """
+    path = Path(path)
+    with open(path, newline="", encoding="utf-8") as fh:
+        header = next(csv.reader(fh))
+    if "order_date" not in header:
+        if not set(MONTHLY_KEYS[:1] + ["orders"]) <= set(header):
+            raise ValueError(f"{path.name} is neither an order export nor monthly aggregates.")
+        monthly = pd.read_csv(path, dtype={c: "object" for c in data_store.DIMENSIONS})
+        bad = _undated(monthly)
+        return monthly[~bad].reset_index(drop=True), None, int(bad.sum())
+    orders = pa.Table.from_batches(list(open_order_csv(path))).to_pandas()
+    bad = _undated(orders)
+    orders = orders[~bad].reset_index(drop=True)
+    return aggregate_orders(orders), orders, int(bad.sum())
+
+
+# ============================================================
+# Dims and coverage
+# ============================================================
+def _dim_key(value: str) -> str:
+    """Match dim members the way prepare_monthly cleans labels."""
+    return re.sub(r"(?i)^no coupon$", "No campaign", str(value).strip()).casefold()
+
+
+def update_dims(data_dir: Path, rows: pd.DataFrame) -> Dict[str, int]:
+    """Append members of `rows` (orders or monthly rows) missing from each dim_*.csv; returns {file: rows added}."""
+    added = {}
+    for name, col in DIM_TABLES.items():
+        path = Path(data_dir) / name
+        if col not in rows.columns or not path.exists():
+            continue
+        with open(path, newline="", encoding="utf-8") as fh:
+            known = {_dim_key(row[0]) for row in list(csv.reader(fh))[1:] if row}
+        values = rows[col].dropna().astype(str).str.strip()
+        new = sorted(v for v in values.unique() if v and _dim_key(v) not in known)
+        if new:
+            with open(path, "a", newline="", encoding="utf-8") as fh:
+                csv.writer(fh).writerows([v] for v in new)
+        added[name] = len(new)
+    return added
+
+
+def update_dim_date(data_dir: Path, last_day: pd.Timestamp) -> int:
+    """Extend dim_date.csv day by day up to `last_day`; returns rows added."""
+    path = Path(data_dir) / DIM_DATE
+    if not path.exists():
+        return 0
+    dates = pd.read_csv(path, usecols=["Date"])["Date"]
+    start = pd.Timestamp(dates.max()) + pd.Timedelta(days=1) if len(dates) else last_day.replace(day=1)
+    days = pd.date_range(start, last_day, freq="D")
+    if len(days) == 0:
+        return 0
+    rows = pd.DataFrame(
+        {
+            "Date": days.strftime("%Y-%m-%d"),
+            "Year": days.year,
+            "Quarter": [f"{d.year}Q{d.quarter}" for d in days],
+            "Month": days.month,
+            "MonthName": days.strftime("%b"),
+            "YearMonth": days.strftime("%Y-%m"),
+        }
+    )
+    rows.to_csv(path, mode="a", header=False, index=False)
+    return len(rows)
+
+
+def yearly_coverage(manifest: dict) -> Tuple[pd.DataFrame, Dict[str, List[str]]]:
+    """
+    Yearly coverage counters: the snapshot taken at init (baseline) plus the
+    counters of every month ingested since. Returns (counters by Year,
+    {year: months missing order-level counters}).
+    """
+    baseline_months = set(manifest.get("baseline_months", []))
+    totals: Dict[str, Dict[str, int]] = {
+        y: dict(v) for y, v in manifest.get("coverage_baseline", {}).items()
+    }
+    gaps: Dict[str, List[str]] = {}
+    for ym, entry in sorted(manifest["partitions"].items()):
+        if ym in baseline_months:
+            continue
+        year = ym[:4]
+        if entry.get("coverage") is None:
+            gaps.setdefault(year, []).append(ym)
+            continue
+        acc = totals.setdefault(year, {f: 0 for f in COVERAGE_FIELDS})
+        for f in COVERAGE_FIELDS:
+            acc[f] = acc.get(f, 0) + entry["coverage"][f]
+    frame = pd.DataFrame.from_dict(totals, orient="index", columns=COVERAGE_FIELDS).fillna(0).astype("int64")
+    frame.index = frame.index.astype(int)
+    return frame.sort_index().rename_axis("Year").reset_index(), gaps
+
+
+def write_coverage(data_dir: Path, manifest: dict) -> Dict[str, List[str]]:
+    """Rewrite the two yearly coverage CSVs from the manifest counters."""
+    cov, gaps = yearly_coverage(manifest)
+    pct = lambda num, den: (100.0 * cov[num] / cov[den].where(cov[den] != 0)).fillna(0.0)
+    customer = cov[["Year", "orders_total", "orders_with_customer_id"]].assign(
+        customer_id_coverage_pct=pct("orders_with_customer_id", "orders_total")
+    )
+    coupon = cov[["Year", "orders_total", "orders_has_coupon", "orders_has_coupon_with_code"]].assign(
+        coupon_code_coverage_pct=pct("orders_has_coupon_with_code", "orders_has_coupon")
+    )
+    for name, table in ((CUSTOMER_COVERAGE_CSV, customer), (COUPON_COVERAGE_CSV, coupon)):
+        _write_atomic(Path(data_dir) / name, lambda tmp, t=table: t.to_csv(tmp, index=False))
+    return gaps
+
+
+def _read_baseline(data_dir: Path) -> Dict[str, dict]:
+    """Yearly counters from the existing coverage CSVs (used when no order data is available)."""
+    cust_path, coup_path = Path(data_dir) / CUSTOMER_COVERAGE_CSV, Path(data_dir) / COUPON_COVERAGE_CSV
+    if not cust_path.exists() or not coup_path.exists():
+        return {}
+    cust = pd.read_csv(cust_path).set_index("Year")
+    coup = pd.read_csv(coup_path).set_index("Year")
+    both = cust[["orders_total", "orders_with_customer_id"]].join(
+        coup[["orders_has_coupon", "orders_has_coupon_with_code"]], how="inner"
+    )
+    return {str(y): {f: int(row[f]) for f in COVERAGE_FIELDS} for y, row in both.iterrows()}
+
+
+# ============================================================
+# Init / ingest
+# ============================================================
+def _typed(frame: pd.DataFrame) -> pd.DataFrame:
+    cols = [c for c in MONTHLY_KEYS + MONTHLY_MEASURES + COVERAGE_COUNTERS if c in frame.columns]
+    return data_store.typed_frame(frame[cols], MONTHLY_NAME)
+
+
+def _split_months(frame: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    ym = frame["YearMonth"].astype(str).str.strip()
+    out = {}
+    for m, part in frame.groupby(ym, sort=True):
+        part = part.reset_index(drop=True)
+        for col in part.columns:
+            if isinstance(part[col].dtype, pd.CategoricalDtype):
+                part[col] = part[col].cat.remove_unused_categories()
+        out[m] = part
+    return out
+
+
+def _commit(root: Path, manifest: dict, retired: List[str]) -> None:
+    """Publish the manifest, then drop files retired one version ago (readers may still hold those)."""
+    for rel in manifest.get("retired", []):
+        (Path(root) / rel).unlink(missing_ok=True)
+    manifest["retired"] = retired
+    manifest["version"] = int(manifest.get("version", 0)) + 1
+    _write_manifest(root, manifest)
+
+
+def init_store(csv_path: Path, root: Optional[Path] = None) -> dict:
+    """
+    Partition monthly_aggregates.csv into `root` (default: aggregates_parquet/
+    next to it). Per-cell coverage counters come from orders_parquet/ when it
+    exists; otherwise the yearly coverage CSVs are kept as the baseline.
+    """
+    csv_path = Path(csv_path)
+    data_dir = csv_path.parent
+    root = Path(root) if root is not None else data_dir / AGGREGATES_DIR_NAME
+    frame = _typed(pd.read_csv(csv_path, dtype={c: "object" for c in data_store.DIMENSIONS}))
+    orders = OrderStore.open(data_dir / ORDERS_DIR_NAME)
+    counters = _order_store_counters(orders) if orders is not None else None
+    if counters is not None and len(counters):
+        frame = attach_counters(frame, counters)
+    months = _split_months(frame)
+    for ym, part in months.items():
+        if COVERAGE_COUNTERS[0] not in part.columns:
+            continue
+        if part[COVERAGE_COUNTERS[0]].isna().all():
+            # Months the order data does not cover are stored without counters.
+            months[ym] = part.drop(columns=COVERAGE_COUNTERS)
+        else:
+            months[ym] = part.astype({c: "int64" for c in COVERAGE_COUNTERS})
+
+    manifest = read_manifest(root)
+    retired = [e["file"] for e in manifest["partitions"].values()]
+    manifest["partitions"] = {ym: _write_partition(root, ym, part) for ym, part in months.items()}
+    retired = [f for f in retired if f not in {e["file"] for e in manifest["partitions"].values()}]
+
+    if counters is not None and len(counters):
+        manifest["coverage_baseline"], manifest["baseline_months"] = {}, []
+    else:
+        manifest["coverage_baseline"], manifest["baseline_months"] = _read_baseline(data_dir), sorted(months)
+    _commit(root, manifest, retired)
+    return manifest
+
+
+def ingest(delta_path: Path, root: Optional[Path] = None, data_dir: Optional[Path] = None) -> dict:
+    """
+    Upsert the months of a delta CSV. Only the partitions of those months are
+    rewritten (and skipped when their content did not change). Returns a
+    summary of what was written.
+    """
+    delta_path = Path(delta_path)
+    data_dir = Path(data_dir) if data_dir is not None else Path(__file__).resolve().parent
+    root = Path(root) if root is not None else data_dir / AGGREGATES_DIR_NAME
+    if not (root / MANIFEST_NAME).exists():
+        raise FileNotFoundError(f"No aggregate store at {root}; run `init` first.")
+
+    monthly, orders, undated = read_delta(delta_path)
+    if undated:
+        warnings.warn(f"{delta_path.name}: {undated} rows without a valid date were not ingested.", stacklevel=2)
+    manifest = read_manifest(root)
+    baseline_months = set(manifest.get("baseline_months", []))
+    written, unchanged, retired = [], [], []
+    for ym, part in _split_months(_typed(monthly)).items():
+        old = manifest["partitions"].get(ym)
+        if old is not None and old["digest"] == _digest(part):
+            unchanged.append(ym)
+            continue
+        manifest["partitions"][ym] = _write_partition(root, ym, part)
+        if old is not None and old["file"] != manifest["partitions"][ym]["file"]:
+            retired.append(old["file"])
+        written.append(ym)
+        if ym in baseline_months and orders is not None:
+            warnings.warn(
+                f"{ym} predates per-month coverage counters; its year keeps the coverage snapshot.",
+                stacklevel=2,
+            )
+
+    summary = {
+        "written": written, "unchanged": unchanged, "orders_months": [], "dims": {}, "dim_date": 0, "undated": undated
+    }
+    if written:
+        _commit(root, manifest, retired)
+    summary["version"] = manifest["version"]
+
+    orders_root = data_dir / ORDERS_DIR_NAME
+    if orders is not None and written and OrderStore.open(orders_root) is not None:
+        delta = pa.Table.from_pandas(orders[orders["YearMonth"].astype(str).isin(written)], preserve_index=False)
+        summary["orders_months"] = replace_months(iter(delta.to_batches()), orders_root)
+    summary["dims"] = update_dims(data_dir, orders if orders is not None else monthly)
+    if orders is not None:
+        last_day = pd.to_datetime(orders["order_date"], errors="coerce").max()
+    else:
+        last_day = pd.to_datetime(monthly["YearMonth"].astype(str).max(), format="%Y-%m") + pd.offsets.MonthEnd(0)
+    if pd.notna(last_day):
+        summary["dim_date"] = update_dim_date(data_dir, last_day.normalize())
+    summary["coverage_gaps"] = write_coverage(data_dir, manifest)
+    return summary
+
+
+# ============================================================
+# Reader (hot-swap)
+# ============================================================
+def _align_categories(parts: List[pd.DataFrame], dims: Dict[str, pd.Index]) -> List[pd.DataFrame]:
+    """
+    Code the dimension columns of prepared frames against one category set
+    (dim members plus every label in use), so they concatenate as categoricals.
+    Only frames whose categories differ are re-coded.
+    """
+    parts = list(parts)
+    for col in data_store.DIMENSIONS:
+        have = [p for p in parts if col in p.columns]
+        if not have:
+            continue
+        labels = set(dims.get(col, pd.Index([])))
+        for p in have:
+            labels.update(p[col].cat.categories)
+        cats = pd.Index(sorted(labels))
+        for i, p in enumerate(parts):
+            if col in p.columns and not p[col].cat.categories.equals(cats):
+                parts[i] = p.assign(**{col: p[col].cat.set_categories(cats)})
+    return parts
+
+
+class AggregateStore:
+    """
+    Process-wide reader over the partitioned store. `snapshot()` returns the
+    current (version, prepared frame, cube). It costs a few stat() calls while
+    the manifest and dim tables are unchanged. After an ingest it prepares only
+    the partitions whose digest changed and splices them into the previous
+    frame and cube (`Cube.replace_months`). When the dim tables grow, the
+    categories of the frame and the cube are extended in place.
+
+    Snapshots are swapped atomically, and callers holding an older one keep
+    a consistent view.
+    """
+
+    def __init__(self, root: Path, data_dir: Optional[Path] = None):
+        self.root = Path(root)
+        # Folder with the dim_*.csv tables the snapshot frame is coded against.
+        self.data_dir = Path(data_dir) if data_dir is not None else self.root.parent
+        self._lock = threading.Lock()
+        self._stamp: Optional[tuple] = None
+        self._dims: Dict[str, pd.Index] = {}
+        # YearMonth -> digest of the partition in the current snapshot
+        self._digests: Dict[str, str] = {}
+        self._snapshot: Optional[Tuple[str, pd.DataFrame, Cube]] = None
+
+    @classmethod
+    def open(cls, root: Path) -> Optional["AggregateStore"]:
+        """AggregateStore for `root`, or None when no store was initialised."""
+        root = Path(root)
+        if not (root / MANIFEST_NAME).exists():
+            return None
+        return cls(root)
+
+    def _manifest_stamp(self) -> tuple:
+        st = (self.root / MANIFEST_NAME).stat()
+        dims = data_store.dim_paths(self.data_dir, data_store.DIMENSIONS)
+        return st.st_size, st.st_mtime_ns, "+".join(data_store.source_version(p) for _, p in sorted(dims.items()))
+
+    def _prepare(self, parts: dict, months: List[str]) -> List[pd.DataFrame]:
+        return [data_store.prepare_monthly(_typed(read_partition(self.root, parts[ym])), self._dims) for ym in months]
+
+    def snapshot(self) -> Tuple[str, pd.DataFrame, Cube]:
+        stamp = self._manifest_stamp()
+        with self._lock:
+            if self._snapshot is not None and stamp == self._stamp:
+                return self._snapshot
+            manifest = read_manifest(self.root)
+            parts = manifest["partitions"]
+            dims_changed = self._stamp is None or stamp[2] != self._stamp[2]
+            if dims_changed:
+                self._dims = data_store.load_dims(self.data_dir, data_store.DIMENSIONS)
+
+            if self._snapshot is None:
+                frame = pd.concat(_align_categories(self._prepare(parts, sorted(parts)), self._dims), ignore_index=True)
+                frame = frame.sort_values("ym_key", kind="stable", ignore_index=True)
+                cube = Cube.from_frame(frame)
+            else:
+                _, frame, cube = self._snapshot
+                changed = [ym for ym, e in parts.items() if self._digests.get(ym) != e["digest"]]
+                touched = changed + [ym for ym in self._digests if ym not in parts]
+                if touched:
+                    keep = frame[~frame["YearMonth"].astype(str).isin(touched)]
+                    keep, *fresh = _align_categories([keep, *self._prepare(parts, changed)], self._dims)
+                    rows = pd.concat(fresh, ignore_index=True) if fresh else keep.iloc[:0]
+                    frame = pd.concat([keep, rows], ignore_index=True).sort_values("ym_key", kind="stable", ignore_index=True)
+                    cube = cube.replace_months(rows, touched)
+                elif dims_changed:
+                    (frame,) = _align_categories([frame], self._dims)
+                if dims_changed:
+                    cells = cube.cells.assign(
+                        **{d: cube.cells[d].cat.set_categories(frame[d].cat.categories) for d in cube.dims if d in self._dims}
+                    )
+                    cube = Cube(cells)
+            self._digests = {ym: e["digest"] for ym, e in parts.items()}
+            dims_tag = hashlib.blake2b(stamp[2].encode(), digest_size=4).hexdigest()
+            self._snapshot = (f"agg-{manifest['version']}-{dims_tag}", frame, cube)
+            self._stamp = stamp
+            return self._snapshot
+
+    @property
+    def version(self) -> str:
+        return self.snapshot()[0]
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Partitioned monthly aggregate store.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    i = sub.add_parser("init", help="Partition monthly_aggregates.csv by YearMonth.")
+    i.add_argument("csv", type=Path)
+    i.add_argument("--out", type=Path, default=None)
+    g = sub.add_parser("ingest", help="Upsert the months of a delta CSV (order-level or monthly).")
+    g.add_argument("delta", type=Path)
+    g.add_argument("--data-dir", type=Path, default=None, help="Folder with the dashboard CSVs.")
+    g.add_argument("--out", type=Path, default=None)
+    args = ap.parse_args()
+
+    if args.cmd == "init":
+        manifest = init_store(args.csv, args.out)
+        print(f"{len(manifest['partitions'])} month partitions, version {manifest['version']}")
+    elif args.cmd == "ingest":
+        summary = ingest(args.delta, args.out, args.data_dir)
+        print(f"version {summary['version']}: wrote {summary['written'] or 'nothing'}", end="")
+        print(f", unchanged {summary['unchanged']}" if summary["unchanged"] else "")
+        if summary["undated"]:
+            print(f"skipped {summary['undated']} rows without a valid date")
+        if summary["orders_months"]:
+            print(f"order partitions replaced: {summary['orders_months']}")
+        added = {k: v for k, v in summary["dims"].items() if v}
+        if added or summary["dim_date"]:
+            print(f"dims extended: {added}, dim_date +{summary['dim_date']} days")
+        for year, months in summary.get("coverage_gaps", {}).items():
+            print(f"coverage {year} excludes {months} (ingested without order-level data)")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,9 +2,30 @@ import pandas as pd
 import numpy as np
 import streamlit as st
 import plotly.express as px
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional
 
+import data_store
+from charts import Density, FigureCache, add_forecast, density_figure, density_sample, template_name
+from aggregate_store import AGGREGATES_DIR_NAME, MANIFEST_NAME, AggregateStore
+from basket import BASKETS_NAME, BasketIndex, RuleIndex, filter_rules
+from cube import Cube, filter_key
+from dq_profiler import DQ_DIR_NAME, KEY_METRICS, DQProfile
+from dq_profiler import MANIFEST_NAME as DQ_MANIFEST_NAME
+from export import FORMATS, ExportCache, file_name
+from filter_engine import FilterIndex
+from forecast import HORIZON, LEVELS, MODELS as FORECAST_MODELS, Forecast
+from metrics import COVERAGE_RATIOS, RATIOS
+from orders_backend import ORDERS_DIR_NAME, OrderStore
+from rfm_pipeline import filter_rfm
+from table_view import PAGE_SIZE, OrderPager, TablePager
+from time_intel import ROLLING, MonthPrefix, quarter_map
+
+SCRIPT_STARTED = time.perf_counter()
+
 # ============================================================
 # Page configuration
 # ============================================================
@@ -22,6 +43,8 @@ st.set_page_config(
 # ============================================================
 with st.sidebar.expander("⚙️ Display settings", expanded=False):
     theme_mode = st.selectbox("Theme", ["Auto", "Light", "Dark"], index=0, key="ui_theme_mode")
+    # Lazy: only the selected view is loaded and computed; Tabs: every view runs on each rerun.
+    nav_mode = st.selectbox("Navigation", ["Lazy", "Tabs"], index=0, key="ui_nav_mode")
 
 def _css_tokens_light() -> str:
     return """
@@ -200,90 +223,146 @@ def get_is_dark(mode: str) -> bool:
 IS_DARK = get_is_dark(theme_mode)
 
 def style_fig(fig, title: Optional[str] = None):
-    """
-    Apply a clean, professional style that works across Plotly versions.
-    Fixes Plotly v6+ compatibility (title_font vs titlefont).
-    """
-    if IS_DARK:
-        template = "plotly_dark"
-        paper = "#0f172a"
-        plot = "#0f172a"
-        font = "#e5e7eb"
-        axis_line = "rgba(255,255,255,0.55)"
-        grid = "rgba(255,255,255,0.10)"
-    else:
-        template = "plotly_white"
-        paper = "white"
-        plot = "white"
-        font = "#111827"
-        axis_line = "rgba(0,0,0,0.55)"
-        grid = "rgba(0,0,0,0.10)"
-
+    """Apply the registered light/dark template (see charts.py) and the title."""
+    # The margin is set here as well because px writes its own top margin into the layout.
     fig.update_layout(
-        template=template,
-        paper_bgcolor=paper,
-        plot_bgcolor=plot,
+        template=template_name(IS_DARK),
+        title_text=title or "",
         margin=dict(l=12, r=12, t=46, b=12),
-        title=dict(text=title or "", x=0.01, xanchor="left", font=dict(color=font)),
-        font=dict(size=13, color=font),
-        legend=dict(title=None),
-    )
-
-    common_axis = dict(
-        showline=True,
-        linewidth=1.1,
-        linecolor=axis_line,
-        mirror=True,
-        ticks="outside",
-        ticklen=4,
-        tickwidth=1,
-        showgrid=True,
-        gridwidth=0.7,
-        gridcolor=grid,
-        tickfont=dict(color=font),
+        legend_title_text=None,
     )
+    return fig
 
-    # Plotly v6+ uses title_font; older uses titlefont
-    try:
-        fig.update_xaxes(**common_axis, title_font=dict(color=font))
-        fig.update_yaxes(**common_axis, title_font=dict(color=font))
-    except Exception:
-        fig.update_xaxes(**common_axis, titlefont=dict(color=font))
-        fig.update_yaxes(**common_axis, titlefont=dict(color=font))
+@st.cache_resource(show_spinner=False)
+def get_figure_cache() -> FigureCache:
+    # Per process, so sessions viewing the same selection share built figures.
+    return FigureCache()
 
-    return fig
+def show_chart(key: str, data, make, title: str) -> None:
+    """Draw chart `key` = style_fig(make(data), title), rebuilt only when data, title or theme change."""
+    fig = get_figure_cache().get(key, (data, title), IS_DARK, lambda: style_fig(make(data), title))
+    st.plotly_chart(fig, use_container_width=True, config=PLOTLY_CONFIG, key=key)
 
 # ============================================================
 # Paths + loaders
 # ============================================================
 BASE_DIR = Path(__file__).resolve().parent
 
-@st.cache_data(show_spinner=False)
-def read_csv_cached(name: str) -> pd.DataFrame:
-    return pd.read_csv(BASE_DIR / name)
+@st.cache_resource(show_spinner=False)
+def get_store() -> data_store.SharedStore:
+    # One store per process; its frames are memory-mapped, zero-copy and read-only.
+    return data_store.SharedStore(BASE_DIR)
+
+store = get_store()
+
+@st.cache_resource(show_spinner="Loading datasets…")
+def warm_up() -> pd.DataFrame:
+    # Once per process, before the first page renders: every dataset is parsed
+    # (or mapped from the cache) in parallel instead of on first use.
+    return store.warm()
+
+warm_report = warm_up()
 
 def load_optional(name: str) -> Optional[pd.DataFrame]:
-    p = BASE_DIR / name
-    if not p.exists():
-        return None
-    return read_csv_cached(name)
+    return store.frame(name)
 
 # ============================================================
 # Load core data
 # ============================================================
-df = load_optional("monthly_aggregates.csv")
-if df is None:
-    st.error("Không tìm thấy monthly_aggregates.csv trong cùng thư mục với app_streamlit_prototype.py")
-    st.stop()
+CORE_PATH = BASE_DIR / "monthly_aggregates.csv"
+AGG_ROOT = BASE_DIR / AGGREGATES_DIR_NAME
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def load_aggregate_store(initialised: bool) -> Optional[AggregateStore]:
+    return AggregateStore.open(AGG_ROOT)
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def load_cube(name: str, version: str) -> Cube:
+    return Cube.from_frame(store.frame(name, "prepared"))
+
+agg_store = load_aggregate_store((AGG_ROOT / MANIFEST_NAME).exists())
+if agg_store is not None:
+    # Partitioned store (aggregate_store.py): ingested months swap in on the next rerun.
+    DATA_VERSION, df, cube = agg_store.snapshot()
+else:
+    if not CORE_PATH.exists():
+        st.error("Không tìm thấy monthly_aggregates.csv trong cùng thư mục với app_streamlit_prototype.py")
+        st.stop()
+    # Covers the dim tables the prepared frame is coded against.
+    DATA_VERSION = store.version(CORE_PATH.name, "prepared")
+    df = store.frame(CORE_PATH.name, "prepared")
+    cube = load_cube(CORE_PATH.name, DATA_VERSION)
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def load_row_index(version: str, _df: pd.DataFrame) -> FilterIndex:
+    # Row-level index over the prepared frame, for exporting the filtered rows.
+    return FilterIndex(_df)
 
-if "campaign_type_clean" in df.columns:
-    df["campaign_type_clean"] = (
-        df["campaign_type_clean"]
-        .astype("string")
-        .str.strip()
-        .str.replace(r"(?i)^no coupon$", "No campaign", regex=True)
+# ============================================================
+# Exports
+# ============================================================
+@st.cache_resource(show_spinner=False)
+def get_export_cache() -> ExportCache:
+    return ExportCache()
+
+def export_button(label: str, stem: str, key: tuple, frame) -> None:
+    """Download of frame() in the chosen format, encoded only on click and memoised per `key`."""
+    c1, c2 = st.columns([1, 2])
+    fmt = c1.selectbox("Format", list(FORMATS), key=f"{stem}_fmt", label_visibility="collapsed")
+    c2.download_button(
+        label,
+        data=lambda: get_export_cache().get(key, fmt, frame),
+        file_name=file_name(stem, fmt),
+        mime=FORMATS[fmt][1],
+        on_click="ignore",
+        key=f"{stem}_dl",
     )
 
+# ============================================================
+# Paginated tables
+# ============================================================
+@st.cache_resource(show_spinner=False, max_entries=16)
+def table_pager(name: str, version: str) -> TablePager:
+    # Zero-copy over the shared store's Arrow table; sort/search orders are memoised inside.
+    return TablePager(store.table(name))
+
+def store_pager(name: str) -> TablePager:
+    return table_pager(name, store.version(name))
+
+def paged_table(
+    pager,
+    key: str,
+    sort_by: Optional[str] = None,
+    descending: bool = True,
+    flt: Optional[dict] = None,
+    page_size: int = PAGE_SIZE,
+) -> None:
+    """Server-side sorted/searched table; only the current page is sent to the browser."""
+    scope = {} if flt is None else {"filters": flt}
+    c1, c2, c3, c4 = st.columns([3, 2, 3, 2])
+    options = ["—"] + pager.columns
+    sort = c1.selectbox(
+        "Sort by", options, index=options.index(sort_by) if sort_by in options else 0, key=f"{key}_sort"
+    )
+    desc = c2.toggle("Descending", value=descending, key=f"{key}_desc")
+    search = c3.text_input("Search", key=f"{key}_search", placeholder="contains…").strip()
+    query = dict(sort_by=None if sort == "—" else sort, descending=desc, search=search, **scope)
+
+    total = pager.count(**query)
+    n_pages = max(1, -(-total // page_size))
+    # A new sort, search or filter selection starts again from page 1.
+    signature = (query["sort_by"], desc, search, filter_key(flt))
+    if st.session_state.get(f"{key}_query") != signature:
+        st.session_state[f"{key}_query"] = signature
+        st.session_state[f"{key}_page"] = 1
+    elif st.session_state.get(f"{key}_page", 1) > n_pages:
+        st.session_state[f"{key}_page"] = n_pages
+    page_no = c4.number_input(f"Page (of {n_pages:,})", min_value=1, max_value=n_pages, key=f"{key}_page")
+    offset = (int(page_no) - 1) * page_size
+    page = pager.page(offset=offset, limit=page_size, **query)
+    st.dataframe(page.rows, use_container_width=True, hide_index=True)
+    st.caption(f"Rows {offset + 1:,}–{offset + len(page.rows):,} of {total:,}" if total else "No matching rows")
 
 # ============================================================
 # Sidebar filters
@@ -306,7 +385,8 @@ ym_from, ym_to = st.sidebar.select_slider(
 def multiselect(col: str, label: str, key: str):
     if col not in df.columns:
         return []
-    opts = sorted([x for x in df[col].dropna().unique().tolist()])
+    # The prepared frame's categories are the dim table members (data_store.load_dims).
+    opts = df[col].cat.categories.tolist()
     return st.sidebar.multiselect(label, opts, default=[], key=key)
 
 company = multiselect("Company", "Company", "flt_company")
@@ -316,18 +396,35 @@ country = multiselect("shipping_country", "Country", "flt_country")
 campaign = multiselect("campaign_type_clean", "Campaign type", "flt_campaign")
 has_coupon = st.sidebar.selectbox("Has coupon", ["All", True, False], index=0, key="flt_coupon")
 
-f = df[(df["YearMonth"] >= ym_from) & (df["YearMonth"] <= ym_to)].copy()
-for col, sel in [
-    ("Company", company),
-    ("Brands", brand),
-    ("shop", shop),
-    ("shipping_country", country),
-    ("campaign_type_clean", campaign),
-]:
-    if sel and col in f.columns:
-        f = f[f[col].isin(sel)]
-if has_coupon != "All" and "has_coupon" in f.columns:
-    f = f[f["has_coupon"] == has_coupon]
+filters = {
+    "YearMonth": (ym_from, ym_to),
+    "Company": company,
+    "Brands": brand,
+    "shop": shop,
+    "shipping_country": country,
+    "campaign_type_clean": campaign,
+    "has_coupon": [] if has_coupon == "All" else [has_coupon],
+}
+
+def filtered_rows() -> pd.DataFrame:
+    selections = {k: v for k, v in filters.items() if k != "YearMonth"}
+    rows = load_row_index(DATA_VERSION, df).select(filters["YearMonth"], selections)
+    return df.iloc[rows].drop(columns=["ym_key"], errors="ignore")
+
+with st.sidebar.expander("⬇️ Export filtered data", expanded=False):
+    export_button(
+        "Download", "monthly_aggregates_filtered", ("monthly", DATA_VERSION, filter_key(filters)), filtered_rows
+    )
+
+with st.sidebar.expander("💾 Shared data store", expanded=False):
+    resident = store.resident_bytes()
+    st.caption(
+        f"{resident['shared_bytes'].sum() / 1e6:,.1f} MB memory-mapped (shared by all sessions) · "
+        f"{resident['private_bytes'].sum() / 1e6:,.1f} MB private"
+    )
+    st.dataframe(resident, use_container_width=True, hide_index=True)
+    st.caption(f"Start-up warm-up: {len(warm_report)} datasets, {warm_report['seconds'].sum():.2f}s of load time")
+    st.dataframe(warm_report.round(3), use_container_width=True, hide_index=True)
 
 # ============================================================
 # Report header
@@ -351,44 +448,171 @@ st.markdown(
 # ============================================================
 # KPI helpers
 # ============================================================
-def kpi_sum(col: str) -> float:
-    if col not in f.columns:
+# Sums and DAX-style ratios (numerator sum / denominator sum) in one roll-up.
+totals = cube.rollup([], filters, cube.measures + list(RATIOS)).iloc[0]
+
+def kpi(col: str) -> float:
+    if col not in totals.index:
         return np.nan
-    return float(np.nansum(f[col].to_numpy()))
-
-def kpi_div(n: float, d: float) -> float:
-    return float(n / d) if d else np.nan
-
-orders = int(np.nansum(f["orders"].to_numpy())) if "orders" in f.columns else 0
-net_rev = kpi_sum("net_revenue_gbp")
-aov = kpi_div(net_rev, orders)
-refund = kpi_sum("refund_gbp")
-order_total = kpi_sum("order_total_gbp")
-refund_rate = kpi_div(refund, order_total)
-
-coupon_orders = (
-    int(np.nansum(f.loc[f["has_coupon"] == True, "orders"].to_numpy()))
-    if ("has_coupon" in f.columns and "orders" in f.columns)
-    else 0
-)
-coupon_usage = kpi_div(coupon_orders, orders)
+    return float(totals[col])
+
+orders = int(totals["orders"]) if "orders" in totals.index else 0
+net_rev = kpi("net_revenue_gbp")
+aov = kpi("aov_gbp")
+refund = kpi("refund_gbp")
+refund_rate = kpi("refund_rate")
+coupon_usage = kpi("coupon_usage")
 
 # ============================================================
-# Tabs
+# Coverage (per-cell counters, see aggregate_store.COVERAGE_COUNTERS)
 # ============================================================
-tabs = st.tabs(
-    [
-        "Executive Overview",
-        "Revenue Drivers",
-        "Promotions & Coupons",
-        "Customer (RFM)",
-        "Products & Basket",
-        "Data Quality",
-    ]
-)
+LOW_COVERAGE = 0.9
+
+def coverage_by(dims: list, flt: dict) -> Optional[pd.DataFrame]:
+    """Coverage ratios per `dims` from the cube, or None when no selected cell has counters."""
+    if "covered_orders" not in cube.measures:
+        return None
+    cov = cube.rollup(dims, flt, ["orders", "covered_orders", *COVERAGE_RATIOS])
+    return cov if cov["covered_orders"].sum() > 0 else None
+
+def month_runs(months: list) -> list:
+    """['2021-11', '2021-12', '2022-02'] -> ['2021-11 – 2021-12', '2022-02']"""
+    keys = [data_store.ym_to_key(m) for m in months]
+    runs, start = [], 0
+    for i in range(1, len(keys) + 1):
+        if i == len(keys) or keys[i] != keys[i - 1] + 1:
+            runs.append(months[start] if i - 1 == start else f"{months[start]} – {months[i - 1]}")
+            start = i
+    return runs
+
+def low_coverage_periods() -> list:
+    """Periods where Customer_ID coverage is below LOW_COVERAGE (months, or years of the yearly snapshot)."""
+    # RFM is built from every order, so this looks at the whole history, not the sidebar selection.
+    cov = coverage_by(["YearMonth"], {})
+    if cov is not None:
+        low = cov[(cov["covered_orders"] > 0) & (cov["customer_id_coverage"] < LOW_COVERAGE)]
+        return month_runs([str(m) for m in low["YearMonth"]])
+    snap = load_optional("customer_id_coverage_by_year.csv")
+    if snap is None or not {"Year", "customer_id_coverage_pct"}.issubset(snap.columns):
+        return []
+    return [str(y) for y in snap.loc[snap["customer_id_coverage_pct"] < LOW_COVERAGE * 100, "Year"]]
+
+# ============================================================
+# Rerun timing
+# ============================================================
+# Reruns kept per scope; older timings drop off so session state stays bounded.
+TIMING_WINDOW = 200
+
+def log_timing(scope: str, ms: float) -> dict:
+    log = st.session_state.setdefault("rerun_timings", {})
+    log.setdefault(scope, deque(maxlen=TIMING_WINDOW)).append(ms)
+    return log
+
+def panel_timing(panel: str, started: float) -> None:
+    """Log a panel's run time and show it next to the last full-script rerun."""
+    ms = (time.perf_counter() - started) * 1000
+    log = log_timing(panel, ms)
+    full = log.get("Full script")
+    note = f" · last full rerun {full[-1]:,.0f} ms" if full else ""
+    st.caption(f"⏱ {panel} panel rerun: {ms:,.0f} ms{note}")
+
+# ============================================================
+# Views
+# ============================================================
+# Each view is a render function so that only the active one has to run
+# (see the navigation at the bottom of the script).
 
 # ------------------ TAB 1 ------------------
-with tabs[0]:
+TI_LABELS = {
+    "net_revenue_gbp": "Net Revenue (GBP)",
+    "orders": "Orders",
+    "aov_gbp": "AOV (GBP)",
+    "refund_rate": "Refund Rate",
+}
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def load_month_prefix(version: str, _cube: Cube) -> MonthPrefix:
+    # Prefix sums per cube series; any MoM/YoY/YTD/rolling window is then a difference.
+    return MonthPrefix(_cube)
+
+@st.cache_resource(show_spinner="Fitting forecasts…", max_entries=4)
+def load_forecast(version: str, model: str, _cube: Cube) -> Optional[Forecast]:
+    # Every Brands × shop × country series in one batch, once per data version and model.
+    try:
+        return Forecast.fit(_cube, model)
+    except ValueError:
+        return None  # too few months for the model
+
+def forecast_band(flt: dict) -> Optional[tuple]:
+    """(label, forecast band, interval label) for the trend chart when the overlay is on, else None."""
+    with st.expander("📈 Forecast overlay", expanded=False):
+        c1, c2, c3, c4 = st.columns(4)
+        on = c1.toggle("Show forecast", key="fc_on")
+        model = c2.selectbox("Model", list(FORECAST_MODELS), key="fc_model")
+        horizon = c3.slider("Months ahead", 1, HORIZON, 6, key="fc_horizon")
+        level = c4.selectbox("Interval", LEVELS, format_func="{:.0%}".format, key="fc_level")
+        if not on:
+            return None
+        fc = load_forecast(DATA_VERSION, model, cube)
+        if fc is None:
+            st.info(f"{model} needs more months of history than the data has.")
+            return None
+        if str(flt["YearMonth"][1]) != fc.last_month:
+            st.caption(f"Forecasts start after {fc.last_month}; extend the month range to it to see them.")
+            return None
+        skipped = fc.inexact(flt)
+        if skipped:
+            st.caption(
+                "Forecasts are per Brands × shop × country series, so the filter on "
+                f"{', '.join(skipped)} is not applied to them."
+            )
+        band = fc.total(fc.select(cube, flt), level).head(horizon)
+        return f"{model} forecast", band, f"{level:.0%} interval"
+
+@st.fragment
+def time_intel_panel(flt: dict) -> None:
+    # Measure and grain controls rerun only this panel.
+    started = time.perf_counter()
+    ti = load_month_prefix(DATA_VERSION, cube)
+    measures = [m for m in TI_LABELS if m in ti.measures]
+    if not measures:
+        return
+    c1, c2 = st.columns([2, 1])
+    m = c1.selectbox("Measure", measures, format_func=TI_LABELS.get, key="ti_measure")
+    grain = c2.radio("Grain", ["Month", "Quarter"], horizontal=True, key="ti_grain")
+    label = TI_LABELS[m]
+
+    if grain == "Month":
+        t = ti.monthly(flt, [m])
+        # Rolling sums are drawn as monthly averages so they share the month's scale.
+        per = 1 if m in RATIOS else None
+        rolled = {f"{m}_r{n}": f"Rolling {n}M" if per else f"Rolling {n}M avg" for n in ROLLING}
+        plot = t[["YearMonth", m, *rolled]].rename(columns={m: label, **rolled})
+        for n, col in zip(ROLLING, rolled.values()):
+            plot[col] = plot[col] / (per or n)
+        show_chart(
+            "t0_line_ti_by_ym",
+            plot,
+            lambda d: px.line(d, x="YearMonth", y=[label, *rolled.values()], markers=True),
+            f"{label}: Month with Rolling 3M / 12M",
+        )
+        table = t.rename(columns={
+            m: label, f"{m}_mom": "MoM", f"{m}_yoy": "YoY", f"{m}_ytd": "YTD",
+            **{f"{m}_r{n}": f"Rolling {n}M" for n in ROLLING},
+        })
+    else:
+        t = ti.quarterly(flt, [m], quarter_map(load_optional("dim_date.csv")))
+        show_chart(
+            "t0_bar_ti_by_quarter",
+            t[["Quarter", m]].rename(columns={m: label}),
+            lambda d: px.bar(d, x="Quarter", y=label),
+            f"{label} by Quarter",
+        )
+        table = t.rename(columns={m: label, f"{m}_qoq": "QoQ", f"{m}_yoy": "YoY", "months": "Months"})
+    st.dataframe(table, use_container_width=True, hide_index=True)
+    panel_timing("Time intelligence", started)
+
+def render_overview() -> None:
     st.subheader("Executive Overview")
 
     c1, c2, c3, c4, c5, c6 = st.columns(6)
@@ -399,326 +623,637 @@ with tabs[0]:
     c5.metric("Refund Rate", f"{refund_rate:.2%}" if pd.notna(refund_rate) else "—")
     c6.metric("Coupon Usage", f"{coupon_usage:.2%}" if pd.notna(coupon_usage) else "—")
 
-    by_ym = (
-        f.groupby("YearMonth", as_index=False)
-        .agg(net_revenue=("net_revenue_gbp", "sum"), orders=("orders", "sum"))
-        .sort_values("YearMonth")
-    )
-    fig = style_fig(px.line(by_ym, x="YearMonth", y="net_revenue", markers=True), "Net Revenue Trend (by Month)")
-    st.plotly_chart(fig, use_container_width=True, config=PLOTLY_CONFIG, key="t0_line_netrev_by_ym")
+    by_ym = cube.rollup(["YearMonth"], filters).rename(columns={"net_revenue_gbp": "net_revenue"})
+    overlay = forecast_band(filters)
+    if overlay is None:
+        show_chart(
+            "t0_line_netrev_by_ym",
+            by_ym,
+            lambda d: px.line(d, x="YearMonth", y="net_revenue", markers=True),
+            "Net Revenue Trend (by Month)",
+        )
+    else:
+        show_chart(
+            "t0_line_netrev_by_ym",
+            (by_ym, *overlay),
+            lambda d: add_forecast(px.line(d[0], x="YearMonth", y="net_revenue", markers=True), d[2], d[1], d[3]),
+            "Net Revenue Trend (by Month) with Forecast",
+        )
+
+    with st.expander("Time intelligence (MoM · YoY · YTD · rolling)", expanded=False):
+        time_intel_panel(filters)
 
     left, right = st.columns(2)
     with left:
-        if "Brands" in f.columns:
+        if "Brands" in cube.dims:
             top_brand = (
-                f.groupby("Brands", as_index=False)
-                .agg(net_revenue=("net_revenue_gbp", "sum"))
+                cube.rollup(["Brands"], filters, ["net_revenue_gbp"])
+                .rename(columns={"net_revenue_gbp": "net_revenue"})
                 .sort_values("net_revenue", ascending=False)
                 .head(10)
             )
-            fig = style_fig(px.bar(top_brand, x="Brands", y="net_revenue"), "Top 10 Brands (Net Revenue)")
-            st.plotly_chart(fig, use_container_width=True, config=PLOTLY_CONFIG, key="t0_bar_top_brand")
+            show_chart(
+                "t0_bar_top_brand",
+                top_brand,
+                lambda d: px.bar(d, x="Brands", y="net_revenue"),
+                "Top 10 Brands (Net Revenue)",
+            )
         else:
             st.info("Column `Brands` is missing in monthly_aggregates.csv.")
 
     with right:
-        if "shipping_country" in f.columns:
+        if "shipping_country" in cube.dims:
             top_country = (
-                f.groupby("shipping_country", as_index=False)
-                .agg(net_revenue=("net_revenue_gbp", "sum"))
+                cube.rollup(["shipping_country"], filters, ["net_revenue_gbp"])
+                .rename(columns={"net_revenue_gbp": "net_revenue"})
                 .sort_values("net_revenue", ascending=False)
                 .head(15)
             )
-            fig = style_fig(px.bar(top_country, x="shipping_country", y="net_revenue"), "Top Countries (Net Revenue)")
-            st.plotly_chart(fig, use_container_width=True, config=PLOTLY_CONFIG, key="t0_bar_top_country")
+            show_chart(
+                "t0_bar_top_country",
+                top_country,
+                lambda d: px.bar(d, x="shipping_country", y="net_revenue"),
+                "Top Countries (Net Revenue)",
+            )
         else:
             st.info("Column `shipping_country` is missing in monthly_aggregates.csv.")
 
 # ------------------ TAB 2 ------------------
-with tabs[1]:
+def render_drivers() -> None:
     st.subheader("Revenue Drivers & Operational Health")
 
-    if "shop" in f.columns:
+    if "shop" in cube.dims:
         pivot = (
-            f.groupby(["shop"], as_index=False)
-            .agg(
-                net_revenue=("net_revenue_gbp", "sum"),
-                orders=("orders", "sum"),
-                aov=("aov_gbp", "mean") if "aov_gbp" in f.columns else ("orders", "sum"),
-                refund_rate=("refund_rate", "mean") if "refund_rate" in f.columns else ("orders", "sum"),
-            )
+            cube.rollup(["shop"], filters, ["net_revenue_gbp", "orders", "aov_gbp", "refund_rate"])
+            .rename(columns={"net_revenue_gbp": "net_revenue", "aov_gbp": "aov"})
             .sort_values("net_revenue", ascending=False)
         )
-        st.dataframe(pivot, use_container_width=True)
+        paged_table(TablePager.from_frame(pivot), "shop_pivot", sort_by="net_revenue")
 
-    if "campaign_type_clean" in f.columns:
+    if "campaign_type_clean" in cube.dims:
         by_campaign = (
-            f.groupby("campaign_type_clean", as_index=False)
-            .agg(net_revenue=("net_revenue_gbp", "sum"))
+            cube.rollup(["campaign_type_clean"], filters, ["net_revenue_gbp"])
+            .rename(columns={"net_revenue_gbp": "net_revenue"})
             .sort_values("net_revenue", ascending=False)
             .head(15)
         )
-        fig = style_fig(px.bar(by_campaign, x="campaign_type_clean", y="net_revenue"),
-                        "Net Revenue by Campaign Type (Top 15)")
-        st.plotly_chart(fig, use_container_width=True, config=PLOTLY_CONFIG, key="t1_bar_netrev_by_campaign")
-
-    if "refund_rate" in f.columns:
-        by_ym2 = (
-            f.groupby("YearMonth", as_index=False)
-            .agg(refund_rate=("refund_rate", "mean"))
-            .sort_values("YearMonth")
+        show_chart(
+            "t1_bar_netrev_by_campaign",
+            by_campaign,
+            lambda d: px.bar(d, x="campaign_type_clean", y="net_revenue"),
+            "Net Revenue by Campaign Type (Top 15)",
+        )
+
+    if {"refund_gbp", "order_total_gbp"}.issubset(cube.measures):
+        by_ym2 = cube.rollup(["YearMonth"], filters, ["refund_rate"])
+        show_chart(
+            "t1_line_refund_rate_by_ym",
+            by_ym2,
+            lambda d: px.line(d, x="YearMonth", y="refund_rate", markers=True),
+            "Refund Rate Trend (by Month)",
         )
-        fig = style_fig(px.line(by_ym2, x="YearMonth", y="refund_rate", markers=True),
-                        "Refund Rate Trend (by Month)")
-        st.plotly_chart(fig, use_container_width=True, config=PLOTLY_CONFIG, key="t1_line_refund_rate_by_ym")
 
 # ------------------ TAB 3 ------------------
-with tabs[2]:
+def render_promotions() -> None:
     st.subheader("Promotions & Coupon Optimisation")
 
-    c1, c2, c3 = st.columns(3)
-    net_coupon = (
-        float(np.nansum(f.loc[f["has_coupon"] == True, "net_revenue_gbp"].to_numpy()))
-        if "has_coupon" in f.columns
-        else np.nan
-    )
-    net_nocoupon = (
-        float(np.nansum(f.loc[f["has_coupon"] == False, "net_revenue_gbp"].to_numpy()))
-        if "has_coupon" in f.columns
-        else np.nan
-    )
+    c1, c2, c3, c4, c5 = st.columns(5)
+    net_coupon = kpi("coupon_net_revenue_gbp")
+    net_nocoupon = kpi("nocoupon_net_revenue_gbp")
+    aov_coupon = kpi("aov_coupon")
+    aov_nocoupon = kpi("aov_nocoupon")
     c1.metric("Net Revenue (Coupon)", f"{net_coupon:,.0f}" if pd.notna(net_coupon) else "—")
     c2.metric("Net Revenue (No Coupon)", f"{net_nocoupon:,.0f}" if pd.notna(net_nocoupon) else "—")
-    wdisc = float(np.nanmean(f["avg_discount_rate"].to_numpy())) if "avg_discount_rate" in f.columns else np.nan
-    c3.metric("Avg Discount Rate", f"{wdisc:.2%}" if pd.notna(wdisc) else "—")
+    c4.metric("AOV (Coupon)", f"{aov_coupon:,.2f}" if pd.notna(aov_coupon) else "—")
+    c5.metric("AOV (No Coupon)", f"{aov_nocoupon:,.2f}" if pd.notna(aov_nocoupon) else "—")
+    wdisc = kpi("avg_discount_rate")
+    c3.metric("Weighted Avg Discount Rate", f"{wdisc:.2%}" if pd.notna(wdisc) else "—")
 
-    if "campaign_type_clean" in f.columns:
+    if "campaign_type_clean" in cube.dims:
+        # Same roll-up as Tab 2; served from the cube's memo.
         top_campaign = (
-            f.groupby("campaign_type_clean", as_index=False)
-            .agg(net_revenue=("net_revenue_gbp", "sum"))
+            cube.rollup(["campaign_type_clean"], filters, ["net_revenue_gbp"])
+            .rename(columns={"net_revenue_gbp": "net_revenue"})
             .sort_values("net_revenue", ascending=False)
             .head(15)
         )
-        fig = style_fig(px.bar(top_campaign, x="campaign_type_clean", y="net_revenue"),
-                        "Top Campaign Types (Net Revenue)")
-        st.plotly_chart(fig, use_container_width=True, config=PLOTLY_CONFIG, key="t2_bar_netrev_by_campaign")
-
-    if "has_coupon" in f.columns and "orders" in f.columns:
-        usage = (
-            f.groupby(["YearMonth"], as_index=False)
-            .apply(
-                lambda g: pd.Series(
-                    {
-                        "orders": int(np.nansum(g["orders"].to_numpy())),
-                        "coupon_orders": int(np.nansum(g.loc[g["has_coupon"] == True, "orders"].to_numpy())),
-                    }
-                )
-            )
-            .reset_index(drop=True)
-            .sort_values("YearMonth")
+        show_chart(
+            "t2_bar_netrev_by_campaign",
+            top_campaign,
+            lambda d: px.bar(d, x="campaign_type_clean", y="net_revenue"),
+            "Top Campaign Types (Net Revenue)",
+        )
+
+    if "has_coupon" in cube.dims:
+        usage = cube.rollup(["YearMonth"], filters, ["coupon_usage"])
+        show_chart(
+            "t2_line_coupon_usage_by_ym",
+            usage,
+            lambda d: px.line(d, x="YearMonth", y="coupon_usage", markers=True),
+            "Coupon Usage Rate (by Month)",
         )
-        usage["coupon_usage"] = usage["coupon_orders"] / usage["orders"].replace(0, np.nan)
-        fig = style_fig(px.line(usage, x="YearMonth", y="coupon_usage", markers=True),
-                        "Coupon Usage Rate (by Month)")
-        st.plotly_chart(fig, use_container_width=True, config=PLOTLY_CONFIG, key="t2_line_coupon_usage_by_ym")
 
 # ============================================================
-# Optional datasets (tabs 4-6)
+# Optional datasets (tabs 4-6), loaded by the view that needs them
 # ============================================================
-rfm_df = load_optional("rfm_customer_table.csv")
-rfm_targets = load_optional("rfm_target_list.csv")
-sku_summary = load_optional("sku_summary.csv")
-sku_rules = load_optional("sku_pair_rules_top200.csv")
-missing_profile = load_optional("missing_profile_current.csv")
-outlier_key = load_optional("outlier_profile_iqr_key_metrics.csv")
-audit_top_orders = load_optional("audit_top_orders_by_order_total_gbp.csv")
+VIEW_DATASETS = {
+    "Executive Overview": ["dim_date.csv"],
+    "Customer (RFM)": ["rfm_customer_table.csv", "rfm_target_list.csv"],
+    "Products & Basket": ["sku_summary.csv", "sku_pair_rules_top200.csv"],
+    "Data Quality": [
+        "customer_id_coverage_by_year.csv",
+        "coupon_code_coverage_by_year.csv",
+        "missing_profile_current.csv",
+        "outlier_profile_iqr_key_metrics.csv",
+        "audit_top_orders_by_order_total_gbp.csv",
+    ],
+}
+
+# Order-level backend (optional): orders_parquet/ built by `python orders_backend.py build ...`
+ORDERS_ROOT = BASE_DIR / ORDERS_DIR_NAME
+ORDERS_VERSION = data_store.source_version(ORDERS_ROOT) if ORDERS_ROOT.exists() else ""
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def load_order_store(version: str) -> Optional[OrderStore]:
+    return OrderStore.open(ORDERS_ROOT)
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def distinct_orders_cached(version: str, fkey: tuple) -> int:
+    return load_order_store(version).distinct_orders(dict(fkey))
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def load_order_pager(version: str) -> OrderPager:
+    return OrderPager(load_order_store(version))
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def order_drill_cached(version: str, fkey: tuple, col: str, value: str, limit: int) -> pd.DataFrame:
+    return load_order_store(version).drill(dict(fkey), {col: value}, limit)
+
+# Streaming DQ profile (optional): dq_profile/ built by `python dq_profiler.py build ...`
+DQ_ROOT = BASE_DIR / DQ_DIR_NAME
+DQ_VERSION = data_store.source_version(DQ_ROOT / DQ_MANIFEST_NAME) if (DQ_ROOT / DQ_MANIFEST_NAME).exists() else ""
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def load_dq_profile(version: str) -> Optional[DQProfile]:
+    return DQProfile.open(DQ_ROOT)
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def dq_tables_cached(version: str, fkey: tuple) -> tuple:
+    profile = load_dq_profile(version)
+    flt = dict(fkey)
+    cells = profile.select(flt)
+    notes = []
+    if profile.inexact(flt):
+        notes.append(f"quantiles approximate the {', '.join(profile.inexact(flt))} filter from month × coupon sketches")
+    undated = profile.undated(flt) if flt.get("YearMonth") else 0
+    if undated:
+        notes.append(f"{undated:,} orders without an order_date are outside the month range")
+    return profile.rows(cells), profile.missing(cells), profile.outliers(cells, KEY_METRICS), notes
+
+# Basket engine (optional): fact_order_skus.csv, filter-aware when orders_parquet/ exists.
+BASKETS_PATH = BASE_DIR / BASKETS_NAME
+BASKETS_VERSION = data_store.source_version(BASKETS_PATH) if BASKETS_PATH.exists() else ""
+
+# Floor for in-app pair rules; the rule sliders filter above it.
+MIN_RULE_ORDERS = 5
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def load_rule_index(version: str) -> RuleIndex:
+    return RuleIndex(store.frame("sku_pair_rules_top200.csv"))
+
+@st.cache_resource(show_spinner="Indexing order baskets…", max_entries=2)
+def load_basket_index(version: str, orders_version: str) -> Optional[BasketIndex]:
+    return BasketIndex.from_files(BASKETS_PATH, load_order_store(orders_version) if orders_version else None)
 
 # ------------------ TAB 4 ------------------
-with tabs[3]:
+def render_customers() -> None:
     st.subheader("Customer Intelligence (RFM)")
+    rfm_df = load_optional("rfm_customer_table.csv")
+    rfm_targets = load_optional("rfm_target_list.csv")
+
+    low = low_coverage_periods()
+    if low:
+        st.warning(
+            f"Customer_ID coverage is below {LOW_COVERAGE:.0%} in {', '.join(low)}. Orders without a "
+            "Customer_ID are not in the RFM scores, so customers active then are under-counted."
+        )
 
     if rfm_df is None:
-        st.warning("rfm_customer_table.csv was not found (make sure it is in the same folder as the app).")
+        st.warning(
+            "rfm_customer_table.csv was not found — build it with `python rfm_pipeline.py build --out .` "
+            "(or place it in the same folder as the app)."
+        )
     else:
-        rfm = rfm_df.copy()
-        cust_col = "Customer_ID" if "Customer_ID" in rfm.columns else None
-        seg_col = "RFM_Segment" if "RFM_Segment" in rfm.columns else None
-        clu_col = "kmeans_cluster" if "kmeans_cluster" in rfm.columns else None
-
-        cA, cB, cC = st.columns(3)
-        with cA:
-            seg_sel = st.multiselect(
-                "RFM Segment",
-                sorted(rfm[seg_col].dropna().unique().tolist()) if seg_col else [],
-                default=[],
-                key="rfm_seg_sel",
+        rfm_panel(rfm_df, rfm_targets)
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def rfm_scatter_cached(version: str, rfm_key: tuple, _rfm: pd.DataFrame) -> Density:
+    # Keyed on the file version and the panel filters; the frame itself is not hashed.
+    keep = [c for c in ("Customer_ID", "RFM_Segment") if c in _rfm.columns]
+    return density_sample(filter_rfm(_rfm, *rfm_key), "recency_days", "monetary", keep=keep)
+
+@st.fragment
+def rfm_panel(rfm: pd.DataFrame, rfm_targets: Optional[pd.DataFrame]) -> None:
+    # RFM controls rerun only this panel, not the filters, KPIs and other views.
+    started = time.perf_counter()
+    cust_col = "Customer_ID" if "Customer_ID" in rfm.columns else None
+    seg_col = "RFM_Segment" if "RFM_Segment" in rfm.columns else None
+    clu_col = "kmeans_cluster" if "kmeans_cluster" in rfm.columns else None
+
+    cA, cB, cC = st.columns(3)
+    with cA:
+        seg_sel = st.multiselect(
+            "RFM Segment",
+            sorted(rfm[seg_col].dropna().unique().tolist()) if seg_col else [],
+            default=[],
+            key="rfm_seg_sel",
+        )
+    with cB:
+        clu_sel = st.multiselect(
+            "Cluster",
+            sorted(rfm[clu_col].dropna().unique().tolist()) if clu_col else [],
+            default=[],
+            key="rfm_clu_sel",
+        )
+    with cC:
+        rec_rng = None
+        if "recency_days" in rfm.columns and rfm["recency_days"].notna().any():
+            rmin, rmax = int(np.nanmin(rfm["recency_days"])), int(np.nanmax(rfm["recency_days"]))
+            rec_rng = st.slider("Recency (days)", rmin, rmax, (rmin, rmax), key="rfm_rec_rng")
+
+    rfm_key = (tuple(seg_sel), tuple(clu_sel), tuple(rec_rng) if rec_rng else None)
+    rf = filter_rfm(rfm, *rfm_key)
+
+    k1, k2, k3, k4 = st.columns(4)
+    n_cust = int(rf[cust_col].nunique()) if cust_col else len(rf)
+    total_m = float(np.nansum(rf["monetary"].to_numpy())) if "monetary" in rf.columns else np.nan
+    avg_m = float(np.nanmean(rf["monetary"].to_numpy())) if "monetary" in rf.columns else np.nan
+    avg_f = float(np.nanmean(rf["frequency"].to_numpy())) if "frequency" in rf.columns else np.nan
+    k1.metric("Customers", f"{n_cust:,}")
+    k2.metric("Total Monetary (GBP)", f"{total_m:,.0f}" if pd.notna(total_m) else "—")
+    k3.metric("Avg Monetary", f"{avg_m:,.2f}" if pd.notna(avg_m) else "—")
+    k4.metric("Avg Frequency", f"{avg_f:.2f}" if pd.notna(avg_f) else "—")
+
+    left, right = st.columns(2)
+
+    with left:
+        if seg_col and "monetary" in rf.columns and cust_col:
+            seg_sum = (
+                rf.groupby(seg_col, as_index=False, observed=True)
+                .agg(customers=(cust_col, "nunique"), monetary=("monetary", "sum"))
+                .sort_values("monetary", ascending=False)
             )
-        with cB:
-            clu_sel = st.multiselect(
-                "Cluster",
-                sorted(rfm[clu_col].dropna().unique().tolist()) if clu_col else [],
-                default=[],
-                key="rfm_clu_sel",
+            show_chart(
+                "rfm_bar",
+                seg_sum,
+                lambda d: px.bar(d, x=seg_col, y="monetary", hover_data=["customers"]),
+                "Total Monetary by Segment",
             )
-        with cC:
-            rec_rng = None
-            if "recency_days" in rfm.columns and rfm["recency_days"].notna().any():
-                rmin, rmax = int(np.nanmin(rfm["recency_days"])), int(np.nanmax(rfm["recency_days"]))
-                rec_rng = st.slider("Recency (days)", rmin, rmax, (rmin, rmax), key="rfm_rec_rng")
-
-        rf = rfm.copy()
-        if seg_sel and seg_col:
-            rf = rf[rf[seg_col].isin(seg_sel)]
-        if clu_sel and clu_col:
-            rf = rf[rf[clu_col].isin(clu_sel)]
-        if rec_rng and "recency_days" in rf.columns:
-            rf = rf[(rf["recency_days"] >= rec_rng[0]) & (rf["recency_days"] <= rec_rng[1])]
-
-        k1, k2, k3, k4 = st.columns(4)
-        n_cust = int(rf[cust_col].nunique()) if cust_col else len(rf)
-        total_m = float(np.nansum(rf["monetary"].to_numpy())) if "monetary" in rf.columns else np.nan
-        avg_m = float(np.nanmean(rf["monetary"].to_numpy())) if "monetary" in rf.columns else np.nan
-        avg_f = float(np.nanmean(rf["frequency"].to_numpy())) if "frequency" in rf.columns else np.nan
-        k1.metric("Customers", f"{n_cust:,}")
-        k2.metric("Total Monetary (GBP)", f"{total_m:,.0f}" if pd.notna(total_m) else "—")
-        k3.metric("Avg Monetary", f"{avg_m:,.2f}" if pd.notna(avg_m) else "—")
-        k4.metric("Avg Frequency", f"{avg_f:.2f}" if pd.notna(avg_f) else "—")
-
-        left, right = st.columns(2)
-
-        with left:
-            if seg_col and "monetary" in rf.columns and cust_col:
-                seg_sum = (
-                    rf.groupby(seg_col, as_index=False)
-                    .agg(customers=(cust_col, "nunique"), monetary=("monetary", "sum"))
-                    .sort_values("monetary", ascending=False)
-                )
-                fig = style_fig(px.bar(seg_sum, x=seg_col, y="monetary", hover_data=["customers"]),
-                                "Total Monetary by Segment")
-                st.plotly_chart(fig, use_container_width=True, config=PLOTLY_CONFIG, key="rfm_bar")
-
-        # Replaced treemap with stacked bar (easier to read)
-        with right:
-            if seg_col and clu_col and cust_col:
-                seg_cluster = (
-                    rf.groupby([seg_col, clu_col], as_index=False)
-                    .agg(customers=(cust_col, "nunique"))
-                )
-                seg_order = (
-                    seg_cluster.groupby(seg_col, as_index=False)["customers"]
-                    .sum()
-                    .sort_values("customers", ascending=False)[seg_col]
-                    .tolist()
-                )
-                seg_cluster[seg_col] = pd.Categorical(seg_cluster[seg_col], categories=seg_order, ordered=True)
-                seg_cluster = seg_cluster.sort_values(seg_col)
 
-                fig = px.bar(
-                    seg_cluster,
+    # Replaced treemap with stacked bar (easier to read)
+    with right:
+        if seg_col and clu_col and cust_col:
+            seg_cluster = (
+                rf.groupby([seg_col, clu_col], as_index=False, observed=True)
+                .agg(customers=(cust_col, "nunique"))
+            )
+            seg_order = (
+                seg_cluster.groupby(seg_col, as_index=False, observed=True)["customers"]
+                .sum()
+                .sort_values("customers", ascending=False)[seg_col]
+                .tolist()
+            )
+            seg_cluster[seg_col] = pd.Categorical(seg_cluster[seg_col], categories=seg_order, ordered=True)
+            seg_cluster = seg_cluster.sort_values(seg_col)
+
+            show_chart(
+                "rfm_seg_cluster_bar",
+                seg_cluster,
+                lambda d: px.bar(
+                    d,
                     y=seg_col,
                     x="customers",
                     color=clu_col,
                     orientation="h",
                     barmode="stack",
                     text="customers",
-                )
-                fig = style_fig(fig, "Customers by Segment (split by Cluster)")
-                fig.update_traces(textposition="inside", insidetextanchor="middle")
-                st.plotly_chart(fig, use_container_width=True, config=PLOTLY_CONFIG, key="rfm_seg_cluster_bar")
-            else:
-                st.info("Missing required columns for RFM charts (RFM_Segment / kmeans_cluster / Customer_ID).")
-
-        if "recency_days" in rf.columns and "monetary" in rf.columns and len(rf) > 0:
-            sample = rf.sample(min(len(rf), 5000), random_state=42)
-            fig = style_fig(px.scatter(sample, x="recency_days", y="monetary"), "Recency vs Monetary (sample)")
-            st.plotly_chart(fig, use_container_width=True, config=PLOTLY_CONFIG, key="rfm_scatter")
-
-        st.markdown("### Target list")
-        if rfm_targets is not None:
-            st.dataframe(rfm_targets.head(200), use_container_width=True)
-            st.download_button(
-                "Download target list CSV",
-                rfm_targets.to_csv(index=False).encode("utf-8"),
-                "rfm_target_list.csv",
-                "text/csv",
+                ).update_traces(textposition="inside", insidetextanchor="middle"),
+                "Customers by Segment (split by Cluster)",
             )
+        else:
+            st.info("Missing required columns for RFM charts (RFM_Segment / kmeans_cluster / Customer_ID).")
+
+    if "recency_days" in rf.columns and "monetary" in rf.columns and len(rf) > 0:
+        d = rfm_scatter_cached(store.version("rfm_customer_table.csv"), rfm_key, rfm)
+        hover = [c for c in (cust_col, seg_col) if c]
+        show_chart(
+            "rfm_scatter",
+            d,
+            lambda d: density_figure(d, "recency_days", "monetary", hover=hover, name="customers"),
+            f"Recency vs Monetary ({d.n_total:,} customers)",
+        )
+
+    export_button(
+        "Download filtered customers",
+        "rfm_customers_filtered",
+        ("rfm", store.version("rfm_customer_table.csv"), rfm_key),
+        lambda: rf,
+    )
+
+    st.markdown("### Target list")
+    if rfm_targets is not None:
+        paged_table(store_pager("rfm_target_list.csv"), "rfm_targets")
+        export_button(
+            "Download target list",
+            "rfm_target_list",
+            ("rfm_targets", store.version("rfm_target_list.csv")),
+            lambda: rfm_targets,
+        )
+
+    panel_timing("RFM", started)
 
 # ------------------ TAB 5 ------------------
-with tabs[4]:
+def render_basket() -> None:
     st.subheader("Products & Market Basket")
+    sku_summary = load_optional("sku_summary.csv")
+    baskets = load_basket_index(BASKETS_VERSION, ORDERS_VERSION) if BASKETS_VERSION else None
+    if baskets is not None:
+        # Mined per filter selection; memoised inside the basket index.
+        rule_index = baskets.rule_index(filters, min_count=MIN_RULE_ORDERS)
+        rules_key = (BASKETS_VERSION, ORDERS_VERSION, filter_key(filters), MIN_RULE_ORDERS)
+    elif store.exists("sku_pair_rules_top200.csv"):
+        rules_key = (store.version("sku_pair_rules_top200.csv"),)
+        rule_index = load_rule_index(rules_key[0])
+    else:
+        rule_index = None
 
-    if sku_summary is None or sku_rules is None:
+    if sku_summary is None or rule_index is None:
         st.warning("sku_summary.csv or sku_pair_rules_top200.csv is missing.")
     else:
-        topn = st.slider("Top N SKUs", 10, 50, 20, 5, key="sku_topn")
-
-        if "sku" in sku_summary.columns and "revenue_alloc_gbp" in sku_summary.columns:
-            top_skus = sku_summary.sort_values("revenue_alloc_gbp", ascending=False).head(topn)
-            fig = style_fig(px.bar(top_skus, x="sku", y="revenue_alloc_gbp"),
-                            f"Top {topn} SKUs (Revenue Allocated, GBP)")
-            st.plotly_chart(fig, use_container_width=True, config=PLOTLY_CONFIG, key="sku_bar")
-            st.dataframe(top_skus, use_container_width=True)
-
-        needed = {"antecedent", "consequent", "support", "confidence", "lift", "pair_order_count"}
-        if needed.issubset(set(sku_rules.columns)):
-            c1, c2, c3 = st.columns(3)
-            with c1:
-                min_support = st.slider(
-                    "Min support",
-                    0.0,
-                    float(sku_rules["support"].max()),
-                    float(np.quantile(sku_rules["support"], 0.5)),
-                    step=0.0001,
-                    key="min_support",
-                )
-            with c2:
-                min_conf = st.slider("Min confidence", 0.0, 1.0, 0.2, step=0.05, key="min_conf")
-            with c3:
-                min_lift = st.slider("Min lift", 0.0, float(sku_rules["lift"].max()), 5.0, step=1.0, key="min_lift")
-
-            rr = sku_rules[
-                (sku_rules["support"] >= min_support)
-                & (sku_rules["confidence"] >= min_conf)
-                & (sku_rules["lift"] >= min_lift)
-            ].copy()
-
-            fig = style_fig(
-                px.scatter(
-                    rr,
-                    x="confidence",
-                    y="lift",
-                    size="pair_order_count",
-                    hover_data=["antecedent", "consequent", "support", "pair_order_count"],
-                ),
-                "Association Rules (Confidence vs Lift)",
+        sku_top_panel(sku_summary)
+        if baskets is not None:
+            scope = "current selection" if baskets.filtered else "all orders (sidebar filters need orders_parquet/)"
+            st.caption(
+                f"Rules mined from {len(baskets.select(filters)):,} baskets · {scope} · "
+                f"pairs bought together in ≥ {MIN_RULE_ORDERS} orders"
             )
-            st.plotly_chart(fig, use_container_width=True, config=PLOTLY_CONFIG, key="rules_scatter")
-
-            sku_pick = st.selectbox(
-                "Drill-down SKU",
-                options=sorted(pd.unique(pd.concat([sku_rules["antecedent"], sku_rules["consequent"]]).dropna()).tolist()),
-                key="sku_pick",
+        rules_panel(rule_index, rules_key)
+        if baskets is not None:
+            itemsets_panel(baskets, filters)
+
+@st.fragment
+def sku_top_panel(sku_summary: pd.DataFrame) -> None:
+    started = time.perf_counter()
+    topn = st.slider("Top N SKUs", 10, 50, 20, 5, key="sku_topn")
+
+    if "sku" in sku_summary.columns and "revenue_alloc_gbp" in sku_summary.columns:
+        top_skus = sku_summary.sort_values("revenue_alloc_gbp", ascending=False).head(topn)
+        show_chart(
+            "sku_bar",
+            top_skus,
+            lambda d: px.bar(d, x="sku", y="revenue_alloc_gbp"),
+            f"Top {topn} SKUs (Revenue Allocated, GBP)",
+        )
+        st.caption("All SKUs")
+        paged_table(store_pager("sku_summary.csv"), "sku_table", sort_by="revenue_alloc_gbp")
+
+    panel_timing("Top SKUs", started)
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def rules_scatter_cached(rules_key: tuple, thresholds: tuple, _rule_index: RuleIndex) -> Density:
+    # rules_key identifies the rule set (source version + filters), thresholds the slider state.
+    keep = ["antecedent", "consequent", "support", "pair_order_count"]
+    return density_sample(filter_rules(_rule_index.rules, *thresholds), "confidence", "lift", keep=keep)
+
+@st.fragment
+def rules_panel(rule_index: RuleIndex, rules_key: tuple) -> None:
+    # Threshold sliders and the drill-down rerun only this panel.
+    started = time.perf_counter()
+    sku_rules = rule_index.rules
+    if sku_rules.empty:
+        st.info("No rules for this selection")
+        panel_timing("Rules", started)
+        return
+    needed = {"antecedent", "consequent", "support", "confidence", "lift", "pair_order_count"}
+    if needed.issubset(set(sku_rules.columns)):
+        c1, c2, c3 = st.columns(3)
+        with c1:
+            min_support = st.slider(
+                "Min support",
+                0.0,
+                float(sku_rules["support"].max()),
+                float(np.quantile(sku_rules["support"], 0.5)),
+                step=0.0001,
+                key="min_support",
             )
-            rel = rr[(rr["antecedent"] == sku_pick) | (rr["consequent"] == sku_pick)].copy()
-            rel = rel.sort_values(["lift", "confidence", "support"], ascending=False).head(50)
-            st.dataframe(rel, use_container_width=True)
+        with c2:
+            min_conf = st.slider("Min confidence", 0.0, 1.0, 0.2, step=0.05, key="min_conf")
+        with c3:
+            max_lift = float(sku_rules["lift"].max())
+            min_lift = st.slider("Min lift", 0.0, max_lift, min(5.0, max_lift), step=1.0, key="min_lift")
+
+        thresholds = (min_support, min_conf, min_lift)
+        d = rules_scatter_cached(rules_key, thresholds, rule_index)
+        show_chart(
+            "rules_scatter",
+            d,
+            lambda d: density_figure(
+                d,
+                "confidence",
+                "lift",
+                hover=["antecedent", "consequent", "support", "pair_order_count"],
+                size="pair_order_count",
+                name="rules",
+            ),
+            f"Association Rules (Confidence vs Lift, {d.n_total:,} rules)",
+        )
+        export_button(
+            "Download filtered rules",
+            "sku_rules_filtered",
+            ("rules", rules_key, thresholds),
+            lambda: filter_rules(sku_rules, *thresholds),
+        )
+
+        sku_pick = st.selectbox("Drill-down SKU", options=rule_index.skus, key="sku_pick")
+        if sku_pick is not None:
+            # Adjacency list of the SKU, already sorted by lift/confidence/support.
+            rel = rule_index.neighbours(sku_pick)
+            rel = rel[
+                (rel["support"] >= min_support) & (rel["confidence"] >= min_conf) & (rel["lift"] >= min_lift)
+            ]
+            paged_table(TablePager.from_frame(rel), "sku_rel")
+            st.caption(f"Frequently bought with {sku_pick}")
+            st.dataframe(rule_index.recommend([sku_pick], k=10), use_container_width=True, hide_index=True)
+
+    panel_timing("Rules", started)
+
+@st.fragment
+def itemsets_panel(baskets: BasketIndex, flt: dict) -> None:
+    with st.expander("Frequent itemsets (FP-growth)", expanded=False):
+        c1, c2 = st.columns(2)
+        min_sup = c1.number_input(
+            "Min support", 0.0001, 0.5, 0.001, step=0.0005, format="%.4f", key="fp_min_support"
+        )
+        max_len = c2.slider("Max itemset size", 2, 5, 3, key="fp_max_len")
+        sets = baskets.itemsets(flt, min_support=min_sup, max_len=max_len)
+        sets = sets[sets["size"] >= 2].assign(itemset=lambda d: d["itemset"].map(" + ".join))
+        st.dataframe(sets.head(500), use_container_width=True, hide_index=True)
 
 # ------------------ TAB 6 ------------------
-with tabs[5]:
+def render_data_quality() -> None:
     st.subheader("Data Quality, Coverage & Outliers")
+    if DQ_VERSION:
+        n_rows, missing_profile, outlier_key, notes = dq_tables_cached(DQ_VERSION, filter_key(filters))
+        st.caption(
+            f"Streaming profile · {n_rows:,} orders in the current selection "
+            "(quantiles and outlier counts from mergeable sketches)"
+            + "".join(f" · {n}" for n in notes)
+        )
+    else:
+        missing_profile = load_optional("missing_profile_current.csv")
+        outlier_key = load_optional("outlier_profile_iqr_key_metrics.csv")
+    audit_top_orders = load_optional("audit_top_orders_by_order_total_gbp.csv")
+    order_store = load_order_store(ORDERS_VERSION) if ORDERS_VERSION else None
 
     if missing_profile is not None and {"column_name", "missing_pct"}.issubset(set(missing_profile.columns)):
         top_m = missing_profile.sort_values("missing_pct", ascending=False).head(20)
-        fig = style_fig(px.bar(top_m, x="column_name", y="missing_pct"), "Top Missingness (%)")
-        st.plotly_chart(fig, use_container_width=True, config=PLOTLY_CONFIG, key="miss_bar")
+        show_chart(
+            "miss_bar",
+            top_m,
+            lambda d: px.bar(d, x="column_name", y="missing_pct"),
+            "Top Missingness (%)",
+        )
         st.dataframe(top_m, use_container_width=True)
 
     if outlier_key is not None and {"column", "pct_outliers_iqr"}.issubset(set(outlier_key.columns)):
         out = outlier_key.sort_values("pct_outliers_iqr", ascending=False)
-        fig = style_fig(px.bar(out, x="column", y="pct_outliers_iqr"), "Outlier Prevalence (IQR) — Key Metrics")
-        st.plotly_chart(fig, use_container_width=True, config=PLOTLY_CONFIG, key="out_bar")
+        show_chart(
+            "out_bar",
+            out,
+            lambda d: px.bar(d, x="column", y="pct_outliers_iqr"),
+            "Outlier Prevalence (IQR) — Key Metrics",
+        )
         st.dataframe(out, use_container_width=True)
 
+    st.markdown("### Coverage")
+    cov = coverage_by(["YearMonth"], filters)
+    if cov is not None:
+        tot = cube.rollup([], filters, ["orders", "covered_orders", *COVERAGE_RATIOS]).iloc[0]
+        pct = lambda v: f"{v:.1%}" if pd.notna(v) else "—"
+        c1, c2, c3 = st.columns(3)
+        c1.metric("Customer_ID coverage", pct(tot["customer_id_coverage"]))
+        c2.metric("Coupon code coverage", pct(tot["coupon_code_coverage"]))
+        c3.metric("Orders with coverage counters", pct(tot["counter_coverage"]))
+        show_chart(
+            "dq_line_coverage_by_ym",
+            cov,
+            lambda d: px.line(
+                d.melt("YearMonth", ["customer_id_coverage", "coupon_code_coverage"], "measure", "coverage"),
+                x="YearMonth",
+                y="coverage",
+                color="measure",
+                markers=True,
+            ),
+            "Coverage by Month",
+        )
+        by = st.selectbox("Coverage by", ["shop", "shipping_country", "Brands", "Company"], key="dq_cov_by")
+        st.dataframe(
+            coverage_by([by], filters).sort_values("customer_id_coverage", kind="stable"),
+            use_container_width=True,
+            hide_index=True,
+        )
+    else:
+        cust = load_optional("customer_id_coverage_by_year.csv")
+        coup = load_optional("coupon_code_coverage_by_year.csv")
+        if cust is not None and coup is not None:
+            st.caption(
+                "Yearly snapshot, not filter-aware. Run `python aggregate_store.py init` with orders_parquet/ "
+                "present to store coverage counters per cell."
+            )
+            snap = cust.merge(coup.drop(columns=["orders_total"], errors="ignore"), on="Year", how="outer")
+            st.dataframe(snap, use_container_width=True, hide_index=True)
+
     st.markdown("### Audit: Top orders")
-    if audit_top_orders is not None:
-        st.dataframe(audit_top_orders.head(200), use_container_width=True)
+    if order_store is not None:
+        n_distinct = distinct_orders_cached(ORDERS_VERSION, filter_key(filters))
+        st.caption(f"Order-level backend · {n_distinct:,} distinct orders in the current selection")
+        paged_table(load_order_pager(ORDERS_VERSION), "audit_orders", sort_by="Order Total (GBP)", flt=filters)
+
+        with st.expander("Drill-through (orders)", expanded=False):
+            dims = [c for c in ("shop", "Brands", "shipping_country", "campaign_type_clean") if c in order_store.columns]
+            d1, d2 = st.columns(2)
+            drill_col = d1.selectbox("Dimension", dims, key="drill_col")
+            drill_val = d2.selectbox("Value", cube.labels(drill_col), key="drill_val")
+            if drill_val is not None:
+                st.dataframe(
+                    order_drill_cached(ORDERS_VERSION, filter_key(filters), drill_col, drill_val, 1000),
+                    use_container_width=True,
+                )
+    elif audit_top_orders is not None:
+        paged_table(store_pager("audit_top_orders_by_order_total_gbp.csv"), "audit_orders")
+
+# ============================================================
+# Navigation
+# ============================================================
+VIEWS = {
+    "Executive Overview": render_overview,
+    "Revenue Drivers": render_drivers,
+    "Promotions & Coupons": render_promotions,
+    "Customer (RFM)": render_customers,
+    "Products & Basket": render_basket,
+    "Data Quality": render_data_quality,
+}
+
+@st.cache_resource(show_spinner=False)
+def prefetch_pool() -> ThreadPoolExecutor:
+    # One background worker per process; it only touches the thread-safe SharedStore.
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch")
+
+def warm_view(view: str) -> None:
+    """Load (memory-map) the datasets of `view` so opening it does not wait on I/O."""
+    for name in VIEW_DATASETS.get(view, []):
+        store.frame(name)
+
+def likely_next(view: str) -> str:
+    """Most frequent next view after `view` in this session, else the following one."""
+    seen = st.session_state.get("nav_transitions", {}).get(view)
+    if seen:
+        return max(seen, key=seen.get)
+    names = list(VIEWS)
+    return names[(names.index(view) + 1) % len(names)]
+
+def prefetch(view: str) -> None:
+    nxt = likely_next(view)
+    if VIEW_DATASETS.get(nxt):
+        prefetch_pool().submit(warm_view, nxt)
+
+if nav_mode == "Tabs":
+    for tab, render in zip(st.tabs(list(VIEWS)), VIEWS.values()):
+        with tab:
+            render()
+else:
+    view = st.radio("View", list(VIEWS), horizontal=True, key="nav_view", label_visibility="collapsed")
+    prev = st.session_state.get("nav_prev")
+    if prev is not None and prev != view:
+        counts = st.session_state.setdefault("nav_transitions", {}).setdefault(prev, {})
+        counts[view] = counts.get(view, 0) + 1
+    st.session_state["nav_prev"] = view
+    VIEWS[view]()
+    prefetch(view)
+
+# Full reruns vs panel (fragment) reruns, per session.
+timings = log_timing("Full script", (time.perf_counter() - SCRIPT_STARTED) * 1000)
+with st.sidebar.expander("⏱ Rerun timings", expanded=False):
+    st.dataframe(
+        pd.DataFrame(
+            [
+                {"scope": k, "recent_runs": len(v), "last_ms": v[-1], "median_ms": float(np.median(v))}
+                for k, v in timings.items()
+            ]
+        ).round(1),
+        use_container_width=True,
+        hide_index=True,
+    )
+# Figure builds (misses) vs reuses (hits) per chart, for this server process.
+with st.sidebar.expander("📊 Figure cache", expanded=False):
+    st.dataframe(get_figure_cache().stats(), use_container_width=True, hide_index=True)
@@ -0,0 +1,369 @@
+"""
+Market-basket engine over order baskets (FactOrderSKUs).
+
+`fact_order_skus.csv` (boss_order_id, sku; one row per order line) becomes a
+binary order x SKU CSR matrix with integer-coded SKUs. When the order backend
+(orders_parquet/) exists, matrix rows are aligned with its orders and sorted
+by month, so the sidebar filters select basket rows through the same
+FilterIndex as the cube.
+
+- Pair rules: co-occurrence counts for every SKU pair come from one sparse
+  product X.T @ X over the selected rows. Support, confidence and lift are
+  vector arithmetic on those counts.
+- Frequent itemsets: FP-growth (pattern growth over deduplicated,
+  frequency-ordered baskets) for itemsets beyond pairs.
+- RuleIndex: SKU -> rule adjacency lists for drill-down and recommendations.
+
+Results are memoised per filter key.
+"""
+from __future__ import annotations
+
+import threading
+from collections import Counter, OrderedDict
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+from scipy import sparse
+
+from cube import filter_key
+from data_store import year_month_key
+from filter_engine import FILTER_DIMS, FilterIndex
+from orders_backend import ORDER_ID, OrderStore
+
+BASKETS_NAME = "fact_order_skus.csv"
+
+SKU_COL = "sku"
+
+RULE_COLUMNS = ["antecedent", "consequent", "pair_order_count", "support", "confidence", "lift"]
+
+BASKET_CACHE_SIZE = 32
+
+
+def read_order_skus(path: Path) -> Tuple[pa.Array, pa.Array]:
+    """(order ids, skus) of every order line with both fields present."""
+    table = pacsv.read_csv(
+        path,
+        convert_options=pacsv.ConvertOptions(
+            include_columns=[ORDER_ID, SKU_COL],
+            column_types={ORDER_ID: pa.string(), SKU_COL: pa.string()},
+            strings_can_be_null=True,
+        ),
+    ).drop_null()
+    return table.column(ORDER_ID).combine_chunks(), pc.utf8_trim_whitespace(table.column(SKU_COL)).combine_chunks()
+
+
+def _first_rows(orders: pa.Table) -> pa.Table:
+    """The first row of each order id (order lines repeat the order's attributes)."""
+    ids = orders.column(ORDER_ID)
+    orders = orders.filter(pc.is_valid(ids))
+    ids = orders.column(ORDER_ID).combine_chunks()
+    return orders.take(pc.index_in(pc.unique(ids), value_set=ids))
+
+
+class BasketIndex:
+    def __init__(self, order_ids: pa.Array, skus: pa.Array, orders: Optional[pa.Table] = None):
+        """
+        `orders`: boss_order_id, YearMonth and the filter dimensions (e.g. from
+        OrderStore, one row per order line; the first row of an order is
+        used). Without it the index covers the orders found in the basket
+        file and ignores filters.
+        """
+        sku_enc = pc.dictionary_encode(skus)
+        self.skus = pd.Index(sku_enc.dictionary.to_pylist())
+        sku_codes = sku_enc.indices.to_numpy()
+
+        if orders is not None:
+            orders = _first_rows(orders)
+            attrs = orders.drop_columns([ORDER_ID]).to_pandas(strings_to_categorical=True)
+            attrs["ym_key"] = year_month_key(attrs["YearMonth"])
+            perm = np.argsort(attrs["ym_key"].to_numpy(), kind="stable")
+            attrs = attrs.iloc[perm].reset_index(drop=True)
+            ids = orders.column(ORDER_ID).take(pa.array(perm))
+            rows = pc.index_in(order_ids, value_set=ids).fill_null(-1).to_numpy()
+            self.index: Optional[FilterIndex] = FilterIndex(attrs, [d for d in FILTER_DIMS if d in attrs.columns])
+            n_orders = len(attrs)
+        else:
+            enc = pc.dictionary_encode(order_ids)
+            rows = enc.indices.to_numpy()
+            self.index = None
+            n_orders = len(enc.dictionary)
+
+        keep = rows >= 0
+        rows, sku_codes = rows[keep], sku_codes[keep]
+        x = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.int32), (rows, sku_codes)), shape=(n_orders, len(self.skus))
+        )
+        x.data[:] = 1  # an SKU on several lines of one order counts once
+        self.X = x
+        self._cache: "OrderedDict[Tuple, object]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_files(cls, path: Path, order_store: Optional[OrderStore] = None) -> Optional["BasketIndex"]:
+        """BasketIndex for fact_order_skus.csv, or None when the file does not exist."""
+        path = Path(path)
+        if not path.exists():
+            return None
+        order_ids, skus = read_order_skus(path)
+        orders = None
+        if order_store is not None:
+            cols = [c for c in [ORDER_ID, "YearMonth", *FILTER_DIMS] if c in order_store.columns]
+            orders = order_store.dataset.to_table(columns=cols)
+        return cls(order_ids, skus, orders)
+
+    @property
+    def filtered(self) -> bool:
+        """True when sidebar filters apply (baskets are aligned with the order backend)."""
+        return self.index is not None
+
+    @property
+    def n_orders(self) -> int:
+        return self.X.shape[0]
+
+    def select(self, filters: Optional[Mapping[str, object]] = None) -> np.ndarray:
+        """Basket rows (orders) selected by a sidebar filter dict."""
+        if self.index is None:
+            return np.arange(self.n_orders, dtype=np.int64)
+        filters = dict(filters or {})
+        ym_range = filters.pop("YearMonth", None)
+        return self.index.select(ym_range, filters)
+
+    def _memo(self, key: Tuple, compute):
+        with self._lock:
+            hit = self._cache.get(key)
+            if hit is not None:
+                self._cache.move_to_end(key)
+                return hit
+        value = compute()
+        with self._lock:
+            self._cache[key] = value
+            while len(self._cache) > BASKET_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return value
+
+    # ------------------------------------------------------------
+    # Pair rules
+    # ------------------------------------------------------------
+    def pair_counts(self, filters: Optional[Mapping[str, object]] = None) -> Tuple[int, np.ndarray, sparse.coo_matrix]:
+        """(orders selected, orders per SKU, SKU x SKU co-occurrence counts) for the selection."""
+
+        def compute():
+            x = self.X[self.select(filters)]
+            co = (x.T @ x).tocoo()
+            item = np.asarray(x.sum(axis=0)).ravel().astype(np.int64)
+            return x.shape[0], item, co
+
+        return self._memo(("pairs", filter_key(filters)), compute)
+
+    def rules(
+        self,
+        filters: Optional[Mapping[str, object]] = None,
+        min_support: float = 0.0,
+        min_confidence: float = 0.0,
+        min_lift: float = 0.0,
+        min_count: int = 1,
+    ) -> pd.DataFrame:
+        """
+        Rules antecedent -> consequent for every SKU pair bought together in
+        at least `min_count` selected orders, in the layout of
+        sku_pair_rules_top200.csv, sorted by lift, confidence and support.
+        """
+        n, item, co = self.pair_counts(filters)
+        a, b, count = co.row, co.col, co.data.astype(np.int64)
+        keep = (a != b) & (count >= max(min_count, int(np.ceil(min_support * n)), 1))
+        a, b, count = a[keep], b[keep], count[keep]
+        if n == 0 or len(count) == 0:
+            return pd.DataFrame(columns=RULE_COLUMNS)
+        support = count / n
+        confidence = count / item[a]
+        lift = confidence * n / item[b]
+        keep = (confidence >= min_confidence) & (lift >= min_lift)
+        labels = pd.Categorical.from_codes(np.arange(len(self.skus)), categories=self.skus)
+        out = pd.DataFrame(
+            {
+                "antecedent": labels.take(a[keep]),
+                "consequent": labels.take(b[keep]),
+                "pair_order_count": count[keep],
+                "support": support[keep],
+                "confidence": confidence[keep],
+                "lift": lift[keep],
+            }
+        )
+        return out.sort_values(["lift", "confidence", "support"], ascending=False, ignore_index=True)
+
+    def rule_index(self, filters: Optional[Mapping[str, object]] = None, min_count: int = 1) -> "RuleIndex":
+        """RuleIndex over `rules(filters, min_count=min_count)`, built once per filter key."""
+        return self._memo(
+            ("rule_index", filter_key(filters), int(min_count)),
+            lambda: RuleIndex(self.rules(filters, min_count=min_count)),
+        )
+
+    # ------------------------------------------------------------
+    # Frequent itemsets (FP-growth)
+    # ------------------------------------------------------------
+    def itemsets(
+        self,
+        filters: Optional[Mapping[str, object]] = None,
+        min_support: float = 0.001,
+        max_len: int = 3,
+    ) -> pd.DataFrame:
+        """Frequent SKU itemsets (up to `max_len` items) with order counts and support."""
+
+        def compute():
+            rows = self.select(filters)
+            n = len(rows)
+            min_count = max(int(np.ceil(min_support * n)), 1)
+            found = _fp_growth(self.X[rows], min_count, max_len)
+            out = pd.DataFrame(
+                {
+                    "itemset": [tuple(self.skus[list(items)]) for items, _ in found],
+                    "size": [len(items) for items, _ in found],
+                    "order_count": [c for _, c in found],
+                },
+                columns=["itemset", "size", "order_count"],
+            )
+            out["support"] = out["order_count"] / n if n else np.nan
+            return out.sort_values(["size", "order_count"], ascending=[False, False], ignore_index=True)
+
+        return self._memo(("itemsets", filter_key(filters), float(min_support), int(max_len)), compute)
+
+
+def filter_rules(rules: pd.DataFrame, min_support: float, min_conf: float, min_lift: float) -> pd.DataFrame:
+    """Rules at or above the support, confidence and lift thresholds (the Tab 5 sliders)."""
+    keep = (rules["support"] >= min_support) & (rules["confidence"] >= min_conf) & (rules["lift"] >= min_lift)
+    return rules[keep]
+
+
+class RuleIndex:
+    """
+    Rule lookup by SKU. Built once per rule set: every SKU gets two adjacency
+    lists of rule ids (rules it appears in, rules it is the antecedent of),
+    stored CSR-style and pre-sorted by lift, confidence and support. Lookups
+    and top-K queries cost O(degree) instead of a scan of the rules table.
+    """
+
+    def __init__(self, rules: pd.DataFrame):
+        rules = rules.reset_index(drop=True)
+        keys = [rules[c].to_numpy(dtype=np.float64) for c in ("support", "confidence", "lift")]
+        rank = np.empty(len(rules), dtype=np.int64)
+        rank[np.lexsort([-k for k in keys])] = np.arange(len(rules))
+        self.rules = rules
+        ante = rules["antecedent"].astype(str).to_numpy()
+        cons = rules["consequent"].astype(str).to_numpy()
+        self._skus = pd.Index(np.unique(np.concatenate([ante, cons])))
+        a = self._skus.get_indexer(ante)
+        b = self._skus.get_indexer(cons)
+        ids = np.arange(len(rules), dtype=np.int64)
+        self._any = self._csr(np.concatenate([a, b]), np.concatenate([ids, ids]), rank)
+        self._out = self._csr(a, ids, rank)
+
+    def _csr(self, owner: np.ndarray, ids: np.ndarray, rank: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        order = np.lexsort((rank[ids], owner))
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(owner, minlength=len(self._skus)))])
+        return offsets, ids[order]
+
+    def _adjacent(self, adj: Tuple[np.ndarray, np.ndarray], sku: str) -> np.ndarray:
+        code = self._skus.get_indexer([sku])[0]
+        if code < 0:
+            return np.empty(0, dtype=np.int64)
+        offsets, ids = adj
+        return ids[offsets[code]:offsets[code + 1]]
+
+    @property
+    def skus(self) -> List[str]:
+        """Every SKU that appears in a rule, sorted."""
+        return self._skus.tolist()
+
+    def degree(self, sku: str) -> int:
+        return len(self._adjacent(self._any, sku))
+
+    def neighbours(self, sku: str) -> pd.DataFrame:
+        """Rules where `sku` is antecedent or consequent, best first."""
+        return self.rules.iloc[self._adjacent(self._any, sku)]
+
+    def related(self, sku: str, k: int = 10) -> pd.DataFrame:
+        """Top-k rules `sku` -> other SKU (one row per consequent), best first."""
+        return self.rules.iloc[self._adjacent(self._out, sku)[:k]]
+
+    def recommend(self, basket: Sequence[str], k: int = 10) -> pd.DataFrame:
+        """
+        SKUs to suggest for a basket: consequents of the basket items' rules
+        that are not already in it, scored by their best lift (then
+        confidence). Work is linear in the basket items' degrees.
+        """
+        ids = [self._adjacent(self._out, sku) for sku in basket]
+        ids = np.concatenate(ids) if ids else np.empty(0, dtype=np.int64)
+        cand = self.rules.iloc[ids]
+        cand = cand[~cand["consequent"].astype(str).isin([str(b) for b in basket])]
+        best = (
+            cand.sort_values(["lift", "confidence"], ascending=False, kind="stable")
+            .drop_duplicates("consequent")
+            .head(k)
+        )
+        return best.rename(columns={"consequent": "sku", "antecedent": "because_of"})[
+            ["sku", "because_of", "lift", "confidence", "support", "pair_order_count"]
+        ].reset_index(drop=True)
+
+
+def _unique_baskets(x: sparse.csr_matrix) -> List[Tuple[Tuple[int, ...], int]]:
+    """Distinct non-empty rows of a binary CSR matrix with their multiplicity."""
+    lengths = np.diff(x.indptr)
+    x = x[lengths > 0]
+    if x.shape[0] == 0:
+        return []
+    # Two independent 64-bit row hashes; distinct baskets colliding on both is negligible.
+    rng = np.random.default_rng(0)
+    w = rng.integers(1, 2**63 - 1, size=(2, x.shape[1]), dtype=np.uint64)
+    starts = x.indptr[:-1]
+    h = np.stack([np.add.reduceat(w[i][x.indices], starts) for i in range(2)], axis=1)
+    _, first, counts = np.unique(h, axis=0, return_index=True, return_counts=True)
+    ind, ptr = x.indices, x.indptr
+    return [(tuple(ind[ptr[r]:ptr[r + 1]].tolist()), int(c)) for r, c in zip(first, counts)]
+
+
+def _fp_growth(x: sparse.csr_matrix, min_count: int, max_len: int) -> List[Tuple[Tuple[int, ...], int]]:
+    """
+    FP-growth over the rows of a binary order x item matrix. Baskets keep only
+    frequent items, ordered by descending frequency, and identical baskets are
+    merged before mining. Returns (item codes, order count) per frequent itemset.
+    """
+    freq = np.asarray(x.sum(axis=0)).ravel()
+    frequent = np.flatnonzero(freq >= min_count)
+    if len(frequent) == 0:
+        return []
+    # Column j of `xf` is the j-th most frequent item, so sorted indices are frequency-ordered.
+    order = frequent[np.argsort(-freq[frequent], kind="stable")]
+    xf = x[:, order].tocsr()
+    xf.sort_indices()
+    db = _unique_baskets(xf)
+
+    found: List[Tuple[Tuple[int, ...], int]] = []
+
+    def mine(db: List[Tuple[Tuple[int, ...], int]], suffix: Tuple[int, ...]) -> None:
+        counts: Counter = Counter()
+        for items, c in db:
+            for it in items:
+                counts[it] += c
+        keep = {it for it, c in counts.items() if c >= min_count}
+        # Conditional pattern base of every frequent item: the frequent items before it.
+        cond: Dict[int, Counter] = {it: Counter() for it in keep}
+        for items, c in db:
+            prefix: List[int] = []
+            for it in items:
+                if it in keep:
+                    if prefix and len(suffix) + 1 < max_len:
+                        cond[it][tuple(prefix)] += c
+                    prefix.append(it)
+        for it in sorted(keep):
+            itemset = (it, *suffix)
+            found.append((itemset, counts[it]))
+            if cond[it]:
+                mine(list(cond[it].items()), itemset)
+
+    mine(db, ())
+    return [(tuple(int(order[i]) for i in items), c) for items, c in found]
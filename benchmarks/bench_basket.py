@@ -0,0 +1,83 @@
+"""
+Benchmark: basket.BasketIndex on synthetic order baskets drawn from the
+sku_summary.csv catalogue (SKU popularity = orders_with_sku). Compares pair
+counting by pandas self-merge on boss_order_id with the sparse X.T @ X
+product, and times FP-growth.
+
+    python benchmarks/bench_basket.py --orders 100000 1000000
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+
+from basket import BasketIndex  # noqa: E402
+
+
+def synthetic_lines(n_orders: int, seed: int = 0) -> pd.DataFrame:
+    """Order lines (boss_order_id, sku): 1 + Poisson(1.3) SKUs per order, some frequent bundles."""
+    rng = np.random.default_rng(seed)
+    catalogue = pd.read_csv(BASE_DIR / "sku_summary.csv").dropna(subset=["sku"])
+    p = catalogue["orders_with_sku"].to_numpy(float)
+    p /= p.sum()
+    skus = catalogue["sku"].to_numpy()
+    per_order = rng.poisson(1.3, n_orders) + 1
+    order_ids = np.repeat(np.arange(n_orders), per_order)
+    lines = rng.choice(len(skus), size=per_order.sum(), p=p)
+    bundle = np.flatnonzero(rng.random(n_orders) < 0.1)
+    first = rng.choice(len(skus), size=len(bundle), p=p)
+    return pd.DataFrame(
+        {
+            "boss_order_id": np.concatenate([order_ids, bundle, bundle]).astype(str),
+            "sku": skus[np.concatenate([lines, first, (first + 1) % len(skus)])],
+        }
+    )
+
+
+def pairs_merge(lines: pd.DataFrame) -> pd.DataFrame:
+    """Pair counts the dataframe way: self-join order lines and count distinct orders per pair."""
+    u = lines.drop_duplicates()
+    m = u.merge(u, on="boss_order_id")
+    m = m[m["sku_x"] != m["sku_y"]]
+    return m.groupby(["sku_x", "sku_y"], observed=True).size()
+
+
+def timed(fn):
+    t = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--orders", type=int, nargs="+", default=[100_000, 1_000_000])
+    ap.add_argument("--min-support", type=float, default=0.0005)
+    args = ap.parse_args()
+
+    print(f"{'orders':>9} {'lines':>9} {'build s':>8} {'merge s':>8} {'X.T@X s':>8} {'speed-up':>8} {'fp s':>6} {'itemsets':>8}")
+    for n in args.orders:
+        lines = synthetic_lines(n)
+        index, t_build = timed(
+            lambda: BasketIndex(pa.array(lines["boss_order_id"]), pa.array(lines["sku"]))
+        )
+        ref, t_merge = timed(lambda: pairs_merge(lines))
+        rules, t_pairs = timed(lambda: index.rules(min_count=1))
+        assert len(rules) == len(ref) and rules["pair_order_count"].sum() == ref.sum()
+        sets, t_fp = timed(lambda: index.itemsets(min_support=args.min_support, max_len=3))
+        print(
+            f"{n:>9,} {len(lines):>9,} {t_build:>8.2f} {t_merge:>8.2f} {t_pairs:>8.2f} "
+            f"{t_merge / t_pairs:>7.1f}x {t_fp:>6.2f} {len(sets):>8,}"
+        )
+
+
+if __name__ == "__main__":
+    main()
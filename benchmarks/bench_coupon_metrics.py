@@ -0,0 +1,93 @@
+"""
+Micro-benchmark: monthly coupon usage via groupby().apply(lambda) (the old
+Tab 3 path) vs metrics.coupon_metrics_by (one groupby().sum() over masked
+columns) vs a cube roll-up.
+
+    python benchmarks/bench_coupon_metrics.py --scale 1 10 50
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import timeit
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+
+import data_store  # noqa: E402
+from cube import Cube  # noqa: E402
+from metrics import COUPON_SUMS, coupon_metrics, coupon_metrics_by  # noqa: E402
+
+
+def scale_months(df: pd.DataFrame, factor: int) -> pd.DataFrame:
+    """Repeat the fact `factor` times on consecutive month spans (more groups, same shape)."""
+    if factor <= 1:
+        return df
+    span = int(df["ym_key"].max() - df["ym_key"].min() + 1)
+    parts = []
+    for i in range(factor):
+        keys = df["ym_key"].to_numpy() + i * span
+        ym = pd.Series([f"{k // 12}-{k % 12 + 1:02d}" for k in range(keys.min(), keys.max() + 1)])
+        labels = ym.to_numpy()[keys - keys.min()]
+        parts.append(df.assign(YearMonth=labels, ym_key=keys))
+    out = pd.concat(parts, ignore_index=True)
+    out["YearMonth"] = pd.Categorical(out["YearMonth"], categories=sorted(out["YearMonth"].unique()), ordered=True)
+    return out
+
+
+def usage_apply(f: pd.DataFrame) -> pd.DataFrame:
+    usage = (
+        f.groupby(["YearMonth"], as_index=False, observed=True)
+        .apply(
+            lambda g: pd.Series(
+                {
+                    "orders": int(np.nansum(g["orders"].to_numpy())),
+                    "coupon_orders": int(np.nansum(g.loc[g["has_coupon"] == True, "orders"].to_numpy())),
+                }
+            )
+        )
+        .reset_index(drop=True)
+        .sort_values("YearMonth")
+    )
+    usage["coupon_usage"] = usage["coupon_orders"] / usage["orders"].replace(0, np.nan)
+    return usage
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--scale", type=int, nargs="+", default=[1, 10])
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    base = data_store.load_prepared(BASE_DIR / "monthly_aggregates.csv")
+    print(f"{'scale':>5} {'rows':>9} {'months':>6} {'apply ms':>9} {'vector ms':>9} {'cube ms':>8} {'speed-up':>8}")
+    for factor in args.scale:
+        df = scale_months(base, factor)
+        cube = Cube.from_frame(df)
+
+        ref = usage_apply(df)
+        got = coupon_metrics_by(df, ["YearMonth"])
+        assert np.allclose(ref["coupon_usage"].to_numpy(float), got["coupon_usage"].to_numpy(float), equal_nan=True)
+
+        t_apply = min(timeit.repeat(lambda: usage_apply(df), number=1, repeat=args.repeat))
+        t_vec = min(timeit.repeat(lambda: coupon_metrics_by(df, ["YearMonth"]), number=1, repeat=args.repeat))
+        # Bypass the roll-up memo so each run measures the aggregation itself.
+        t_cube = min(
+            timeit.repeat(
+                lambda: coupon_metrics(cube._rollup(["YearMonth"], np.arange(cube.n_cells), COUPON_SUMS)),
+                number=1,
+                repeat=args.repeat,
+            )
+        )
+        print(
+            f"{factor:>5} {len(df):>9,} {df['YearMonth'].nunique():>6} "
+            f"{t_apply * 1e3:>9.1f} {t_vec * 1e3:>9.1f} {t_cube * 1e3:>8.1f} {t_apply / t_vec:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
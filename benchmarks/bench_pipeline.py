@@ -0,0 +1,333 @@
+"""
+Headless benchmark of the dashboard pipeline on synthetic data (see synthetic.py).
+
+    python benchmarks/bench_pipeline.py --scale 10 100 1000 --out bench.json
+    python benchmarks/bench_pipeline.py --scale 10 100 --compare bench.json   # exit 1 on a regression
+
+For every scale a dataset is generated into a work directory, then each
+stage the app runs is timed without a browser, through the same modules:
+
+    load.*      CSV parse + prepare (cold cache), memory-mapped reload, cube,
+                time-intelligence prefix sums, forecasts, order partitions,
+                basket index
+    filter.*    the sidebar selections: row index and cube cell selection
+    tab.*       the roll-ups each view issues (cube memo cleared, so every run
+                aggregates), the order audit of the Data Quality view
+    rfm.*       RFM build from the order partitions; segment/cluster/recency
+                filtering and the scatter reduction
+    rules.*     rule mining per selection, slider filtering, SKU drill-down
+
+A step reports the best and median wall time over `--repeat` runs and the
+peak RSS growth above its starting point (RSS sampled by a background
+thread; Linux only, else null). Results go to JSON with the library versions
+and git commit, so runs can be compared across changes.
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+
+import data_store  # noqa: E402
+import rfm_pipeline  # noqa: E402
+from basket import BASKETS_NAME, BasketIndex, filter_rules  # noqa: E402
+from charts import density_sample  # noqa: E402
+from cube import Cube  # noqa: E402
+from filter_engine import FilterIndex  # noqa: E402
+from forecast import Forecast  # noqa: E402
+from metrics import RATIOS  # noqa: E402
+from orders_backend import ORDERS_DIR_NAME, OrderStore, build_partitions  # noqa: E402
+from synthetic import MONTHLY_NAME, ORDER_BASE, ORDERS_NAME, write_dataset  # noqa: E402
+from table_view import OrderPager  # noqa: E402
+from time_intel import MonthPrefix  # noqa: E402
+
+SCALES = [10, 100, 1000]
+MIN_RULE_ORDERS = 5  # as in the app
+REGRESSION = 1.25  # slower than this ratio of the baseline is a regression
+NOISE_FLOOR_S = 0.005  # steps faster than this in the baseline are not compared
+SAMPLE_S = 0.002
+
+# view -> roll-ups it issues: (dims, measures); None = the cube's default measures, "all" = the KPI set.
+TAB_ROLLUPS = {
+    "kpis": [([], "all")],
+    "overview": [(["YearMonth"], None), (["Brands"], ["net_revenue_gbp"]), (["shipping_country"], ["net_revenue_gbp"])],
+    "drivers": [
+        (["shop"], ["net_revenue_gbp", "orders", "aov_gbp", "refund_rate"]),
+        (["campaign_type_clean"], ["net_revenue_gbp"]),
+        (["YearMonth"], ["refund_rate"]),
+    ],
+    "promotions": [(["campaign_type_clean"], ["net_revenue_gbp"]), (["YearMonth"], ["coupon_usage"])],
+}
+
+
+# ============================================================
+# Measurement
+# ============================================================
+def _rss() -> Optional[int]:
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        return None
+
+
+class PeakRSS:
+    """Peak resident memory above the level at entry, sampled every SAMPLE_S seconds."""
+
+    def __enter__(self) -> "PeakRSS":
+        self.start = _rss()
+        self.peak = self.start
+        self._stop = threading.Event()
+        if self.start is not None:
+            self._thread = threading.Thread(target=self._sample, daemon=True)
+            self._thread.start()
+        return self
+
+    def _sample(self) -> None:
+        while not self._stop.wait(SAMPLE_S):
+            self.peak = max(self.peak, _rss())
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        if self.start is not None:
+            self._thread.join()
+            self.peak = max(self.peak, _rss())
+
+    @property
+    def growth_mb(self) -> Optional[float]:
+        return None if self.start is None else (self.peak - self.start) / 1e6
+
+
+def measure(fn: Callable[[], object], repeat: int, setup: Optional[Callable[[], None]] = None) -> dict:
+    times, peaks = [], []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        gc.collect()
+        with PeakRSS() as mem:
+            t = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - t)
+        peaks.append(mem.growth_mb)
+    known = [p for p in peaks if p is not None]
+    return {
+        "wall_s": min(times),
+        "median_s": statistics.median(times),
+        "peak_mb": round(max(known), 1) if known else None,
+    }
+
+
+# ============================================================
+# Workload
+# ============================================================
+def selections(df: pd.DataFrame) -> Dict[str, dict]:
+    """Sidebar filter dicts of increasing selectivity, from the data's most common members."""
+    months = df["YearMonth"].cat.categories if hasattr(df["YearMonth"], "cat") else sorted(df["YearMonth"].unique())
+    months = [str(m) for m in months if (df["YearMonth"] == m).any()]
+    full, last12 = (months[0], months[-1]), (months[max(len(months) - 12, 0)], months[-1])
+
+    def top(col: str, n: int) -> list:
+        if col not in df.columns:
+            return []
+        return df.groupby(col, observed=True)["orders"].sum().nlargest(n).index.tolist()
+
+    return {
+        "all": {"YearMonth": full},
+        "last_12m": {"YearMonth": last12},
+        "brand": {"YearMonth": full, "Brands": top("Brands", 1)},
+        "brand_countries_12m": {"YearMonth": last12, "Brands": top("Brands", 1), "shipping_country": top("shipping_country", 3)},
+        "coupon_campaigns": {"YearMonth": full, "has_coupon": [True], "campaign_type_clean": top("campaign_type_clean", 3)},
+    }
+
+
+def run_scale(work: Path, scale: float, order_base: int, repeat: int, seed: int) -> dict:
+    counts = write_dataset(work, scale, order_base, seed)
+    csv_path = work / MONTHLY_NAME
+    cache = work / data_store.CACHE_DIR_NAME
+    steps: Dict[str, dict] = {}
+
+    def step(name: str, fn: Callable[[], object], setup: Optional[Callable[[], None]] = None, n: int = repeat) -> None:
+        steps[name] = measure(fn, n, setup)
+        print(f"  {name:<32} {steps[name]['wall_s'] * 1e3:>10.1f} ms  {steps[name]['peak_mb'] or 0:>8.1f} MB", flush=True)
+
+    # ---- load
+    step("load.csv_prepare_cold", lambda: data_store.load_prepared(csv_path), setup=lambda: shutil.rmtree(cache, ignore_errors=True))
+    step("load.cached", lambda: data_store.SharedStore(work).frame(MONTHLY_NAME, "prepared"))
+    df = data_store.load_prepared(csv_path)
+    step("load.cube", lambda: Cube.from_frame(df))
+    cube = Cube.from_frame(df)
+    step("load.time_intel", lambda: MonthPrefix(cube))
+    step("load.forecast_hw", lambda: Forecast.fit(cube, "Holt-Winters"))
+    orders_root = work / ORDERS_DIR_NAME
+    step("load.order_partitions", lambda: build_partitions(work / ORDERS_NAME, orders_root), n=1)
+    order_store = OrderStore(orders_root)
+    step("load.basket_index", lambda: BasketIndex.from_files(work / BASKETS_NAME, order_store), n=1)
+    baskets = BasketIndex.from_files(work / BASKETS_NAME, order_store)
+
+    # ---- sidebar filter
+    flts = selections(df)
+    step("filter.row_index_build", lambda: FilterIndex(df))
+    rows = FilterIndex(df)
+    step("filter.rows", lambda: [rows.select(f["YearMonth"], {k: v for k, v in f.items() if k != "YearMonth"}) for f in flts.values()])
+    step("filter.cube_cells", lambda: [cube.select(f) for f in flts.values()])
+
+    # ---- views
+    def views(name: str) -> Callable[[], None]:
+        def run() -> None:
+            for f in flts.values():
+                for dims, measures in TAB_ROLLUPS[name]:
+                    cube.rollup(dims, f, cube.measures + list(RATIOS) if measures == "all" else measures)
+
+        return run
+
+    for name in TAB_ROLLUPS:
+        step(f"tab.{name}", views(name), setup=cube._cache.clear)
+    ti = MonthPrefix(cube)
+    step("tab.time_intel", lambda: [ti.monthly(f) for f in flts.values()], setup=ti._cache.clear)
+
+    def audit() -> None:
+        pager = OrderPager(order_store)
+        for f in flts.values():
+            order_store.distinct_orders(f)
+            pager.page(f, sort_by="Order Total (GBP)", descending=True)
+
+    step("tab.data_quality_orders", audit)
+
+    # ---- RFM
+    rfm_dir = work / "rfm"
+    rfm_dir.mkdir(exist_ok=True)
+    step("rfm.build", lambda: rfm_pipeline.build(rfm_dir, orders_root=orders_root), n=1)
+    rfm = pd.read_csv(rfm_dir / rfm_pipeline.RFM_TABLE)
+    segs = tuple(rfm["RFM_Segment"].value_counts().index[:2])
+    rec = (int(rfm["recency_days"].quantile(0.1)), int(rfm["recency_days"].quantile(0.6)))
+    rfm_keys = [((), (), None), (segs, (), None), ((), (0, 1), rec), (segs, (0,), rec)]
+    step("rfm.filter", lambda: [rfm_pipeline.filter_rfm(rfm, *k) for k in rfm_keys])
+    step(
+        "rfm.scatter_sample",
+        lambda: [density_sample(rfm_pipeline.filter_rfm(rfm, *k), "recency_days", "monetary") for k in rfm_keys],
+    )
+
+    # ---- SKU rules
+    def mine() -> None:
+        baskets._cache.clear()
+        for f in flts.values():
+            baskets.rule_index(f, min_count=MIN_RULE_ORDERS)
+
+    step("rules.mine", mine)
+    rule_index = baskets.rule_index(flts["all"], min_count=MIN_RULE_ORDERS)
+    rules = rule_index.rules
+    thresholds = [(0.0, 0.0, 0.0), (0.0005, 0.1, 1.0), (0.001, 0.3, 2.0)]
+    step("rules.filter", lambda: [filter_rules(rules, *t) for t in thresholds])
+    top_skus = rule_index.skus[:20]
+    step("rules.drill_down", lambda: [(rule_index.neighbours(s), rule_index.recommend([s], k=10)) for s in top_skus])
+
+    return {
+        "scale": scale,
+        **counts,
+        "cube_cells": cube.n_cells,
+        "customers": len(rfm),
+        "rules": len(rules),
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3, 1),
+        "steps": steps,
+    }
+
+
+# ============================================================
+# Report
+# ============================================================
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, capture_output=True, text=True)
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def meta(args: argparse.Namespace) -> dict:
+    return {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "pyarrow": pa.__version__,
+        "repeat": args.repeat,
+        "order_base": args.order_base,
+        "seed": args.seed,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> List[str]:
+    """Steps slower than `threshold` x the baseline, per scale, as printable lines."""
+    base = {r["scale"]: r["steps"] for r in baseline["results"]}
+    out = []
+    for r in current["results"]:
+        old = base.get(r["scale"])
+        if old is None:
+            continue
+        for name, s in r["steps"].items():
+            b = old.get(name)
+            if b is None or b["wall_s"] < NOISE_FLOOR_S:
+                continue
+            ratio = s["wall_s"] / b["wall_s"]
+            if ratio > threshold:
+                out.append(f"x{r['scale']:g} {name}: {b['wall_s'] * 1e3:.1f} -> {s['wall_s'] * 1e3:.1f} ms ({ratio:.2f}x)")
+    return out
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--scale", type=float, nargs="+", default=SCALES)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--order-base", type=int, default=ORDER_BASE, help="Orders per unit of scale.")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", type=Path, default=Path("bench_pipeline.json"))
+    ap.add_argument("--work-dir", type=Path, default=None, help="Keep the generated data here (default: a temp dir).")
+    ap.add_argument("--compare", type=Path, default=None, help="Baseline JSON; exit 1 on regressions.")
+    ap.add_argument("--threshold", type=float, default=REGRESSION)
+    args = ap.parse_args()
+
+    root = args.work_dir or Path(tempfile.mkdtemp(prefix="wolfson_bench_"))
+    results = []
+    try:
+        for scale in args.scale:
+            print(f"x{scale:g}", flush=True)
+            results.append(run_scale(root / f"x{scale:g}", scale, args.order_base, args.repeat, args.seed))
+            gc.collect()
+    finally:
+        if args.work_dir is None:
+            shutil.rmtree(root, ignore_errors=True)
+
+    report = {"meta": meta(args), "results": results}
+    args.out.write_text(json.dumps(report, indent=1))
+    print(f"wrote {args.out}")
+
+    if args.compare is not None:
+        slower = compare(report, json.loads(args.compare.read_text()), args.threshold)
+        print("\n".join(slower) if slower else f"no step slower than {args.threshold:.2f}x the baseline")
+        if slower:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Synthetic datasets for the pipeline benchmarks, at a multiple of the shipped data.
+
+    python benchmarks/synthetic.py --scale 10 --out /tmp/wolfson_x10
+
+writes, into one directory:
+
+    monthly_aggregates.csv  scale x the shipped rows. Rows are resampled from
+                            the shipped fact (month, brand/shop, coupon and
+                            campaign mix, measures) with log-normal noise on
+                            the measures, and a shipping country drawn from
+                            every dim_country member (shipped order share plus
+                            a floor). More rows therefore mean more distinct
+                            cells, not copies.
+    dim_*.csv               the shipped dim tables (the prepared frame is
+                            coded against them)
+    orders.csv              scale x `order_base` orders in the layout of the
+                            order export: cells drawn in proportion to their
+                            orders; payment methods and coupon codes from the
+                            dim tables with Zipf popularity; customers skewed
+                            so most order once; ~5% without a Customer_ID.
+    fact_order_skus.csv     order lines for those orders (bench_basket.synthetic_lines)
+
+The default `order_base` of 10,000 puts the 100x order file at ~1M orders,
+the size of the real export.
+"""
+from __future__ import annotations
+
+import argparse
+import shutil
+import sys
+from pathlib import Path
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+
+from bench_basket import synthetic_lines  # noqa: E402
+from basket import BASKETS_NAME  # noqa: E402
+from data_store import DIM_TABLES, load_dims  # noqa: E402
+
+MONTHLY_NAME = "monthly_aggregates.csv"
+ORDERS_NAME = "orders.csv"
+ORDER_BASE = 10_000
+COUNTRY_FLOOR = 0.002  # share of every dim_country member absent from the shipped fact
+MISSING_CUSTOMER = 0.05
+REPEAT_SKEW = 2.0  # customer id = n_customers * u ** REPEAT_SKEW
+
+
+def _zipf(n: int) -> np.ndarray:
+    p = 1.0 / np.arange(1, n + 1)
+    return p / p.sum()
+
+
+def _write_csv(df: pd.DataFrame, path: Path) -> None:
+    pacsv.write_csv(pa.Table.from_pandas(df, preserve_index=False), path)
+
+
+def monthly_fact(scale: float, seed: int = 0, base_dir: Path = BASE_DIR) -> pd.DataFrame:
+    """`scale` x the shipped monthly_aggregates.csv rows, in its raw layout."""
+    rng = np.random.default_rng(seed)
+    base = pd.read_csv(base_dir / MONTHLY_NAME)
+    n = max(int(round(scale * len(base))), 1)
+    out = base.iloc[rng.integers(0, len(base), n)].reset_index(drop=True)
+
+    countries = load_dims(base_dir, ["shipping_country"]).get("shipping_country")
+    if countries is not None and len(countries):
+        share = base.groupby("shipping_country")["orders"].sum().reindex(countries, fill_value=0)
+        p = share.to_numpy(np.float64) / max(share.sum(), 1) + COUNTRY_FLOOR
+        out["shipping_country"] = countries.to_numpy()[rng.choice(len(countries), n, p=p / p.sum())]
+
+    noise = rng.lognormal(0.0, 0.25, n)
+    orders = np.maximum(np.rint(out["orders"].to_numpy(np.float64) * noise), 1)
+    factor = orders / out["orders"].to_numpy(np.float64)
+    out["orders"] = orders.astype(np.int64)
+    for col in ("net_revenue_gbp", "order_total_gbp", "refund_gbp"):
+        out[col] = out[col] * factor
+    out["aov_gbp"] = out["net_revenue_gbp"] / out["orders"]
+    out["refund_rate"] = out["refund_gbp"] / out["order_total_gbp"].where(out["order_total_gbp"] != 0)
+    return out
+
+
+def order_export(monthly: pd.DataFrame, n_orders: int, seed: int = 0, base_dir: Path = BASE_DIR) -> pd.DataFrame:
+    """`n_orders` orders in the layout of the order export, drawn from the cells of `monthly`."""
+    rng = np.random.default_rng(seed + 1)
+    w = monthly["orders"].to_numpy(np.float64)
+    cell = monthly.iloc[rng.choice(len(monthly), n_orders, p=w / w.sum())].reset_index(drop=True)
+    dims = load_dims(base_dir, ["payment_method", "coupon_code"])
+
+    day = rng.integers(1, 29, n_orders)
+    n_customers = max(int(n_orders * 0.55), 1)
+    customer = np.floor(n_customers * rng.random(n_orders) ** REPEAT_SKEW).astype(np.int64)
+    customer_id = pd.Series("C" + pd.Series(customer).astype(str))
+    customer_id[rng.random(n_orders) < MISSING_CUSTOMER] = None
+
+    per_order_total = (cell["order_total_gbp"] / cell["orders"]).to_numpy(np.float64)
+    total = per_order_total * rng.lognormal(0.0, 0.5, n_orders)
+    refunded = rng.random(n_orders) < cell["refund_rate"].fillna(0).to_numpy(np.float64)
+    refund = np.where(refunded, total, 0.0)
+
+    out = pd.DataFrame(
+        {
+            "boss_order_id": pd.Series(np.arange(n_orders)).astype(str),
+            "order_date": cell["YearMonth"].astype(str) + "-" + pd.Series(day).map("{:02d}".format),
+            "Company": cell["Company"],
+            "Brands": cell["Brands"],
+            "shop": cell["shop"],
+            "shipping_country": cell["shipping_country"],
+            "campaign_type_clean": cell["campaign_type_clean"],
+            "has_coupon": cell["has_coupon"].astype(bool),
+            "Customer_ID": customer_id,
+            "Order Total (GBP)": total,
+            "Refund (GBP)": refund,
+            "net_revenue_gbp": total - refund,
+            "Discount_rate": cell["avg_discount_rate"].fillna(0).to_numpy(np.float64),
+        }
+    )
+    for col in ("payment_method", "coupon_code"):
+        members = dims.get(col)
+        if members is None or not len(members):
+            continue
+        values = pd.Series(members.to_numpy()[rng.choice(len(members), n_orders, p=_zipf(len(members)))])
+        out[col] = values.where(out["has_coupon"]) if col == "coupon_code" else values
+    return out
+
+
+def write_dataset(
+    out_dir: Path, scale: float, order_base: int = ORDER_BASE, seed: int = 0, base_dir: Path = BASE_DIR
+) -> Dict[str, int]:
+    """Write the synthetic dataset for `scale` into `out_dir`; returns its row counts."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for name in DIM_TABLES:
+        if (base_dir / name).exists():
+            shutil.copy2(base_dir / name, out_dir / name)
+    if (base_dir / "dim_date.csv").exists():
+        shutil.copy2(base_dir / "dim_date.csv", out_dir / "dim_date.csv")
+
+    monthly = monthly_fact(scale, seed, base_dir)
+    _write_csv(monthly, out_dir / MONTHLY_NAME)
+    n_orders = max(int(round(scale * order_base)), 1)
+    _write_csv(order_export(monthly, n_orders, seed, base_dir), out_dir / ORDERS_NAME)
+    lines = synthetic_lines(n_orders, seed)
+    _write_csv(lines, out_dir / BASKETS_NAME)
+    return {"monthly_rows": len(monthly), "orders": n_orders, "order_lines": len(lines)}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--scale", type=float, required=True)
+    ap.add_argument("--out", type=Path, required=True)
+    ap.add_argument("--order-base", type=int, default=ORDER_BASE, help="Orders per unit of scale.")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+    counts = write_dataset(args.out, args.scale, args.order_base, args.seed)
+    print(", ".join(f"{k}={v:,}" for k, v in counts.items()), "->", args.out)
+
+
+if __name__ == "__main__":
+    main()
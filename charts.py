@@ -0,0 +1,334 @@
+"""
+Chart helpers: the Wolfson Plotly templates, a figure cache, and a
+density-aware scatter for large point sets.
+
+Templates: the light and dark styles are registered once as Plotly templates
+("wolfson_light" / "wolfson_dark") holding only what the dashboard sets, so
+theming a figure is a single layout update and the template shipped with each
+figure is ~1 KB instead of the ~7 KB of plotly_white.
+
+Figure cache: figures are reused across reruns and sessions while their
+(chart id, data fingerprint, dark mode) key is unchanged, with hit/miss
+counters per chart id.
+
+Density scatter:
+
+Small sets are drawn point for point with WebGL (scattergl). Larger ones are
+reduced to a 2D grid of counts over the central quantile box plus the exact
+rows that matter visually: points outside the box (the tails) and points in
+near-empty cells. The browser gets a bins x bins grid and at most
+`max_points` markers, whatever the number of rows, and every row is counted.
+
+Reduction (`density_sample`) and drawing (`density_figure`) are separate so
+the app can cache the reduced data per filter key.
+
+Forecast overlay: `add_forecast` draws a forecast line and its interval band
+(forecast.Forecast.total) after the history of a line chart.
+"""
+from __future__ import annotations
+
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, fields, is_dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+
+LIGHT_TEMPLATE = "wolfson_light"
+DARK_TEMPLATE = "wolfson_dark"
+
+FIGURE_CACHE_SIZE = 128
+
+MAX_POINTS = 2000
+BINS = 60
+TAIL_Q = 0.005  # each axis' bulk box is [TAIL_Q, 1 - TAIL_Q]
+SPARSE_CELL = 2  # cells with at most this many rows are drawn as points
+
+FORECAST_COLOR = "#f59e0b"
+FORECAST_BAND = "rgba(245,158,11,0.18)"
+
+DENSITY_SCALE = [[0.0, "rgba(59,130,246,0.15)"], [1.0, "rgba(30,64,175,0.95)"]]
+
+
+# ============================================================
+# Templates
+# ============================================================
+_PALETTES = {
+    LIGHT_TEMPLATE: dict(
+        bg="white", font="#111827", axis_line="rgba(0,0,0,0.55)", grid="rgba(0,0,0,0.10)"
+    ),
+    DARK_TEMPLATE: dict(
+        bg="#0f172a", font="#e5e7eb", axis_line="rgba(255,255,255,0.55)", grid="rgba(255,255,255,0.10)"
+    ),
+}
+
+
+def _template(bg: str, font: str, axis_line: str, grid: str) -> go.layout.Template:
+    base = pio.templates["plotly"].layout
+    axis = dict(
+        showline=True,
+        linewidth=1.1,
+        linecolor=axis_line,
+        mirror=True,
+        ticks="outside",
+        ticklen=4,
+        tickwidth=1,
+        showgrid=True,
+        gridwidth=0.7,
+        gridcolor=grid,
+        zerolinecolor=grid,
+        tickfont=dict(color=font),
+        title=dict(font=dict(color=font)),
+    )
+    return go.layout.Template(
+        layout=dict(
+            colorway=base.colorway,
+            colorscale=base.colorscale,
+            paper_bgcolor=bg,
+            plot_bgcolor=bg,
+            margin=dict(l=12, r=12, t=46, b=12),
+            title=dict(x=0.01, xanchor="left", font=dict(color=font)),
+            font=dict(size=13, color=font),
+            xaxis=axis,
+            yaxis=axis,
+        )
+    )
+
+
+def register_templates() -> None:
+    """Register the light/dark templates with plotly.io (idempotent)."""
+    for name, palette in _PALETTES.items():
+        if name not in pio.templates:
+            pio.templates[name] = _template(**palette)
+
+
+def template_name(is_dark: bool) -> str:
+    return DARK_TEMPLATE if is_dark else LIGHT_TEMPLATE
+
+
+register_templates()
+
+
+# ============================================================
+# Figure cache
+# ============================================================
+def fingerprint(*parts: object) -> str:
+    """Content hash of the data behind a chart (frames, arrays, dataclasses, scalars)."""
+    h = hashlib.blake2b(digest_size=16)
+
+    def feed(p: object) -> None:
+        if isinstance(p, pd.DataFrame):
+            h.update(repr(list(p.columns)).encode())
+            h.update(pd.util.hash_pandas_object(p, index=False).to_numpy().tobytes())
+        elif isinstance(p, np.ndarray):
+            h.update(repr((p.dtype.str, p.shape)).encode())
+            h.update(np.ascontiguousarray(p).tobytes())
+        elif is_dataclass(p):
+            for f in fields(p):
+                feed(getattr(p, f.name))
+        elif isinstance(p, (tuple, list)):
+            for q in p:
+                feed(q)
+        else:
+            h.update(repr(p).encode())
+        h.update(b"|")
+
+    for part in parts:
+        feed(part)
+    return h.hexdigest()
+
+
+class FigureCache:
+    """Thread-safe LRU of built figures keyed on (chart id, data fingerprint, dark mode)."""
+
+    def __init__(self, max_entries: int = FIGURE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._figs: "OrderedDict[Tuple[str, str, bool], go.Figure]" = OrderedDict()
+        self._counts: Dict[str, List[int]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, chart_id: str, data: object, is_dark: bool, build: Callable[[], go.Figure]) -> go.Figure:
+        key = (chart_id, fingerprint(data), is_dark)
+        with self._lock:
+            counts = self._counts.setdefault(chart_id, [0, 0])
+            fig = self._figs.get(key)
+            if fig is not None:
+                self._figs.move_to_end(key)
+                counts[0] += 1
+                return fig
+            counts[1] += 1
+        fig = build()
+        with self._lock:
+            self._figs[key] = fig
+            while len(self._figs) > self.max_entries:
+                self._figs.popitem(last=False)
+        return fig
+
+    def stats(self) -> pd.DataFrame:
+        with self._lock:
+            rows = [{"chart": k, "hits": h, "misses": m} for k, (h, m) in sorted(self._counts.items())]
+        return pd.DataFrame(rows, columns=["chart", "hits", "misses"])
+
+
+# ============================================================
+# Density scatter
+# ============================================================
+@dataclass
+class Density:
+    """A scatter reduced for drawing: count grid (None when exact) and the rows to draw as points."""
+
+    points: pd.DataFrame
+    n_total: int
+    x_edges: Optional[np.ndarray] = None
+    y_edges: Optional[np.ndarray] = None
+    counts: Optional[np.ndarray] = None  # (x bins, y bins), point cells zeroed
+
+    @property
+    def exact(self) -> bool:
+        return self.counts is None
+
+
+def density_sample(
+    df: pd.DataFrame,
+    x: str,
+    y: str,
+    keep: Sequence[str] = (),
+    max_points: int = MAX_POINTS,
+    bins: int = BINS,
+    tail_q: float = TAIL_Q,
+) -> Density:
+    """Reduce df[[x, y]] to a count grid plus tail/sparse points (or all points when few)."""
+    cols = list(dict.fromkeys([x, y, *keep]))
+    xv = df[x].to_numpy(np.float64)
+    yv = df[y].to_numpy(np.float64)
+    ok = np.isfinite(xv) & np.isfinite(yv)
+    if ok.sum() <= max_points:
+        return Density(df.loc[ok, cols].reset_index(drop=True), int(ok.sum()))
+
+    xv, yv, rows = xv[ok], yv[ok], np.flatnonzero(ok)
+    x0, x1 = np.quantile(xv, [tail_q, 1 - tail_q])
+    y0, y1 = np.quantile(yv, [tail_q, 1 - tail_q])
+    x1, y1 = max(x1, x0 + 1e-9), max(y1, y0 + 1e-9)
+    inside = (xv >= x0) & (xv <= x1) & (yv >= y0) & (yv <= y1)
+
+    x_edges = np.linspace(x0, x1, bins + 1)
+    y_edges = np.linspace(y0, y1, bins + 1)
+    xi = np.clip(np.searchsorted(x_edges, xv, side="right") - 1, 0, bins - 1)
+    yi = np.clip(np.searchsorted(y_edges, yv, side="right") - 1, 0, bins - 1)
+    cell_all = xi * bins + yi
+
+    # Tails first, most extreme (in box widths) first; sparse cells fill what is left.
+    # Tail rows beyond the budget are counted in the border cell they clip to.
+    out = np.flatnonzero(~inside)
+    dist = np.maximum.reduce(
+        [(x0 - xv[out]) / (x1 - x0), (xv[out] - x1) / (x1 - x0), (y0 - yv[out]) / (y1 - y0), (yv[out] - y1) / (y1 - y0)]
+    )
+    by_dist = out[np.argsort(-dist, kind="stable")]
+    tail, clipped = by_dist[:max_points], by_dist[max_points:]
+    cell = cell_all[inside]
+    counts = np.bincount(cell, minlength=bins * bins) + np.bincount(cell_all[clipped], minlength=bins * bins)
+    budget = max_points - len(tail)
+    sparse = np.empty(0, dtype=np.int64)
+    if budget > 0:
+        in_rows = np.flatnonzero(inside)
+        cell_n = counts[cell]
+        cand = np.flatnonzero(cell_n <= SPARSE_CELL)
+        cand = cand[np.argsort(cell_n[cand], kind="stable")][:budget]
+        sparse = in_rows[cand]
+        # Cells whose every row is drawn as a point leave the grid.
+        drawn = np.bincount(cell[cand], minlength=bins * bins)
+        counts = np.where(drawn == counts, 0, counts)
+
+    points = df.iloc[rows[np.concatenate([tail, sparse])]][cols].reset_index(drop=True)
+    return Density(points, len(xv), x_edges, y_edges, counts.reshape(bins, bins))
+
+
+def _hover(points: pd.DataFrame, x: str, y: str, hover: Sequence[str]) -> dict:
+    fields = [x, y, *[c for c in hover if c not in (x, y)]]
+    return dict(
+        customdata=points[fields[2:]].to_numpy() if len(fields) > 2 else None,
+        hovertemplate="<br>".join(
+            [f"{x}=%{{x}}", f"{y}=%{{y}}"] + [f"{c}=%{{customdata[{i}]}}" for i, c in enumerate(fields[2:])]
+        )
+        + "<extra></extra>",
+    )
+
+
+def density_figure(
+    d: Density,
+    x: str,
+    y: str,
+    hover: Sequence[str] = (),
+    size: Optional[str] = None,
+    name: str = "rows",
+) -> go.Figure:
+    """Heatmap of the count grid under scattergl markers for the exact points (float32 payload)."""
+    fig = go.Figure()
+    if not d.exact:
+        xc = (d.x_edges[:-1] + d.x_edges[1:]) / 2
+        yc = (d.y_edges[:-1] + d.y_edges[1:]) / 2
+        z = d.counts.T.astype(float)
+        z[z == 0] = np.nan
+        fig.add_trace(
+            go.Heatmap(
+                x=xc.astype(np.float32),
+                y=yc.astype(np.float32),
+                z=np.log10(z).astype(np.float32),
+                customdata=d.counts.T.astype(np.int32),
+                colorscale=DENSITY_SCALE,
+                showscale=False,
+                hovertemplate=f"{x}≈%{{x:.4g}}<br>{y}≈%{{y:.4g}}<br>{name}=%{{customdata}}<extra></extra>",
+                name=name,
+            )
+        )
+    marker = dict(color="#2563eb", opacity=0.75 if d.exact else 0.9, size=6)
+    if size is not None and len(d.points):
+        s = d.points[size].to_numpy(np.float32)
+        marker.update(size=s, sizemode="area", sizeref=2.0 * np.nanmax(s) / 20.0 ** 2, sizemin=3)
+    fig.add_trace(
+        go.Scattergl(
+            x=d.points[x].to_numpy(np.float32),
+            y=d.points[y].to_numpy(np.float32),
+            mode="markers",
+            marker=marker,
+            name="points" if d.exact else "tails & sparse",
+            **_hover(d.points, x, y, hover),
+        )
+    )
+    fig.update_layout(showlegend=False, xaxis_title=x, yaxis_title=y)
+    return fig
+
+
+# ============================================================
+# Forecast overlay
+# ============================================================
+def add_forecast(fig: go.Figure, band: pd.DataFrame, label: str, interval: str = "interval") -> go.Figure:
+    """Interval band (lower/upper) and dashed forecast line of `band` on `fig`'s x axis."""
+    x = band["YearMonth"].tolist()
+    fig.add_trace(
+        go.Scatter(
+            x=x + x[::-1],
+            y=np.r_[band["upper"].to_numpy(), band["lower"].to_numpy()[::-1]],
+            fill="toself",
+            fillcolor=FORECAST_BAND,
+            line=dict(width=0),
+            hoverinfo="skip",
+            name=interval,
+        )
+    )
+    fig.add_trace(
+        go.Scatter(
+            x=x,
+            y=band["forecast"],
+            mode="lines+markers",
+            line=dict(color=FORECAST_COLOR, dash="dash"),
+            customdata=band[["lower", "upper"]].to_numpy(),
+            hovertemplate="%{x}: %{y:,.0f} (%{customdata[0]:,.0f} – %{customdata[1]:,.0f})<extra></extra>",
+            name=label,
+        )
+    )
+    return fig
@@ -0,0 +1,197 @@
+"""
+Materialised aggregate cube over the monthly fact.
+
+Cells are YearMonth x Company x Brands x shop x shipping_country x has_coupon
+x campaign_type_clean with additive measures only. The cube is built once per
+data version; every KPI and chart is a roll-up of the cells selected by the
+sidebar filters (`Cube.rollup(dims, filters)`), done with `np.bincount` over
+category codes instead of a pandas groupby on the fact rows. Ratio measures
+(metrics.RATIOS) are divided after the roll-up.
+"""
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from data_store import year_month_key
+from filter_engine import FilterIndex
+from metrics import MASKED_COLUMNS, RATIOS, add_masked_columns, derive_ratios, required_sums
+
+CUBE_DIMS = ["YearMonth", "Company", "Brands", "shop", "shipping_country", "has_coupon", "campaign_type_clean"]
+
+# Additive measures: name -> function of the prepared frame.
+ADDITIVE_MEASURES = {
+    "orders": lambda d: d["orders"],
+    "net_revenue_gbp": lambda d: d["net_revenue_gbp"],
+    "order_total_gbp": lambda d: d["order_total_gbp"],
+    "refund_gbp": lambda d: d["refund_gbp"],
+    # Discount rate weighted by order total (numerator of the DAX weighted average).
+    # Cells without a rate are left out of both sums, like DAX skips blank rows.
+    "discount_wsum": lambda d: d["avg_discount_rate"].fillna(0) * d["order_total_gbp"],
+    "discount_weight": lambda d: d["order_total_gbp"].where(d["avg_discount_rate"].notna(), 0),
+    # has_coupon splits (see metrics.MASKED_COLUMNS).
+    **{name: (lambda d, name=name: d[name]) for name in MASKED_COLUMNS},
+    # Coverage counters (aggregate_store.COVERAGE_COUNTERS). Cells without
+    # counters (NaN) are left out of the covered_* denominators.
+    "orders_with_customer_id": lambda d: d["orders_with_customer_id"].fillna(0),
+    "orders_has_coupon_with_code": lambda d: d["orders_has_coupon_with_code"].fillna(0),
+    "covered_orders": lambda d: d["orders"].where(d["orders_with_customer_id"].notna(), 0),
+    "covered_coupon_orders": lambda d: d["orders"].where(
+        d["orders_with_customer_id"].notna() & d["has_coupon"].astype(bool), 0
+    ),
+}
+
+ROLLUP_CACHE_SIZE = 256
+
+
+def filter_key(filters: Optional[Mapping[str, object]]) -> Tuple:
+    """Hashable, order-independent key for a filter dict."""
+    if not filters:
+        return ()
+    items = []
+    for col, value in filters.items():
+        if value is None or (not isinstance(value, tuple) and len(value) == 0):
+            continue
+        if isinstance(value, tuple):
+            items.append((col, value))
+        else:
+            items.append((col, tuple(sorted(value, key=str))))
+    return tuple(sorted(items))
+
+
+class Cube:
+    def __init__(self, cells: pd.DataFrame):
+        self.cells = cells
+        self.index = FilterIndex(cells)
+        self.dims = [d for d in CUBE_DIMS if d in cells.columns]
+        self.measures = [c for c in cells.columns if c not in self.dims and c != "ym_key"]
+        self._values = {m: cells[m].to_numpy(dtype=np.float64) for m in self.measures}
+        self._labels: Dict[str, pd.Index] = {}
+        self._codes: Dict[str, np.ndarray] = {}
+        for d in self.dims:
+            s = cells[d]
+            cat = pd.Categorical(s, categories=[False, True]) if s.dtype == bool else s.astype("category").array
+            self._labels[d] = pd.Index(cat.categories)
+            self._codes[d] = np.asarray(cat.codes, dtype=np.int64)
+        self._cache: "OrderedDict[Tuple, pd.DataFrame]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "Cube":
+        """Aggregate a prepared (see data_store.prepare_monthly) frame into cube cells."""
+        dims = [d for d in CUBE_DIMS if d in df.columns]
+        df = add_masked_columns(df)
+        src = {d: df[d] for d in dims}
+        for name, fn in ADDITIVE_MEASURES.items():
+            try:
+                src[name] = fn(df).astype("float64")
+            except KeyError:
+                continue
+        cells = (
+            pd.DataFrame(src)
+            .groupby(dims, observed=True, sort=False, dropna=False)
+            .sum()
+            .reset_index()
+        )
+        if "YearMonth" in cells.columns:
+            cells["ym_key"] = year_month_key(cells["YearMonth"])
+            cells = cells.sort_values("ym_key", kind="stable", ignore_index=True)
+        return cls(cells)
+
+    def replace_months(self, df: pd.DataFrame, months: Sequence[str]) -> "Cube":
+        """
+        New cube where the cells of `months` are rebuilt from `df` (prepared
+        rows of those months only); cells of every other month are reused.
+        """
+        months = {str(m) for m in months}
+        keep = self.cells[~self.cells["YearMonth"].astype(str).isin(months)]
+        parts = [keep]
+        if len(df):
+            parts.append(Cube.from_frame(df).cells)
+        cells = pd.concat(parts, ignore_index=True)
+        # A measure only one half has (e.g. coverage counters) is 0 in the other.
+        measures = [c for c in cells.columns if c not in self.dims and c != "ym_key"]
+        cells[measures] = cells[measures].fillna(0)
+        for d in self.dims:
+            # Months may bring new labels; keep the categories (dim members) of both halves.
+            if d != "has_coupon":
+                cats = union_categoricals(
+                    [p[d].astype("category") for p in parts], sort_categories=True, ignore_order=True
+                ).categories
+                cells[d] = pd.Categorical(cells[d].astype(object), categories=cats)
+        cells = cells.sort_values("ym_key", kind="stable", ignore_index=True)
+        return Cube(cells)
+
+    @property
+    def n_cells(self) -> int:
+        return len(self.cells)
+
+    def labels(self, dim: str) -> list:
+        return self._labels[dim].tolist() if dim in self._labels else []
+
+    def select(self, filters: Optional[Mapping[str, object]] = None) -> np.ndarray:
+        """Cell positions selected by a filter dict ({"YearMonth": (from, to), dim: [values]})."""
+        filters = dict(filters or {})
+        ym_range = filters.pop("YearMonth", None)
+        return self.index.select(ym_range, filters)
+
+    def rollup(
+        self,
+        dims: Sequence[str] = (),
+        filters: Optional[Mapping[str, object]] = None,
+        measures: Optional[Sequence[str]] = None,
+    ) -> pd.DataFrame:
+        """
+        Sum the additive measures of the filtered cells by `dims`; ratio
+        measures named in `measures` are derived from the summed parts.
+        Results are memoised per (dims, filters, measures); treat them as read-only.
+        """
+        dims = [d for d in dims if d in self._labels]
+        measures = [
+            m for m in (measures or self.measures)
+            if m in self._values or (m in RATIOS and all(c in self._values for c in RATIOS[m]))
+        ]
+        key = (tuple(dims), filter_key(filters), tuple(measures))
+        with self._lock:
+            hit = self._cache.get(key)
+            if hit is not None:
+                self._cache.move_to_end(key)
+                return hit
+
+        sums = self._rollup(dims, self.select(filters), required_sums(measures))
+        out = derive_ratios(sums, [m for m in measures if m in RATIOS])[dims + measures]
+        with self._lock:
+            self._cache[key] = out
+            while len(self._cache) > ROLLUP_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return out
+
+    def _rollup(self, dims: List[str], cells: np.ndarray, measures: List[str]) -> pd.DataFrame:
+        if not dims:
+            data = {m: [float(self._values[m][cells].sum())] for m in measures}
+            out = pd.DataFrame(data)
+        else:
+            # Mixed-radix group id over the category codes (+1 so missing is 0).
+            gid = np.zeros(len(cells), dtype=np.int64)
+            for d in dims:
+                gid = gid * (len(self._labels[d]) + 1) + (self._codes[d][cells] + 1)
+            groups, inverse = np.unique(gid, return_inverse=True)
+            data = {}
+            rest = groups.copy()
+            for d in reversed(dims):
+                radix = len(self._labels[d]) + 1
+                # Trailing None decodes the "missing" code (-1).
+                data[d] = np.append(self._labels[d].to_numpy(dtype=object), None)[rest % radix - 1]
+                rest //= radix
+            data = {d: data[d] for d in dims}
+            for m in measures:
+                data[m] = np.bincount(inverse, weights=self._values[m][cells], minlength=len(groups))
+            out = pd.DataFrame(data).infer_objects()
+        if "orders" in out.columns:
+            out["orders"] = out["orders"].round().astype("int64")
+        return out
@@ -0,0 +1,610 @@
+"""
+Typed columnar cache for the dashboard CSVs.
+
+Each CSV is parsed once into an Arrow IPC file under `.data_cache/` with
+categorical dimensions and 32-bit measures. Later loads memory-map that file
+and only re-parse the CSV when its size/mtime (and then its content hash)
+changes.
+
+The dim_*.csv tables are the dictionaries of the fact dimensions: the
+prepared monthly fact stores each dimension as small-integer codes against
+its dim members (see `load_dims`), and is rebuilt when a dim file changes.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+
+CACHE_DIR_NAME = ".data_cache"
+
+# Bump when the typing rules below change so stale cache files are rebuilt.
+SCHEMA_VERSION = 3
+
+# Dimension columns of monthly_aggregates.csv (the fact grain of the app).
+DIMENSIONS = ["YearMonth", "Company", "Brands", "shop", "shipping_country", "campaign_type_clean"]
+
+# Dimension tables (one member per row, header = fact column) -> the column they encode.
+DIM_TABLES = {
+    "dim_company.csv": "Company",
+    "dim_brand.csv": "Brands",
+    "dim_shop.csv": "shop",
+    "dim_country.csv": "shipping_country",
+    "dim_campaign.csv": "campaign_type_clean",
+    "dim_payment.csv": "payment_method",
+    "dim_coupon.csv": "coupon_code",
+}
+
+# Columns whose categories have a natural order (range filters compare them).
+ORDERED_CATEGORIES = {"YearMonth"}
+
+# Explicit dtypes per dataset. Columns not listed are inferred by _downcast().
+DTYPES: Dict[str, Dict[str, str]] = {
+    "monthly_aggregates.csv": {
+        **{c: "category" for c in DIMENSIONS},
+        "has_coupon": "bool",
+        "orders": "int32",
+        "net_revenue_gbp": "float32",
+        "order_total_gbp": "float32",
+        "refund_gbp": "float32",
+        "avg_discount_rate": "float32",
+        "aov_gbp": "float32",
+        "refund_rate": "float32",
+    },
+    "rfm_target_list.csv": {
+        "Customer_ID": "object",
+        "last_order_date": "object",
+        "RFM_Segment": "category",
+    },
+    "rfm_customer_table.csv": {
+        "Customer_ID": "object",
+        "last_order_date": "object",
+        "RFM_Segment": "category",
+    },
+    "sku_summary.csv": {"sku": "object"},
+    "audit_top_orders_by_order_total_gbp.csv": {"coupon_code": "object", "order_date": "object"},
+}
+
+# Datasets that also have a "prepared" stage (see load_prepared).
+PREPARED_DATASETS = ["monthly_aggregates.csv"]
+
+# Warm-up: parallel loads, and CSVs above this size are left to their own loaders
+# (order exports, basket lines).
+WARM_WORKERS = 8
+WARM_MAX_BYTES = 64 << 20
+
+# Object columns with at most this share of distinct values become categorical.
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+
+
+# ============================================================
+# Versioning
+# ============================================================
+def source_version(path: Path) -> str:
+    """Cheap version string for a source file (size + mtime)."""
+    st = Path(path).stat()
+    return f"{st.st_size}-{st.st_mtime_ns}"
+
+
+def _file_hash(path: Path, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _cache_paths(path: Path, cache_dir: Optional[Path], stage: str = "") -> tuple:
+    cache_dir = Path(cache_dir) if cache_dir is not None else path.parent / CACHE_DIR_NAME
+    stem = f"{path.stem}.{stage}" if stage else path.stem
+    return cache_dir / f"{stem}.arrow", cache_dir / f"{stem}.meta.json"
+
+
+def _read_meta(meta_path: Path) -> Optional[dict]:
+    try:
+        return json.loads(meta_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(meta_path: Path, meta: dict) -> None:
+    tmp = meta_path.with_suffix(meta_path.suffix + f".{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(meta, indent=2), encoding="utf-8")
+    os.replace(tmp, meta_path)
+
+
+def _file_state(path: Path) -> dict:
+    st = path.stat()
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": _file_hash(path)}
+
+
+def _same_file(state: dict, path: Path) -> Optional[bool]:
+    """
+    Whether `path` still matches a recorded `_file_state`: size/mtime first,
+    then the content hash. Returns None when only the mtime moved (e.g. a
+    fresh checkout) and the content is unchanged; `state` is updated in place.
+    """
+    st = path.stat()
+    if state.get("size") == st.st_size and state.get("mtime_ns") == st.st_mtime_ns:
+        return True
+    if state.get("size") != st.st_size or state.get("sha256") != _file_hash(path):
+        return False
+    state["mtime_ns"] = st.st_mtime_ns
+    return None
+
+
+def _is_fresh(path: Path, data_path: Path, meta_path: Path, deps: Sequence[Path] = ()) -> bool:
+    """
+    True when the cached file still matches the source CSV and the files it
+    was built from (`deps`). If only mtimes moved the meta file is refreshed.
+    """
+    meta = _read_meta(meta_path)
+    if meta is None or not data_path.exists() or meta.get("schema_version") != SCHEMA_VERSION:
+        return False
+    dep_states = meta.get("deps", {})
+    if sorted(dep_states) != sorted(p.name for p in deps):
+        return False
+    checks = [_same_file(meta, path)] + [_same_file(dep_states[p.name], p) for p in deps]
+    if False in checks:
+        return False
+    if None in checks:
+        try:
+            _write_meta(meta_path, meta)
+        except OSError:
+            pass
+    return True
+
+
+# ============================================================
+# Typing
+# ============================================================
+def _as_category(s: pd.Series, ordered: bool = False) -> pd.Series:
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        return s
+    if ordered:
+        cats = sorted(s.dropna().unique().tolist())
+        return pd.Series(pd.Categorical(s, categories=cats, ordered=True), index=s.index, name=s.name)
+    return s.astype("category")
+
+
+def _coerce_bool(s: pd.Series) -> pd.Series:
+    if s.dtype == bool:
+        return s
+    mapped = s.astype("string").str.strip().str.lower().map({"true": True, "1": True, "false": False, "0": False})
+    return mapped.fillna(False).astype(bool)
+
+
+def _downcast(df: pd.DataFrame, dtypes: Dict[str, str]) -> pd.DataFrame:
+    """Apply explicit dtypes, then shrink everything else that is safe to shrink."""
+    out = {}
+    n = len(df)
+    for col in df.columns:
+        s = df[col]
+        want = dtypes.get(col)
+        if want == "category":
+            s = _as_category(s, ordered=col in ORDERED_CATEGORIES)
+        elif want == "bool":
+            s = _coerce_bool(s)
+        elif want == "object":
+            s = s.astype(object).where(s.notna(), None)
+        elif want is not None:
+            s = s.astype(want)
+        elif pd.api.types.is_float_dtype(s):
+            s = s.astype("float32")
+        elif pd.api.types.is_integer_dtype(s):
+            s = pd.to_numeric(s, downcast="integer")
+            if s.dtype.itemsize < 4:
+                s = s.astype("int32")
+        elif pd.api.types.is_object_dtype(s) or pd.api.types.is_string_dtype(s):
+            if n and s.nunique(dropna=True) <= CATEGORY_MAX_UNIQUE_RATIO * n:
+                s = _as_category(s, ordered=col in ORDERED_CATEGORIES)
+        out[col] = s
+    return pd.DataFrame(out)
+
+
+def _read_typed_csv(path: Path) -> pd.DataFrame:
+    dtypes = DTYPES.get(path.name, {})
+    # Multi-threaded Arrow parser. Codes/IDs stay text while parsing; numeric
+    # measures are downcast afterwards. Empty strings are NA, as in pandas.
+    str_cols = {c: pa.string() for c, t in dtypes.items() if t in ("object", "category")}
+    table = pacsv.read_csv(
+        path, convert_options=pacsv.ConvertOptions(column_types=str_cols, strings_can_be_null=True)
+    )
+    # pandas keeps ISO dates as text; Arrow would infer date/timestamp columns.
+    for i, field in enumerate(table.schema):
+        if pa.types.is_date(field.type) or pa.types.is_timestamp(field.type):
+            table = table.set_column(i, field.name, pc.cast(table.column(i), pa.string()))
+    return _downcast(table.to_pandas(), dtypes)
+
+
+def typed_frame(df: pd.DataFrame, name: str) -> pd.DataFrame:
+    """Apply the typing rules of dataset `name` (see DTYPES) to an already-parsed frame."""
+    return _downcast(df, DTYPES.get(name, {}))
+
+
+# ============================================================
+# Arrow IPC (memory-mapped)
+# ============================================================
+def _write_ipc(table: pa.Table, data_path: Path) -> None:
+    data_path.parent.mkdir(parents=True, exist_ok=True)
+    # Unique per process and thread: warm-up may build a dataset's stages concurrently.
+    tmp = data_path.with_suffix(data_path.suffix + f".{os.getpid()}.{threading.get_ident()}.tmp")
+    with pa.OSFile(str(tmp), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp, data_path)
+
+
+def _map_ipc(data_path: Path) -> pa.Table:
+    """Memory-map an IPC file; the table's buffers point into the OS page cache."""
+    return pa.ipc.open_file(pa.memory_map(str(data_path), "r")).read_all()
+
+
+def table_to_frame(table: pa.Table) -> tuple:
+    """
+    Convert an Arrow table to pandas without copying where the layout allows:
+    numeric columns without nulls become read-only numpy views over the Arrow
+    buffers and dictionary columns reuse their index buffer as category codes.
+    Returns (frame, private_bytes) where private_bytes counts what had to be
+    copied onto the process heap.
+    """
+    data = {}
+    private = 0
+    for name, col in zip(table.column_names, table.columns):
+        arr = col.chunk(0) if col.num_chunks == 1 else col.combine_chunks()
+        if col.num_chunks > 1:
+            private += arr.nbytes
+        if pa.types.is_dictionary(arr.type):
+            codes = arr.indices.fill_null(-1).to_numpy() if arr.null_count else arr.indices.to_numpy()
+            cats = arr.dictionary.to_pandas()
+            series = pd.Categorical.from_codes(codes, categories=cats, ordered=arr.type.ordered, validate=False)
+            # pandas keeps its own copy of the (1-2 byte) codes.
+            private += series.codes.nbytes + cats.memory_usage(deep=True)
+        elif (pa.types.is_integer(arr.type) or pa.types.is_floating(arr.type)) and arr.null_count == 0:
+            series = arr.to_numpy(zero_copy_only=True)
+        else:
+            series = col.to_pandas()
+            private += int(series.memory_usage(deep=True))
+        data[name] = series
+    return pd.DataFrame(data, copy=False), private
+
+
+# ============================================================
+# Prepared dataset (cleaning done once per data version)
+# ============================================================
+def _normalise_categories(s: pd.Series, fn, members: Optional[pd.Index] = None) -> pd.Series:
+    """
+    Apply a string clean-up to the categories only (not to every row) and
+    merge categories that become equal after cleaning. With `members` (a
+    dim table) the categories are those members plus any label the dim
+    does not have yet, so codes are stable across fact refreshes.
+    """
+    s = _as_category(s)
+    cleaned = fn(pd.Series(s.cat.categories, dtype="string"))
+    labels = set(cleaned.dropna().unique().tolist())
+    if members is not None:
+        labels.update(members)
+    new_cats = pd.Index(sorted(labels))
+    lookup = np.append(new_cats.get_indexer(cleaned), -1)
+    codes = lookup[s.cat.codes.to_numpy()]
+    return pd.Series(pd.Categorical.from_codes(codes, new_cats), index=s.index, name=s.name)
+
+
+def _clean_campaign(s: pd.Series) -> pd.Series:
+    return s.str.strip().str.replace(r"(?i)^no coupon$", "No campaign", regex=True)
+
+
+def _clean_labels(col: str):
+    return _clean_campaign if col == "campaign_type_clean" else (lambda x: x.str.strip())
+
+
+def dim_paths(base_dir: Path, columns: Optional[Sequence[str]] = None) -> Dict[str, Path]:
+    """{fact column: dim file} for the dim tables in `base_dir` (restricted to `columns`)."""
+    base_dir = Path(base_dir)
+    return {
+        col: base_dir / name
+        for name, col in DIM_TABLES.items()
+        if (columns is None or col in columns) and (base_dir / name).exists()
+    }
+
+
+def load_dims(base_dir: Path, columns: Optional[Sequence[str]] = None) -> Dict[str, pd.Index]:
+    """
+    Sorted members of each dim table in `base_dir`, cleaned like the fact
+    labels (blank members dropped), keyed by the fact column they encode.
+    """
+    dims = {}
+    for col, path in dim_paths(base_dir, columns).items():
+        table = pacsv.read_csv(
+            path,
+            convert_options=pacsv.ConvertOptions(column_types={col: pa.string()}, strings_can_be_null=True),
+        )
+        if col not in table.column_names:
+            continue
+        labels = _clean_labels(col)(pd.Series(table.column(col).to_pylist(), dtype="string"))
+        labels = labels[labels.notna() & (labels != "")]
+        dims[col] = pd.Index(sorted(labels.unique().tolist()))
+    return dims
+
+
+def ym_to_key(ym: str) -> int:
+    """Scalar form of `year_month_key`."""
+    year, month = str(ym).strip().split("-", 1)
+    return int(year) * 12 + int(month) - 1
+
+
+def year_month_key(ym: pd.Series) -> pd.Series:
+    """'YYYY-MM' -> dense int32 month index (year * 12 + month - 1); -1 when missing."""
+    ym = _as_category(ym)
+    parts = pd.Series(ym.cat.categories.astype(str), dtype="string").str.split("-", n=1, expand=True)
+    keys = np.append((parts[0].astype(int) * 12 + parts[1].astype(int) - 1).to_numpy("int32"), -1)
+    return pd.Series(keys[ym.cat.codes.to_numpy()], index=ym.index, name="ym_key", dtype="int32")
+
+
+def prepare_monthly(df: pd.DataFrame, dims: Optional[Dict[str, pd.Index]] = None) -> pd.DataFrame:
+    """
+    Clean the monthly aggregate fact once:
+    - strip dimension labels; map "no coupon" campaigns to "No campaign"
+    - code each dimension against its dim table members (`dims`, see load_dims)
+    - coerce `has_coupon` to bool
+    - add `ym_key`, an int32 month index for range filters and time maths
+    - sort rows by `ym_key` so a month range is one contiguous slice
+    """
+    out = {}
+    for col in df.columns:
+        s = df[col]
+        if col in DIMENSIONS:
+            s = _normalise_categories(s, _clean_labels(col), (dims or {}).get(col))
+            if col in ORDERED_CATEGORIES:
+                s = s.cat.as_ordered()
+        elif col == "has_coupon":
+            s = _coerce_bool(s)
+        out[col] = s
+    prepared = pd.DataFrame(out)
+    if "YearMonth" in prepared.columns:
+        prepared["ym_key"] = year_month_key(prepared["YearMonth"])
+        prepared = prepared.sort_values("ym_key", kind="stable", ignore_index=True)
+    return prepared
+
+
+# ============================================================
+# Public API
+# ============================================================
+def _stage_deps(path: Path, stage: str) -> List[Path]:
+    """Files besides `path` that a cache stage is built from (the dim tables of the prepared fact)."""
+    if stage != "prepared":
+        return []
+    return [p for _, p in sorted(dim_paths(path.parent, DIMENSIONS).items())]
+
+
+def stage_version(path: Path, stage: str = "") -> str:
+    """`source_version` of a dataset stage, covering the files it depends on."""
+    path = Path(path)
+    return "+".join(source_version(p) for p in [path, *_stage_deps(path, stage)])
+
+
+def _stage_fresh(path: Path, cache_dir: Optional[Path], stage: str) -> bool:
+    """True when the cache file of `stage` is current for the source and its deps."""
+    return _is_fresh(path, *_cache_paths(path, cache_dir, stage), _stage_deps(path, stage))
+
+
+def _load_table(path: Path, cache_dir: Optional[Path], stage: str, build) -> pa.Table:
+    path = Path(path)
+    data_path, meta_path = _cache_paths(path, cache_dir, stage)
+    deps = _stage_deps(path, stage)
+    if _stage_fresh(path, cache_dir, stage):
+        try:
+            return _map_ipc(data_path)
+        except (OSError, pa.ArrowInvalid):
+            pass
+
+    table = pa.Table.from_pandas(build(), preserve_index=False)
+    try:
+        _write_ipc(table, data_path)
+        _write_meta(
+            meta_path,
+            {
+                "source": path.name,
+                "stage": stage or "typed",
+                **_file_state(path),
+                "deps": {p.name: _file_state(p) for p in deps},
+                "schema_version": SCHEMA_VERSION,
+                "rows": int(table.num_rows),
+            },
+        )
+        # Re-map so this process shares pages with every other reader.
+        return _map_ipc(data_path)
+    except OSError:
+        # Read-only checkout: serve the in-memory table without persisting it.
+        return table
+
+
+def _load_cached(path: Path, cache_dir: Optional[Path], stage: str, build) -> pd.DataFrame:
+    return _load_table(path, cache_dir, stage, build).to_pandas()
+
+
+def load_csv(path: Path, cache_dir: Optional[Path] = None) -> pd.DataFrame:
+    """
+    Load a dashboard CSV through the typed columnar cache.
+    The CSV is only parsed when the cache is missing or stale.
+    """
+    path = Path(path)
+    return _load_cached(path, cache_dir, "", lambda: _read_typed_csv(path))
+
+
+def load_prepared(path: Path, cache_dir: Optional[Path] = None) -> pd.DataFrame:
+    """
+    Load monthly_aggregates.csv cleaned by `prepare_monthly` and coded
+    against the dim tables next to it.
+    The prepared frame is persisted next to the typed cache, so cleaning runs
+    once per data version (CSV and dims) rather than once per process or
+    rerun. Callers must treat the result as read-only.
+    """
+    path = Path(path)
+    return _load_cached(path, cache_dir, "prepared", _build(path, cache_dir, "prepared"))
+
+
+def _build(path: Path, cache_dir: Optional[Path], stage: str):
+    if stage == "prepared":
+        return lambda: prepare_monthly(load_csv(path, cache_dir), load_dims(path.parent, DIMENSIONS))
+    return lambda: _read_typed_csv(path)
+
+
+def default_datasets(base_dir: Path) -> List[Tuple[str, str]]:
+    """(name, stage) of every dashboard CSV in `base_dir`, plus the prepared stages."""
+    base_dir = Path(base_dir)
+    out = [
+        (p.name, "")
+        for p in sorted(base_dir.glob("*.csv"))
+        if p.stat().st_size <= WARM_MAX_BYTES
+    ]
+    out += [(name, "prepared") for name in PREPARED_DATASETS if (base_dir / name).exists()]
+    return out
+
+
+# ============================================================
+# Shared read-only store
+# ============================================================
+class SharedStore:
+    """
+    Host-wide, read-only home for the dashboard datasets.
+    Each dataset is a memory-mapped Arrow IPC file from the columnar cache,
+    so every process (replica) on the host shares one physical copy through
+    the OS page cache. Within a process one frame per dataset and version is
+    handed to every session as zero-copy views (see `table_to_frame`); callers
+    must not mutate it.
+    """
+
+    def __init__(self, base_dir: Path, cache_dir: Optional[Path] = None):
+        self.base_dir = Path(base_dir)
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+        # (name, stage) -> (version, table, frame, private_bytes)
+        self._entries: Dict[Tuple[str, str], tuple] = {}
+        # One build lock per dataset, so loading one never waits on another.
+        self._build_locks: Dict[Tuple[str, str], threading.Lock] = {}
+
+    def _entry(self, name: str, stage: str = "") -> tuple:
+        path = self.base_dir / name
+        version = stage_version(path, stage)
+        key = (name, stage)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                return entry
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+        with build_lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                return entry
+            table = _load_table(path, self.cache_dir, stage, _build(path, self.cache_dir, stage))
+            frame, private = table_to_frame(table)
+            entry = (version, table, frame, private)
+            with self._lock:
+                self._entries[key] = entry
+            return entry
+
+    def exists(self, name: str) -> bool:
+        return (self.base_dir / name).exists()
+
+    def version(self, name: str, stage: str = "") -> str:
+        return self._entry(name, stage)[0]
+
+    def table(self, name: str, stage: str = "") -> pa.Table:
+        return self._entry(name, stage)[1]
+
+    def frame(self, name: str, stage: str = "") -> Optional[pd.DataFrame]:
+        """Shared read-only frame for `name`, or None when the file does not exist."""
+        if not self.exists(name):
+            return None
+        return self._entry(name, stage)[2]
+
+    def warm(
+        self, datasets: Optional[Sequence[Tuple[str, str]]] = None, max_workers: int = WARM_WORKERS
+    ) -> pd.DataFrame:
+        """
+        Load `datasets` ((name, stage) pairs, default: `default_datasets`)
+        concurrently. Returns one row per dataset: whether it was parsed or
+        mapped from a fresh cache file, load seconds, rows, bytes, or the error.
+        """
+        datasets = list(datasets if datasets is not None else default_datasets(self.base_dir))
+
+        def load(item: Tuple[str, str]) -> dict:
+            name, stage = item
+            path = self.base_dir / name
+            row = {"dataset": f"{name} [{stage}]" if stage else name}
+            try:
+                fresh = _stage_fresh(path, self.cache_dir, stage)
+                started = time.perf_counter()
+                if stage:
+                    # Builds from the typed stage; going through its entry parses the CSV once.
+                    self._entry(name)
+                _, table, _, private = self._entry(name, stage)
+                row.update(
+                    source="mapped" if fresh else "parsed",
+                    seconds=time.perf_counter() - started,
+                    rows=table.num_rows,
+                    shared_bytes=int(table.nbytes),
+                    private_bytes=int(private),
+                )
+            except Exception as exc:  # noqa: BLE001 - reported, the dataset then loads lazily
+                row.update(source="error", error=f"{type(exc).__name__}: {exc}")
+            return row
+
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="warm") as pool:
+            rows = list(pool.map(load, datasets))
+        cols = ["dataset", "source", "seconds", "rows", "shared_bytes", "private_bytes", "error"]
+        return pd.DataFrame(rows).reindex(columns=cols)
+
+    def resident_bytes(self) -> pd.DataFrame:
+        """
+        Memory per loaded dataset: `shared_bytes` live in the mapped file
+        (page cache, shared by all processes), `private_bytes` were copied
+        onto this process's heap (strings, codes, columns with nulls).
+        """
+        with self._lock:
+            entries = list(self._entries.items())
+        rows = []
+        for (name, stage), (version, table, _frame, private) in entries:
+            rows.append(
+                {
+                    "dataset": f"{name} [{stage}]" if stage else name,
+                    "rows": table.num_rows,
+                    "shared_bytes": int(table.nbytes),
+                    "private_bytes": int(private),
+                    "version": version,
+                }
+            )
+        return pd.DataFrame(rows, columns=["dataset", "rows", "shared_bytes", "private_bytes", "version"])
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Columnar cache for the dashboard CSVs.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    w = sub.add_parser("warm", help="Build/map every dataset's cache in parallel (run at deploy).")
+    w.add_argument("--base", type=Path, default=Path(__file__).resolve().parent)
+    w.add_argument("--workers", type=int, default=WARM_WORKERS)
+    args = ap.parse_args()
+
+    if args.cmd == "warm":
+        started = time.perf_counter()
+        report = SharedStore(args.base).warm(max_workers=args.workers)
+        with pd.option_context("display.width", 160, "display.max_columns", None):
+            print(report.round(3).to_string(index=False))
+        print(f"{len(report)} datasets in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
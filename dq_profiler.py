@@ -0,0 +1,662 @@
+"""
+Streaming data-quality profile of the order export.
+
+Replaces the offline missing_profile_current.csv / outlier_profile_iqr*.csv
+snapshots with mergeable state built in one pass over the export:
+
+    python dq_profiler.py build websales_coupon_merged_cleaned.csv
+    python dq_profiler.py ingest orders_2025-01.csv   # replaces those months
+
+The export is streamed in record batches. Every order is assigned to a cell
+(YearMonth x the sidebar filter dimensions, cleaned like orders_backend).
+For each cell the profile keeps:
+- row and null counts of every column
+- count, sum, min and max of the numeric columns (NUMERIC_COLUMNS)
+
+and for each sketch group (the coarser SKETCH_DIMS grain, YearMonth x
+has_coupon) a quantile sketch of each numeric column (see SketchSet). Sketch
+memory is therefore bounded per month, not per cell or per order.
+
+All of it is additive or mergeable, so the missingness table and the counts,
+min/max and means of any sidebar selection are exact sums over the selected
+cells. Quantiles and outlier shares come from one weighted-quantile pass over
+the sketches of the groups the selection touches; filters on dimensions
+outside SKETCH_DIMS are approximated by those enclosing groups
+(`DQProfile.inexact`). Rows without an order_date form the "unknown" month:
+they count in selections without a month range, and every month range
+excludes them (`DQProfile.undated`). The state is one pair of Parquet files
+per month under dq_profile/, indexed by a manifest. An ingest rewrites only
+the months in the delta; its undated rows are merged into the "unknown"
+month rather than replacing it.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+from data_store import year_month_key
+from filter_engine import FILTER_DIMS, FilterIndex
+from orders_backend import PARTITION_COL, clean_batch
+
+DQ_DIR_NAME = "dq_profile"
+MANIFEST_NAME = "manifest.json"
+
+CELL_DIMS = [PARTITION_COL, *FILTER_DIMS]
+
+# Numeric columns of the order export that get quantile/outlier profiles.
+NUMERIC_COLUMNS = [
+    "VAT Rate",
+    "Repeat Oders Qty",
+    "Discount (%)",
+    "Discount_rate",
+    "postage revenue (GBP)",
+    "postage revenue",
+    "order subtotal",
+    "Sales Tax (GBP)",
+    "Sales tax less refund (GBP)",
+    "order_total",
+    "order subtotal (GBP)",
+    "Gross Sale (GBP)",
+    "Order Total (GBP)",
+    "Net Sale (GBP)",
+    "Gross Sale less refund (GBP)",
+    "Net sale less refund (GBP)",
+    "net_revenue_gbp",
+    "Net Refund (GBP)",
+    "Gross Refund (GBP)",
+    "Refund (GBP)",
+    "refunded_amount",
+    "Refund Sales Tax (GBP)",
+    "Exchange Rate",
+    "shipper_id",
+]
+
+# Columns of outlier_profile_iqr_key_metrics.csv.
+KEY_METRICS = [
+    "Discount_rate",
+    "Order Total (GBP)",
+    "Gross Sale (GBP)",
+    "Net Sale (GBP)",
+    "net_revenue_gbp",
+    "Net sale less refund (GBP)",
+    "Refund (GBP)",
+]
+
+# Grain of the quantile sketches: coarse enough that they compact.
+SKETCH_DIMS = [PARTITION_COL, "has_coupon"]
+SKETCH_K = 256  # items per sketch level; groups with at most this many values are exact
+QUANTILES = {"p01": 0.01, "q1": 0.25, "median": 0.5, "q3": 0.75, "p99": 0.99}
+IQR_K = 1.5
+
+NO_MONTH = "unknown"  # partition of rows without an order_date
+_SEP = "\x1f"
+
+OUTLIER_COLUMNS = [
+    "column",
+    "n_non_null",
+    *QUANTILES,
+    "min",
+    "max",
+    "iqr",
+    "iqr_lower",
+    "iqr_upper",
+    "n_outliers_iqr",
+    "pct_outliers_iqr",
+    "mean_raw",
+    "mean_without_outliers",
+]
+KEY_METRIC_COLUMNS = [
+    "column",
+    "n_non_null",
+    "q1",
+    "median",
+    "q3",
+    "iqr",
+    "iqr_lower",
+    "iqr_upper",
+    "n_outliers_iqr",
+    "pct_outliers_iqr",
+    "min",
+    "max",
+    "mean_raw",
+    "mean_without_outliers",
+]
+
+
+# ============================================================
+# Quantile sketches
+# ============================================================
+class SketchSet:
+    """
+    One quantile sketch per integer key (a sketch group), held as flat arrays.
+
+    Items live on levels; an item on level h stands for 2 ** h values. When a
+    key holds more than `k` items on a level, they are sorted and every other
+    one (random parity) moves up a level while the rest are dropped: KLL-style
+    compaction with a constant capacity per level. Weights always sum to the
+    exact count, keys with at most `k` values stay exact, and two sets merge
+    by concatenating their items.
+    """
+
+    def __init__(self, k: int = SKETCH_K, seed: int = 0):
+        self.k = k
+        self.keys = np.empty(0, dtype=np.int64)
+        self.levels = np.empty(0, dtype=np.int8)
+        self.values = np.empty(0, dtype=np.float64)
+        self._rng = np.random.default_rng(seed)
+
+    @property
+    def weights(self) -> np.ndarray:
+        return np.left_shift(1, self.levels.astype(np.int64))
+
+    def add(self, keys: np.ndarray, values: np.ndarray, levels: Optional[np.ndarray] = None) -> None:
+        """Add values (or sketch items, with `levels`) and compact any full level."""
+        levels = np.zeros(len(keys), dtype=np.int8) if levels is None else levels.astype(np.int8)
+        self.keys = np.concatenate([self.keys, keys.astype(np.int64)])
+        self.levels = np.concatenate([self.levels, levels])
+        self.values = np.concatenate([self.values, values.astype(np.float64)])
+        self._compact()
+
+    def _compact(self) -> None:
+        level = 0
+        while len(self.levels) and level <= int(self.levels.max()):
+            at = np.flatnonzero(self.levels == level)
+            level += 1
+            if len(at) <= self.k:
+                continue
+            full = np.bincount(self.keys[at]) > self.k
+            sel = at[full[self.keys[at]]]
+            if len(sel) == 0:
+                continue
+            order = sel[np.lexsort((self.values[sel], self.keys[sel]))]
+            k_sorted = self.keys[order]
+            start = np.flatnonzero(np.r_[True, k_sorted[1:] != k_sorted[:-1]])
+            size = np.diff(np.r_[start, len(order)])
+            rank = np.arange(len(order)) - np.repeat(start, size)
+            # Pair items in value order; an odd one out stays on this level.
+            paired = rank < np.repeat(size - size % 2, size)
+            parity = np.repeat(self._rng.integers(0, 2, len(start)), size)
+            self.levels[order[paired & (rank % 2 == parity)]] += 1
+            keep = np.ones(len(self.keys), dtype=bool)
+            keep[order[paired & (rank % 2 != parity)]] = False
+            self.keys, self.levels, self.values = self.keys[keep], self.levels[keep], self.values[keep]
+
+
+def weighted_quantiles(values: np.ndarray, weights: np.ndarray, qs: Sequence[float]) -> np.ndarray:
+    """
+    Quantiles of value-sorted items with integer weights, interpolated
+    linearly between item ranks (pandas' default when all weights are 1).
+    """
+    if len(values) == 0:
+        return np.full(len(qs), np.nan)
+    cum = np.cumsum(weights)
+    # 0-based rank of the middle copy of each item.
+    centre = cum - (weights + 1) / 2
+    return np.interp(np.asarray(qs) * (cum[-1] - 1), centre, values)
+
+
+# ============================================================
+# Streaming pass
+# ============================================================
+def _to_float(arr: pa.Array) -> np.ndarray:
+    """Text column -> float64 (NaN where missing or not a number)."""
+    try:
+        num = pc.cast(arr, pa.float64())
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        ok = pc.match_substring_regex(pc.utf8_trim_whitespace(arr), r"^[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?$")
+        num = pc.cast(pc.utf8_trim_whitespace(pc.if_else(ok, arr, None)), pa.float64())
+    return num.to_numpy(zero_copy_only=False)
+
+
+def _grow(a: np.ndarray, n: int, fill) -> np.ndarray:
+    if len(a) >= n:
+        return a
+    return np.concatenate([a, np.full(n - len(a), fill, dtype=a.dtype)])
+
+
+def open_profile_csv(csv_path: Path, block_size: int = 64 << 20) -> Tuple[List[str], Iterator[pa.RecordBatch]]:
+    """(columns, cleaned record batches) of an order export, every column read as text."""
+    csv_path = Path(csv_path)
+    with open(csv_path, newline="", encoding="utf-8") as fh:
+        header = next(csv.reader(fh))
+    if "order_date" not in header:
+        raise ValueError(f"{csv_path.name} has no `order_date` column.")
+    reader = pacsv.open_csv(
+        csv_path,
+        read_options=pacsv.ReadOptions(block_size=block_size),
+        convert_options=pacsv.ConvertOptions(
+            column_types={c: pa.bool_() if c == "has_coupon" else pa.string() for c in header},
+            true_values=["True", "true", "1"],
+            false_values=["False", "false", "0"],
+            strings_can_be_null=True,
+        ),
+    )
+    return header, (clean_batch(b) for b in reader)
+
+
+class ProfileBuilder:
+    """Accumulates per-cell counters and per-group sketches over record batches."""
+
+    def __init__(self, columns: Sequence[str], k: int = SKETCH_K, seed: int = 0):
+        self.columns = list(columns)
+        self.numeric = [c for c in NUMERIC_COLUMNS if c in self.columns]
+        self.k = k
+        self._ids: Dict[str, int] = {}
+        self._groups: Dict[str, int] = {}
+        self.group_of = np.zeros(0, dtype=np.int64)  # sketch group of each cell
+        self.rows = np.zeros(0, dtype=np.int64)
+        self.nulls = {c: np.zeros(0, dtype=np.int64) for c in self.columns}
+        self.n = {c: np.zeros(0, dtype=np.int64) for c in self.numeric}
+        self.sum = {c: np.zeros(0, dtype=np.float64) for c in self.numeric}
+        self.min = {c: np.zeros(0, dtype=np.float64) for c in self.numeric}
+        self.max = {c: np.zeros(0, dtype=np.float64) for c in self.numeric}
+        self.sketches = {c: SketchSet(k, seed) for c in self.numeric}
+
+    @staticmethod
+    def _encode(batch: pa.RecordBatch, dims: Sequence[str], ids: Dict[str, int]) -> np.ndarray:
+        parts = []
+        for d in dims:
+            col = batch.column(d) if d in batch.schema.names else pa.nulls(batch.num_rows, pa.string())
+            parts.append(pc.cast(col, pa.string()))
+        joined = pc.binary_join_element_wise(*parts, _SEP, null_handling="replace", null_replacement="")
+        enc = pc.dictionary_encode(joined)
+        local = np.array([ids.setdefault(key, len(ids)) for key in enc.dictionary.to_pylist()], dtype=np.int64)
+        return local[enc.indices.to_numpy()]
+
+    def add(self, batch: pa.RecordBatch) -> None:
+        cell = self._encode(batch, CELL_DIMS, self._ids)
+        group = self._encode(batch, SKETCH_DIMS, self._groups)
+        n_cells = len(self._ids)
+        # SKETCH_DIMS is a subset of CELL_DIMS, so a cell always maps to one group.
+        self.group_of = _grow(self.group_of, n_cells, 0)
+        self.group_of[cell] = group
+        self.rows = _grow(self.rows, n_cells, 0) + np.bincount(cell, minlength=n_cells)
+        for c in self.columns:
+            self.nulls[c] = _grow(self.nulls[c], n_cells, 0)
+            if c not in batch.schema.names:
+                self.nulls[c] += np.bincount(cell, minlength=n_cells)
+            else:
+                isnull = batch.column(c).is_null().to_numpy(zero_copy_only=False)
+                self.nulls[c] += np.bincount(cell[isnull], minlength=n_cells)
+        for c in self.numeric:
+            self.n[c], self.sum[c] = _grow(self.n[c], n_cells, 0), _grow(self.sum[c], n_cells, 0.0)
+            self.min[c], self.max[c] = _grow(self.min[c], n_cells, np.inf), _grow(self.max[c], n_cells, -np.inf)
+            if c not in batch.schema.names:
+                continue
+            v = _to_float(batch.column(c))
+            ok = np.isfinite(v)
+            vc, v = cell[ok], v[ok]
+            self.n[c] += np.bincount(vc, minlength=n_cells)
+            self.sum[c] += np.bincount(vc, weights=v, minlength=n_cells)
+            np.minimum.at(self.min[c], vc, v)
+            np.maximum.at(self.max[c], vc, v)
+            self.sketches[c].add(group[ok], v)
+
+    def _cells(self) -> pd.DataFrame:
+        keys = pd.Series(list(self._ids), dtype="string").str.split(_SEP, expand=True)
+        keys.columns = CELL_DIMS
+        keys = keys.replace("", None)
+        if "has_coupon" in keys.columns:
+            keys["has_coupon"] = keys["has_coupon"].eq("true").fillna(False).astype(bool)
+        return keys.astype({d: "object" for d in CELL_DIMS if d != "has_coupon"})
+
+    def months(self) -> Dict[str, Tuple[pd.DataFrame, pa.Table]]:
+        """{YearMonth: (cell counters, sketch items)} of everything added so far."""
+        cells = self._cells()
+        cells["rows"] = self.rows
+        for c in self.columns:
+            cells[f"null:{c}"] = self.nulls[c]
+        for c in self.numeric:
+            cells[f"n:{c}"], cells[f"sum:{c}"] = self.n[c], self.sum[c]
+            cells[f"min:{c}"] = np.where(self.n[c] > 0, self.min[c], np.nan)
+            cells[f"max:{c}"] = np.where(self.n[c] > 0, self.max[c], np.nan)
+        month = cells[PARTITION_COL].fillna(NO_MONTH).to_numpy()
+        group_month = np.array([key.split(_SEP)[0] or NO_MONTH for key in self._groups], dtype=object)
+        items = pa.table(
+            {
+                "column": pa.array(np.repeat(self.numeric, [len(self.sketches[c].keys) for c in self.numeric])).dictionary_encode(),
+                "group": np.concatenate([self.sketches[c].keys for c in self.numeric] or [np.empty(0, np.int64)]),
+                "level": np.concatenate([self.sketches[c].levels for c in self.numeric] or [np.empty(0, np.int8)]),
+                "value": np.concatenate([self.sketches[c].values for c in self.numeric] or [np.empty(0)]),
+            }
+        )
+        item_month = group_month[items.column("group").to_numpy()]
+        out = {}
+        for ym in sorted(set(month)):
+            # Groups are renumbered 0.. within each month's files.
+            local = np.full(len(group_month), -1, dtype=np.int64)
+            in_month = np.flatnonzero(group_month == ym)
+            local[in_month] = np.arange(len(in_month))
+            part = items.filter(pa.array(item_month == ym))
+            part = part.set_column(1, "group", pa.array(local[part.column("group").to_numpy()], type=pa.int32()))
+            ids = np.flatnonzero(month == ym)
+            frame = cells.iloc[ids].reset_index(drop=True)
+            frame["sketch"] = local[self.group_of[ids]].astype(np.int32)
+            out[ym] = (frame, part)
+        return out
+
+
+def merge_month(
+    a: Tuple[pd.DataFrame, pa.Table], b: Tuple[pd.DataFrame, pa.Table], k: int = SKETCH_K
+) -> Tuple[pd.DataFrame, pa.Table]:
+    """Merge two states of one month: cell counters add up, sketches of the same group merge."""
+    cells = pd.concat([a[0].assign(_part=0), b[0].assign(_part=1)], ignore_index=True)
+    for col in [c for c in cells.columns if c.startswith("null:")]:
+        cells[col] = cells[col].fillna(cells["rows"])
+    # Groups are numbered per file; match them on their SKETCH_DIMS values.
+    keys = cells[SKETCH_DIMS].astype("string").fillna("").agg(_SEP.join, axis=1)
+    code = pd.factorize(keys)[0]
+    remap = []
+    for part in (0, 1):
+        at = (cells["_part"] == part).to_numpy()
+        m = np.zeros(int(cells.loc[at, "sketch"].max()) + 1 if at.any() else 0, dtype=np.int64)
+        m[cells.loc[at, "sketch"].to_numpy()] = code[at]
+        remap.append(m)
+    cells["sketch"] = code
+    agg = {c: "sum" for c in cells.columns if c == "rows" or c.split(":")[0] in ("null", "n", "sum")}
+    agg.update({c: c.split(":")[0] for c in cells.columns if c.split(":")[0] in ("min", "max")})
+    agg["sketch"] = "first"
+    merged = cells.groupby(CELL_DIMS, dropna=False, sort=False).agg(agg).reset_index()
+    for c in [c for c in merged.columns if c == "rows" or c.split(":")[0] in ("null", "n")]:
+        merged[c] = merged[c].astype(np.int64)
+    merged["sketch"] = merged["sketch"].astype(np.int32)
+    merged = merged.astype({d: "object" for d in CELL_DIMS if d != "has_coupon"})
+
+    items = [t.set_column(1, "group", pa.array(m[t.column("group").to_numpy()])) for t, m in zip((a[1], b[1]), remap)]
+    items = pa.concat_tables([t.cast(t.schema.set(0, pa.field("column", pa.string()))) for t in items])
+    col = items.column("column").to_numpy(zero_copy_only=False)
+    out = {"column": [], "group": [], "level": [], "value": []}
+    for c in pd.unique(col):
+        at = col == c
+        sketch = SketchSet(k)
+        sketch.add(items.column("group").to_numpy()[at], items.column("value").to_numpy()[at], items.column("level").to_numpy()[at])
+        out["column"] += [c] * len(sketch.keys)
+        out["group"].append(sketch.keys)
+        out["level"].append(sketch.levels)
+        out["value"].append(sketch.values)
+    sketches = pa.table(
+        {
+            "column": pa.array(out["column"], pa.string()).dictionary_encode(),
+            "group": pa.array(np.concatenate(out["group"] or [np.empty(0, np.int64)]), pa.int32()),
+            "level": pa.array(np.concatenate(out["level"] or [np.empty(0, np.int8)]), pa.int8()),
+            "value": pa.array(np.concatenate(out["value"] or [np.empty(0)]), pa.float64()),
+        }
+    )
+    return merged, sketches
+
+
+def profile_csv(csv_path: Path, k: int = SKETCH_K, block_size: int = 64 << 20) -> Dict[str, Tuple[pd.DataFrame, pa.Table]]:
+    """One streaming pass over an order export -> per-month profile state."""
+    columns, batches = open_profile_csv(csv_path, block_size)
+    builder = ProfileBuilder(columns, k)
+    for batch in batches:
+        builder.add(batch)
+    return builder.months()
+
+
+# ============================================================
+# Store
+# ============================================================
+def read_manifest(root: Path) -> dict:
+    path = Path(root) / MANIFEST_NAME
+    if not path.exists():
+        return {"version": 0, "k": SKETCH_K, "grain": SKETCH_DIMS, "months": {}}
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def _write_atomic(path: Path, write) -> None:
+    tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+    write(tmp)
+    os.replace(tmp, path)
+
+
+def _write_month(root: Path, ym: str, version: int, cells: pd.DataFrame, items: pa.Table) -> dict:
+    stem = f"{ym}.v{version}"
+    _write_atomic(root / f"{stem}.cells.parquet", lambda tmp: cells.to_parquet(tmp, index=False))
+    _write_atomic(root / f"{stem}.sketch.parquet", lambda tmp: pq.write_table(items, tmp, compression="zstd"))
+    return {"cells": f"{stem}.cells.parquet", "sketch": f"{stem}.sketch.parquet", "rows": int(cells["rows"].sum())}
+
+
+def write_months(root: Path, months: Mapping[str, Tuple[pd.DataFrame, pa.Table]], replace_all: bool, k: int) -> dict:
+    """Write month states and commit the manifest; old files of replaced months are removed."""
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    manifest = read_manifest(root)
+    old = dict(manifest["months"])
+    manifest["version"] += 1
+    manifest["k"] = k
+    manifest["grain"] = SKETCH_DIMS
+    if replace_all:
+        manifest["months"] = {}
+    for ym, (cells, items) in months.items():
+        manifest["months"][ym] = _write_month(root, ym, manifest["version"], cells, items)
+    manifest["updated"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    _write_atomic(root / MANIFEST_NAME, lambda tmp: tmp.write_text(json.dumps(manifest, indent=1, sort_keys=True)))
+    live = {f for e in manifest["months"].values() for f in (e["cells"], e["sketch"])}
+    for e in old.values():
+        for f in (e["cells"], e["sketch"]):
+            if f not in live:
+                (root / f).unlink(missing_ok=True)
+    return manifest
+
+
+def build(csv_path: Path, root: Optional[Path] = None, k: int = SKETCH_K) -> dict:
+    """Profile a full order export into `root` (default: dq_profile/ next to it)."""
+    csv_path = Path(csv_path)
+    root = Path(root) if root is not None else csv_path.parent / DQ_DIR_NAME
+    return write_months(root, profile_csv(csv_path, k), replace_all=True, k=k)
+
+
+def ingest(delta_path: Path, root: Optional[Path] = None) -> dict:
+    """
+    Profile an order delta; each month in it replaces that month of the
+    profile, and its undated rows are added to those already profiled.
+    """
+    delta_path = Path(delta_path)
+    root = Path(root) if root is not None else Path(__file__).resolve().parent / DQ_DIR_NAME
+    if not (root / MANIFEST_NAME).exists():
+        raise FileNotFoundError(f"No profile at {root}; run `build` first.")
+    manifest = read_manifest(root)
+    if manifest.get("grain") != SKETCH_DIMS:
+        raise ValueError(f"The profile at {root} uses another sketch grain; run `build` again.")
+    k = manifest["k"]
+    months = profile_csv(delta_path, k)
+    old = manifest["months"].get(NO_MONTH)
+    if NO_MONTH in months and old is not None:
+        months[NO_MONTH] = merge_month(
+            (pd.read_parquet(root / old["cells"]), pq.read_table(root / old["sketch"])), months[NO_MONTH], k
+        )
+    return write_months(root, months, replace_all=False, k=k)
+
+
+# ============================================================
+# Reader
+# ============================================================
+class DQProfile:
+    """
+    The merged profile of every month, queried per sidebar selection.
+    Cells are indexed like the cube (FilterIndex); sketch items are kept
+    value-sorted per column, so a selection's quantiles take one masked
+    cumulative sum over the sketch groups of its cells.
+    """
+
+    def __init__(self, cells: pd.DataFrame, items: pa.Table, version: int):
+        self.version = version
+        self.cells = cells
+        self.index = FilterIndex(cells)
+        self.columns = [c[5:] for c in cells.columns if c.startswith("null:")]
+        self.numeric = [c[2:] for c in cells.columns if c.startswith("n:")]
+        self.n_groups = int(cells["sketch"].max()) + 1 if len(cells) else 0
+        self._items: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+        col = items.column("column").to_numpy(zero_copy_only=False) if items.num_rows else np.empty(0, object)
+        group = items.column("group").to_numpy()
+        value = items.column("value").to_numpy()
+        weight = np.left_shift(1, items.column("level").to_numpy().astype(np.int64))
+        for c in self.numeric:
+            at = np.flatnonzero(col == c)
+            at = at[np.argsort(value[at], kind="stable")]
+            self._items[c] = (value[at], weight[at], group[at])
+
+    @classmethod
+    def open(cls, root: Path) -> Optional["DQProfile"]:
+        """Merged profile in `root`, or None when none was built."""
+        root = Path(root)
+        manifest = read_manifest(root)
+        if not manifest["months"]:
+            return None
+        if manifest.get("grain") != SKETCH_DIMS:
+            raise ValueError(f"The profile at {root} uses another sketch grain; run `build` again.")
+        cells, items, offset = [], [], 0
+        for ym in sorted(manifest["months"]):
+            e = manifest["months"][ym]
+            c = pd.read_parquet(root / e["cells"])
+            t = pq.read_table(root / e["sketch"])
+            n_groups = int(c["sketch"].max()) + 1 if len(c) else 0
+            c["sketch"] = c["sketch"].astype(np.int64) + offset
+            t = t.set_column(1, "group", pc.add(t.column("group").cast(pa.int64()), offset))
+            cells.append(c)
+            items.append(t.cast(pa.schema([("column", pa.string()), ("group", pa.int64()), ("level", pa.int8()), ("value", pa.float64())])))
+            offset += n_groups
+        frame = pd.concat(cells, ignore_index=True)
+        # Columns absent from a month's export are missing for all its rows.
+        for col in [c for c in frame.columns if c.startswith("null:")]:
+            frame[col] = frame[col].fillna(frame["rows"]).astype(np.int64)
+        for d in CELL_DIMS:
+            if d in frame.columns and d != "has_coupon":
+                frame[d] = frame[d].astype("category")
+        frame["ym_key"] = year_month_key(frame[PARTITION_COL])
+        frame = frame.iloc[np.argsort(frame["ym_key"].to_numpy(), kind="stable")].reset_index(drop=True)
+        return cls(frame, pa.concat_tables(items), manifest["version"])
+
+    def select(self, filters: Optional[Mapping[str, object]] = None) -> np.ndarray:
+        """
+        Cell positions selected by a sidebar filter dict (same shape as
+        Cube.select). A month range never selects the undated cells.
+        """
+        filters = dict(filters or {})
+        ym_range = filters.pop(PARTITION_COL, None)
+        return self.index.select(ym_range, filters)
+
+    def undated(self, filters: Optional[Mapping[str, object]] = None) -> int:
+        """Rows without an order_date that match the non-month filters."""
+        cells = self.select({k: v for k, v in (filters or {}).items() if k != PARTITION_COL})
+        return self.rows(cells[self.cells["ym_key"].to_numpy()[cells] < 0])
+
+    def inexact(self, filters: Optional[Mapping[str, object]] = None) -> List[str]:
+        """Active filters the quantiles only approximate (they are finer than SKETCH_DIMS)."""
+        return [k for k, v in (filters or {}).items() if k not in SKETCH_DIMS and v is not None and len(v)]
+
+    def rows(self, cells: Optional[np.ndarray] = None) -> int:
+        r = self.cells["rows"].to_numpy()
+        return int(r.sum() if cells is None else r[cells].sum())
+
+    def missing(self, cells: Optional[np.ndarray] = None) -> pd.DataFrame:
+        """Missing count and % per column (missing_profile_current.csv layout)."""
+        frame = self.cells if cells is None else self.cells.iloc[cells]
+        total = int(frame["rows"].sum())
+        counts = np.array([int(frame[f"null:{c}"].sum()) for c in self.columns], dtype=np.int64)
+        out = pd.DataFrame(
+            {
+                "column_name": self.columns,
+                "missing_count": counts,
+                "missing_pct": counts / total * 100 if total else np.nan,
+            }
+        )
+        return out.sort_values("missing_pct", ascending=False, kind="stable", ignore_index=True)
+
+    def outliers(self, cells: Optional[np.ndarray] = None, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """
+        Quantiles and IQR outliers per numeric column (outlier_profile_iqr.csv
+        layout). Counts, min/max and the raw mean are exact; quantiles, the
+        outlier share and the trimmed mean come from the sketches of the
+        groups the cells belong to, and are exact for groups never compacted.
+        """
+        frame = self.cells if cells is None else self.cells.iloc[cells]
+        selected = np.zeros(self.n_groups, dtype=bool)
+        selected[frame["sketch"].to_numpy()] = True
+        rows = []
+        for c in [c for c in (columns or self.numeric) if c in self._items]:
+            n = int(frame[f"n:{c}"].sum())
+            if n == 0:
+                continue
+            value, weight, group = self._items[c]
+            keep = selected[group]
+            v, w = value[keep], weight[keep]
+            q = dict(zip(QUANTILES, weighted_quantiles(v, w, list(QUANTILES.values()))))
+            iqr = q["q3"] - q["q1"]
+            lower, upper = q["q1"] - IQR_K * iqr, q["q3"] + IQR_K * iqr
+            inside = (v >= lower) & (v <= upper)
+            # The groups can hold more values than the selection; scale their share to it.
+            share = w[~inside].sum() / w.sum() if len(w) else 0.0
+            n_out = int(round(share * n))
+            rows.append(
+                {
+                    "column": c,
+                    "n_non_null": n,
+                    **q,
+                    "min": float(frame[f"min:{c}"].min()),
+                    "max": float(frame[f"max:{c}"].max()),
+                    "iqr": iqr,
+                    "iqr_lower": lower,
+                    "iqr_upper": upper,
+                    "n_outliers_iqr": n_out,
+                    "pct_outliers_iqr": n_out / n * 100,
+                    "mean_raw": float(frame[f"sum:{c}"].sum()) / n,
+                    "mean_without_outliers": (
+                        float(np.dot(v[inside], w[inside]) / w[inside].sum()) if inside.any() else np.nan
+                    ),
+                }
+            )
+        out = pd.DataFrame(rows, columns=OUTLIER_COLUMNS)
+        return out.sort_values("pct_outliers_iqr", ascending=False, kind="stable", ignore_index=True)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Streaming missingness / IQR outlier profile of the order export.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build", help="Profile a full order export.")
+    b.add_argument("csv", type=Path)
+    b.add_argument("--out", type=Path, default=None)
+    b.add_argument("--k", type=int, default=SKETCH_K, help="Sketch items per level.")
+    g = sub.add_parser("ingest", help="Replace the months of an order delta.")
+    g.add_argument("delta", type=Path)
+    g.add_argument("--out", type=Path, default=None)
+    e = sub.add_parser("export", help="Write the global profile as the legacy CSVs.")
+    e.add_argument("--out", type=Path, default=None)
+    args = ap.parse_args()
+
+    if args.cmd == "build":
+        manifest = build(args.csv, args.out, args.k)
+        print(f"profiled {sum(e['rows'] for e in manifest['months'].values()):,} rows, {len(manifest['months'])} months")
+    elif args.cmd == "ingest":
+        manifest = ingest(args.delta, args.out)
+        print(f"profile v{manifest['version']}: {len(manifest['months'])} months")
+    elif args.cmd == "export":
+        root = args.out if args.out is not None else Path(__file__).resolve().parent / DQ_DIR_NAME
+        profile = DQProfile.open(root)
+        if profile is None:
+            raise SystemExit(f"No profile at {root}; run `build` first.")
+        data_dir = root.parent
+        profile.missing().to_csv(data_dir / "missing_profile_current.csv", index=False)
+        out = profile.outliers()
+        out.to_csv(data_dir / "outlier_profile_iqr.csv", index=False)
+        key = out.loc[out["column"].isin(KEY_METRICS), KEY_METRIC_COLUMNS]
+        key.to_csv(data_dir / "outlier_profile_iqr_key_metrics.csv", index=False)
+        print(f"wrote the profile CSVs to {data_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Downloads encoded on demand.
+
+The app hands st.download_button a callable, so a file is only built when
+someone clicks. Frames are encoded in row chunks straight into a temporary
+file: CSV is written (and gzip-compressed) chunk by chunk and Parquet one
+row group at a time, so neither the text nor the encoded file is ever held
+whole in memory. The button gets the encoded bytes, read back from that
+file and closed again (only the compressed output is held). Encoded files
+are memoised per (dataset key, format) in an LRU bounded by their total
+size on disk; the key carries the data version and the filter selection,
+so repeated exports of the same view are free and a new selection or data
+refresh gets a new file.
+"""
+from __future__ import annotations
+
+import shutil
+import tempfile
+import threading
+import weakref
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, Hashable, Iterator, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+CHUNK_ROWS = 100_000
+EXPORT_CACHE_BYTES = 256 << 20
+
+# format -> (file suffix, MIME type)
+FORMATS: Dict[str, Tuple[str, str]] = {
+    "CSV (gzip)": (".csv.gz", "application/gzip"),
+    "Parquet": (".parquet", "application/vnd.apache.parquet"),
+    "CSV": (".csv", "text/csv"),
+}
+
+
+# ============================================================
+# Chunked encoders
+# ============================================================
+def iter_csv(df: pd.DataFrame, chunk_rows: int = CHUNK_ROWS, gzip: bool = False) -> Iterator[bytes]:
+    """UTF-8 CSV of `df` in row chunks (gzip members written as one stream when `gzip`)."""
+    z = zlib.compressobj(6, zlib.DEFLATED, 31) if gzip else None
+    for start in range(0, max(len(df), 1), chunk_rows):
+        part = df.iloc[start:start + chunk_rows].to_csv(index=False, header=start == 0).encode("utf-8")
+        part = z.compress(part) if z is not None else part
+        if part:
+            yield part
+    if z is not None:
+        yield z.flush()
+
+
+def write_parquet(df: pd.DataFrame, out: BinaryIO, chunk_rows: int = CHUNK_ROWS) -> None:
+    """Parquet file of `df` written to `out`, one row group per chunk."""
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    with pq.ParquetWriter(out, schema, compression="zstd") as writer:
+        for start in range(0, len(df), chunk_rows):
+            chunk = df.iloc[start:start + chunk_rows]
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+
+def encode(df: pd.DataFrame, fmt: str, out: BinaryIO, chunk_rows: int = CHUNK_ROWS) -> None:
+    """Write `df` in `fmt` to the binary file `out`, chunk by chunk."""
+    if fmt == "Parquet":
+        write_parquet(df, out, chunk_rows)
+        return
+    for part in iter_csv(df, chunk_rows, gzip=fmt == "CSV (gzip)"):
+        out.write(part)
+
+
+def file_name(stem: str, fmt: str) -> str:
+    return stem + FORMATS[fmt][0]
+
+
+# ============================================================
+# Memo
+# ============================================================
+class ExportCache:
+    """
+    Thread-safe LRU of encoded files keyed on (dataset key, format), bounded
+    by their total size. The files live in a private temporary directory.
+    Each `get` opens the file under the lock and reads it outside, so a file
+    evicted meanwhile is still read whole.
+    """
+
+    def __init__(self, max_bytes: int = EXPORT_CACHE_BYTES, directory: Optional[Path] = None):
+        self.max_bytes = max_bytes
+        self.dir = Path(tempfile.mkdtemp(prefix="exports-", dir=directory))
+        weakref.finalize(self, shutil.rmtree, self.dir, True)
+        self._files: "OrderedDict[Tuple[Hashable, str], Tuple[Path, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, fmt: str, frame: Callable[[], pd.DataFrame]) -> bytes:
+        """Encoded file for `key`; `frame` is only called (and encoded) on a miss."""
+        with self._open(key, fmt, frame) as handle:
+            return handle.read()
+
+    def _open(self, key: Hashable, fmt: str, frame: Callable[[], pd.DataFrame]) -> BinaryIO:
+        k = (key, fmt)
+        with self._lock:
+            hit = self._files.get(k)
+            if hit is not None:
+                self._files.move_to_end(k)
+                return open(hit[0], "rb")
+        with tempfile.NamedTemporaryFile(dir=self.dir, suffix=FORMATS[fmt][0], delete=False) as fh:
+            path = Path(fh.name)
+            try:
+                encode(frame(), fmt, fh)
+            except BaseException:
+                path.unlink(missing_ok=True)
+                raise
+        size = path.stat().st_size
+        with self._lock:
+            if k in self._files:
+                # Another session encoded the same file meanwhile.
+                path.unlink(missing_ok=True)
+            else:
+                self._files[k] = (path, size)
+                self._bytes += size
+            handle = open(self._files[k][0], "rb")
+            while self._bytes > self.max_bytes and len(self._files) > 1:
+                _, (old, n) = self._files.popitem(last=False)
+                old.unlink(missing_ok=True)
+                self._bytes -= n
+        return handle
@@ -0,0 +1,118 @@
+"""
+Pre-indexed sidebar filtering.
+
+Rows are kept sorted by `ym_key`, so the Year-Month range is a contiguous
+slice found with `searchsorted`. Every filter dimension gets an inverted index
+(category code -> sorted row ids, stored CSR-style). A filter starts from the
+posting lists of the most selective dimension, clipped to the month slice, and
+checks the remaining dimensions with a code lookup table. The result is a
+single array of row positions; no intermediate frames are built.
+"""
+from __future__ import annotations
+
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from data_store import ym_to_key
+
+FILTER_DIMS = ["Company", "Brands", "shop", "shipping_country", "campaign_type_clean", "has_coupon"]
+
+
+class FilterIndex:
+    def __init__(self, df: pd.DataFrame, dims: Sequence[str] = FILTER_DIMS, time_col: str = "ym_key"):
+        keys = df[time_col].to_numpy()
+        if len(keys) > 1 and np.any(keys[1:] < keys[:-1]):
+            raise ValueError(f"FilterIndex needs rows sorted by `{time_col}`.")
+        self.n_rows = len(df)
+        self._time = keys
+        self._labels: Dict[str, pd.Index] = {}
+        self._codes: Dict[str, np.ndarray] = {}
+        self._offsets: Dict[str, np.ndarray] = {}
+        self._postings: Dict[str, np.ndarray] = {}
+
+        for col in dims:
+            if col not in df.columns:
+                continue
+            s = df[col]
+            if s.dtype == bool:
+                cat = pd.Categorical(s, categories=[False, True])
+            else:
+                cat = s.astype("category").array
+            codes = np.asarray(cat.codes, dtype=np.int32)
+            n_labels = len(cat.categories)
+            # Bucket 0 holds missing values (code -1); bucket c + 1 holds code c.
+            counts = np.bincount(codes + 1, minlength=n_labels + 1)
+            self._labels[col] = pd.Index(cat.categories)
+            self._codes[col] = codes
+            self._offsets[col] = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+            # Stable sort keeps row ids ascending inside each posting list.
+            self._postings[col] = np.argsort(codes, kind="stable").astype(np.int64)
+
+    @property
+    def dims(self) -> List[str]:
+        return list(self._labels)
+
+    def labels(self, col: str) -> list:
+        return self._labels[col].tolist() if col in self._labels else []
+
+    def _codes_for(self, col: str, values: Sequence) -> np.ndarray:
+        idx = self._labels[col].get_indexer(list(values))
+        return np.unique(idx[idx >= 0])
+
+    def _posting(self, col: str, code: int) -> np.ndarray:
+        off = self._offsets[col]
+        return self._postings[col][off[code + 1]:off[code + 2]]
+
+    def month_slice(self, ym_range: Optional[Tuple[str, str]]) -> Tuple[int, int]:
+        if ym_range is None:
+            return 0, self.n_rows
+        lo = int(np.searchsorted(self._time, ym_to_key(ym_range[0]), side="left"))
+        hi = int(np.searchsorted(self._time, ym_to_key(ym_range[1]), side="right"))
+        return lo, max(lo, hi)
+
+    def select(
+        self,
+        ym_range: Optional[Tuple[str, str]] = None,
+        selections: Optional[Mapping[str, Sequence]] = None,
+    ) -> np.ndarray:
+        """
+        Row positions matching a month range and per-dimension selections.
+        An empty (or missing) selection means "no filter" on that dimension.
+        """
+        lo, hi = self.month_slice(ym_range)
+        active = []
+        for col, values in (selections or {}).items():
+            if values is None or len(values) == 0 or col not in self._labels:
+                continue
+            codes = self._codes_for(col, values)
+            if len(codes) == 0:
+                return np.empty(0, dtype=np.int64)
+            off = self._offsets[col]
+            size = int(np.sum(off[codes + 2] - off[codes + 1]))
+            active.append((size, col, codes))
+
+        if not active:
+            return np.arange(lo, hi, dtype=np.int64)
+
+        # Seed from the smallest candidate set, clipped to the month slice.
+        active.sort(key=lambda a: a[0])
+        _, col0, codes0 = active[0]
+        parts = []
+        for code in codes0:
+            posting = self._posting(col0, int(code))
+            a, b = np.searchsorted(posting, [lo, hi])
+            parts.append(posting[a:b])
+        rows = np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+        if len(parts) > 1:
+            rows.sort()
+
+        for _, col, codes in active[1:]:
+            if len(rows) == 0:
+                break
+            # Lookup table over codes; the extra trailing False absorbs code -1.
+            lut = np.zeros(len(self._labels[col]) + 1, dtype=bool)
+            lut[codes] = True
+            rows = rows[lut[self._codes[col][rows]]]
+        return rows
@@ -0,0 +1,241 @@
+"""
+Batch forecasts of net revenue per Brands x shop x shipping_country series.
+
+Every series is a row of one (series x months) array built from the cube
+cells on a dense month axis (months without sales are 0), and both models
+are fitted on all rows at once:
+
+    Seasonal naive  the same month last year; the interval grows with each
+                    further year of the horizon.
+    Holt-Winters    additive level/trend/season (ETS(A,A,A)). The smoothing
+                    parameters are picked per series from a small grid that
+                    is evaluated as an extra array axis, so the recursion only
+                    loops over months, never over series or parameters.
+
+Intervals are normal: mean +/- z * sqrt(var), with the analytic h-step
+variance of each model. A selection's forecast is the sum over its series,
+with variances added as if the series were independent.
+
+    python forecast.py --model holt-winters --horizon 12 --out forecast.csv
+"""
+from __future__ import annotations
+
+import argparse
+from dataclasses import dataclass
+from pathlib import Path
+from statistics import NormalDist
+from typing import Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from cube import Cube
+from time_intel import month_label
+
+FORECAST_DIMS = ["Brands", "shop", "shipping_country"]
+FORECAST_MEASURE = "net_revenue_gbp"
+SEASON = 12
+HORIZON = 12
+LEVELS = (0.8, 0.95)
+
+# Holt-Winters grid; combinations outside 0 <= beta <= alpha, 0 <= gamma <= 1 - alpha are dropped.
+ALPHAS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.7, 0.9)
+BETAS = (0.0, 0.01, 0.05, 0.1, 0.2)
+GAMMAS = (0.0, 0.05, 0.1, 0.2, 0.4)
+CHUNK_SERIES = 2048
+
+
+# ============================================================
+# Series matrix
+# ============================================================
+def series_matrix(
+    cube: Cube, dims: Sequence[str] = FORECAST_DIMS, measure: str = FORECAST_MEASURE
+) -> Tuple[pd.DataFrame, np.ndarray, int, np.ndarray]:
+    """
+    (series labels, values (series x months), first month key, series of each cube cell).
+    The month axis runs densely from the first to the last month in the cube.
+    """
+    cells = cube.cells
+    dims = [d for d in dims if d in cube.dims]
+    if dims:
+        series = cells.groupby(dims, observed=True, dropna=False, sort=True).ngroup().to_numpy()
+    else:
+        series = np.zeros(len(cells), dtype=np.int64)
+    n_series = int(series.max()) + 1 if len(series) else 0
+    _, first_cell = np.unique(series, return_index=True)
+    keys = cells[dims].iloc[first_cell].reset_index(drop=True)
+
+    ym = cells["ym_key"].to_numpy()
+    first = int(ym.min()) if len(ym) else 0
+    n_months = int(ym.max()) - first + 1 if len(ym) else 0
+    y = np.zeros((n_series, n_months))
+    np.add.at(y, (series, ym - first), cells[measure].to_numpy(dtype=np.float64))
+    return keys, y, first, series
+
+
+# ============================================================
+# Models: (series x months) -> mean, variance (series x horizon)
+# ============================================================
+def seasonal_naive(y: np.ndarray, horizon: int = HORIZON, m: int = SEASON) -> Tuple[np.ndarray, np.ndarray]:
+    n_series, n_months = y.shape
+    if n_months <= m:
+        raise ValueError(f"seasonal naive needs more than {m} months, got {n_months}")
+    h = np.arange(horizon)
+    mean = y[:, n_months - m + h % m]
+    resid = y[:, m:] - y[:, :-m]
+    sigma2 = (resid ** 2).mean(axis=1, keepdims=True)
+    return mean, sigma2 * (h // m + 1)
+
+
+def _grid() -> np.ndarray:
+    g = [(a, b, c) for a in ALPHAS for b in BETAS for c in GAMMAS if b <= a and c <= 1 - a]
+    return np.array(g)
+
+
+def holt_winters(
+    y: np.ndarray, horizon: int = HORIZON, m: int = SEASON, chunk: int = CHUNK_SERIES
+) -> Tuple[np.ndarray, np.ndarray]:
+    n_series, n_months = y.shape
+    if n_months < 2 * m:
+        raise ValueError(f"Holt-Winters needs at least {2 * m} months, got {n_months}")
+    if n_series > chunk:
+        # The grid axis multiplies the state; bound it by fitting slices of series.
+        parts = [holt_winters(y[i:i + chunk], horizon, m, chunk) for i in range(0, n_series, chunk)]
+        return np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts])
+    grid = _grid()
+    alpha, beta, gamma = (grid[:, i, None] for i in range(3))  # (grid, 1)
+
+    # Classical start: trend = year-on-year change per month; the first-year
+    # mean is the level mid-year, so the season is the first year minus that
+    # line and the recursion starts one month before the data.
+    mid = (m - 1) / 2
+    l0 = y[:, :m].mean(axis=1)
+    b0 = (y[:, m:2 * m].mean(axis=1) - l0) / m
+    s0 = y[:, :m] - (l0[:, None] + b0[:, None] * (np.arange(m) - mid))
+    level = np.repeat((l0 - b0 * (mid + 1))[None, :], len(grid), axis=0)
+    trend = np.repeat(b0[None, :], len(grid), axis=0)
+    season = np.repeat(s0.T[:, None, :], len(grid), axis=1)  # (m, grid, series)
+    sse = np.zeros_like(level)
+    for t in range(n_months):
+        s = season[t % m]
+        e = y[:, t] - (level + trend + s)
+        sse += e * e
+        level, trend = level + trend + alpha * e, trend + beta * e
+        s += gamma * e
+
+    best = sse.argmin(axis=0)
+    rows = np.arange(n_series)
+    level, trend, sse = level[best, rows], trend[best, rows], sse[best, rows]
+    season = season[:, best, rows].T  # (series, m)
+    a, b, g = (grid[best, i][:, None] for i in range(3))
+
+    h = np.arange(1, horizon + 1)
+    mean = level[:, None] + h * trend[:, None] + season[:, (n_months + h - 1) % m]
+    # var_h = sigma^2 * (1 + sum_{j<h} c_j^2), c_j = alpha + beta j + gamma [j % m == 0]
+    j = np.arange(1, horizon)
+    c2 = (a + b * j + g * (j % m == 0)) ** 2
+    sigma2 = (sse / n_months)[:, None]
+    var = sigma2 * (1 + np.concatenate([np.zeros((n_series, 1)), np.cumsum(c2, axis=1)], axis=1))
+    return mean, var
+
+
+MODELS: Dict[str, Callable[..., Tuple[np.ndarray, np.ndarray]]] = {
+    "Holt-Winters": holt_winters,
+    "Seasonal naive": seasonal_naive,
+}
+
+
+# ============================================================
+# Fitted batch
+# ============================================================
+@dataclass
+class Forecast:
+    model: str
+    dims: List[str]
+    keys: pd.DataFrame  # one row of series labels per series
+    months: List[str]  # forecast YearMonth labels
+    mean: np.ndarray  # (series, horizon)
+    var: np.ndarray  # (series, horizon)
+    last_month: str  # last month of history
+    series_of: np.ndarray  # series of each cube cell
+    exact_dims: List[str]  # filter dims that select whole series (the series dims + dims they determine)
+
+    @classmethod
+    def fit(
+        cls,
+        cube: Cube,
+        model: str = "Holt-Winters",
+        horizon: int = HORIZON,
+        dims: Sequence[str] = FORECAST_DIMS,
+        measure: str = FORECAST_MEASURE,
+    ) -> "Forecast":
+        keys, y, first, series = series_matrix(cube, dims, measure)
+        mean, var = MODELS[model](y, horizon)
+        last = first + y.shape[1] - 1
+        # e.g. Company: constant within every Brands series, so filtering on it selects whole series.
+        other = [d for d in cube.dims if d not in keys.columns and d != "YearMonth"]
+        if other:
+            nunique = cube.cells.groupby(series)[other].nunique(dropna=False).max()
+            other = [d for d in other if nunique[d] <= 1]
+        return cls(
+            model=model,
+            dims=list(keys.columns),
+            keys=keys,
+            months=[month_label(last + h) for h in range(1, horizon + 1)],
+            mean=mean,
+            var=var,
+            last_month=month_label(last),
+            series_of=series,
+            exact_dims=[*keys.columns, *other],
+        )
+
+    def select(self, cube: Cube, filters: Optional[Mapping[str, object]] = None) -> np.ndarray:
+        """Series with at least one cube cell in the (non-month) selection."""
+        flt = {k: v for k, v in (filters or {}).items() if k != "YearMonth"}
+        return np.unique(self.series_of[cube.select(flt)])
+
+    def inexact(self, filters: Optional[Mapping[str, object]] = None) -> List[str]:
+        """Active filters a series-level forecast cannot apply (it covers whole series)."""
+        return [k for k, v in (filters or {}).items() if k != "YearMonth" and k not in self.exact_dims and v]
+
+    def total(self, series: Optional[np.ndarray] = None, level: float = LEVELS[0]) -> pd.DataFrame:
+        """Summed forecast of `series` (default all) with its `level` interval."""
+        rows = slice(None) if series is None else series
+        mean = self.mean[rows].sum(axis=0)
+        sd = np.sqrt(self.var[rows].sum(axis=0))
+        z = NormalDist().inv_cdf(0.5 + level / 2)
+        return pd.DataFrame({"YearMonth": self.months, "forecast": mean, "lower": mean - z * sd, "upper": mean + z * sd})
+
+    def table(self, level: float = LEVELS[0]) -> pd.DataFrame:
+        """Long per-series frame: series labels, YearMonth, forecast, lower, upper."""
+        n_series, horizon = self.mean.shape
+        z = NormalDist().inv_cdf(0.5 + level / 2)
+        sd = np.sqrt(self.var).ravel()
+        out = self.keys.iloc[np.repeat(np.arange(n_series), horizon)].reset_index(drop=True)
+        out["YearMonth"] = np.tile(self.months, n_series)
+        out["forecast"] = self.mean.ravel()
+        out["lower"] = out["forecast"] - z * sd
+        out["upper"] = out["forecast"] + z * sd
+        return out
+
+
+def main() -> None:
+    import data_store
+
+    ap = argparse.ArgumentParser(description="Forecast net revenue for every Brands x shop x country series.")
+    ap.add_argument("--model", choices=[m.lower().replace(" ", "-") for m in MODELS], default="holt-winters")
+    ap.add_argument("--horizon", type=int, default=HORIZON)
+    ap.add_argument("--level", type=float, default=LEVELS[0])
+    ap.add_argument("--out", type=Path, default=Path("net_revenue_forecast.csv"))
+    args = ap.parse_args()
+
+    base = Path(__file__).resolve().parent
+    cube = Cube.from_frame(data_store.load_prepared(base / "monthly_aggregates.csv"))
+    model = {m.lower().replace(" ", "-"): m for m in MODELS}[args.model]
+    fc = Forecast.fit(cube, model, args.horizon)
+    fc.table(args.level).to_csv(args.out, index=False)
+    print(f"{model}: {len(fc.keys):,} series x {args.horizon} months -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Measure layer: additive sums and the ratios derived from them.
+
+Mirrors powerbi_measures_dax.txt. Every ratio is stored as a (numerator,
+denominator) pair of additive sums and divided only at query time, so it is
+correct at any roll-up level (no means of means) and costs the same to
+aggregate as the sums. The has_coupon split is precomputed as masked columns,
+so coupon breakdowns are also a single groupby().sum() (or cube roll-up)
+followed by column arithmetic, with no Python callback per group.
+"""
+from __future__ import annotations
+
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+
+# masked column -> (source column, has_coupon value it keeps)
+MASKED_COLUMNS = {
+    "coupon_orders": ("orders", True),
+    "nocoupon_orders": ("orders", False),
+    "coupon_net_revenue_gbp": ("net_revenue_gbp", True),
+    "nocoupon_net_revenue_gbp": ("net_revenue_gbp", False),
+}
+
+# ratio -> (numerator sum, denominator sum), i.e. DIVIDE(numerator, denominator)
+RATIOS = {
+    "aov_gbp": ("net_revenue_gbp", "orders"),  # AOV (GBP)
+    "refund_rate": ("refund_gbp", "order_total_gbp"),  # Refund Rate
+    # Weighted Avg Discount Rate. The monthly fact only has a per-cell average
+    # rate, so SUMX(Discount_rate * Order Total) is rebuilt per cell as
+    # avg_discount_rate * order_total_gbp over the cells that have a rate
+    # (see cube.ADDITIVE_MEASURES).
+    "avg_discount_rate": ("discount_wsum", "discount_weight"),
+    "coupon_usage": ("coupon_orders", "orders"),  # Coupon Usage %
+    "coupon_revenue_share": ("coupon_net_revenue_gbp", "net_revenue_gbp"),
+    "aov_coupon": ("coupon_net_revenue_gbp", "coupon_orders"),  # AOV (Coupon)
+    "aov_nocoupon": ("nocoupon_net_revenue_gbp", "nocoupon_orders"),  # AOV (No Coupon)
+    # Coverage over the orders whose cells carry counters (see cube.ADDITIVE_MEASURES).
+    "customer_id_coverage": ("orders_with_customer_id", "covered_orders"),
+    "coupon_code_coverage": ("orders_has_coupon_with_code", "covered_coupon_orders"),
+    "counter_coverage": ("covered_orders", "orders"),  # share of orders with known coverage
+}
+
+COVERAGE_RATIOS = ["customer_id_coverage", "coupon_code_coverage", "counter_coverage"]
+
+COUPON_RATIOS = ["coupon_usage", "coupon_revenue_share", "aov_coupon", "aov_nocoupon"]
+
+COUPON_SUMS = ["orders", "net_revenue_gbp", *MASKED_COLUMNS]
+
+
+def add_masked_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Return `df` plus one column per MASKED_COLUMNS entry (value where has_coupon matches, else 0)."""
+    if "has_coupon" not in df.columns:
+        return df
+    flag = df["has_coupon"].to_numpy(dtype=bool)
+    extra = {}
+    for name, (src, keep) in MASKED_COLUMNS.items():
+        if src in df.columns:
+            values = df[src].to_numpy(dtype=np.float64)
+            extra[name] = np.where(flag == keep, values, 0.0)
+    return df.assign(**extra)
+
+
+def required_sums(measures: Sequence[str]) -> list:
+    """Additive columns needed to answer `measures` (sums pass through, ratios expand)."""
+    out = []
+    for m in measures:
+        for col in RATIOS.get(m, (m,)):
+            if col not in out:
+                out.append(col)
+    return out
+
+
+def derive_ratios(sums: pd.DataFrame, ratios: Sequence[str]) -> pd.DataFrame:
+    """Add each ratio in `ratios` whose numerator and denominator columns are present."""
+    extra = {}
+    for name in ratios:
+        num, den = RATIOS[name]
+        if num in sums.columns and den in sums.columns:
+            d = sums[den].astype("float64")
+            extra[name] = sums[num] / d.where(d != 0)
+    return sums.assign(**extra)
+
+
+def coupon_metrics(sums: pd.DataFrame) -> pd.DataFrame:
+    """Derive the coupon ratios from a frame holding the COUPON_SUMS columns."""
+    return derive_ratios(sums, COUPON_RATIOS)
+
+
+def coupon_metrics_by(df: pd.DataFrame, by: Sequence[str]) -> pd.DataFrame:
+    """Coupon metrics per group of a fact frame: one groupby().sum() over the masked columns."""
+    masked = add_masked_columns(df)
+    cols = [c for c in COUPON_SUMS if c in masked.columns]
+    sums = masked.groupby(list(by), as_index=False, observed=True, sort=True)[cols].sum()
+    return coupon_metrics(sums)
@@ -0,0 +1,299 @@
+"""
+Optional order-level backend (FactOrders).
+
+The order export (`websales_coupon_merged_cleaned.csv`, ~1M rows, one row per
+order) is streamed once into hive-partitioned Parquet, one directory per
+YearMonth:
+
+    python orders_backend.py build websales_coupon_merged_cleaned.csv
+
+`OrderStore` queries that dataset with pyarrow.dataset: the sidebar filters
+become a dataset expression, so YearMonth prunes whole partitions and the
+other predicates/projections are pushed into the Parquet scan. Distinct
+order counts, true top-N orders and drill-through lists run over the full
+history in bounded memory, without loading it into the Streamlit process.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import shutil
+from pathlib import Path
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.dataset as ds
+
+ORDERS_DIR_NAME = "orders_parquet"
+
+PARTITION_COL = "YearMonth"
+
+# Columns kept from the order export, with their Arrow types.
+ORDER_COLUMNS = {
+    "boss_order_id": pa.string(),
+    "order_date": pa.string(),
+    "Company": pa.string(),
+    "Brands": pa.string(),
+    "shop": pa.string(),
+    "shipping_country": pa.string(),
+    "payment_method": pa.string(),
+    "campaign_type_clean": pa.string(),
+    "has_coupon": pa.bool_(),
+    "coupon_code": pa.string(),
+    "Customer_ID": pa.string(),
+    "Order Total (GBP)": pa.float64(),
+    "Refund (GBP)": pa.float64(),
+    "net_revenue_gbp": pa.float64(),
+    "Discount_rate": pa.float64(),
+}
+
+ORDER_ID = "boss_order_id"
+
+_PARTITIONING = ds.partitioning(pa.schema([(PARTITION_COL, pa.string())]), flavor="hive")
+
+
+# ============================================================
+# Build
+# ============================================================
+def clean_batch(batch: pa.RecordBatch) -> pa.RecordBatch:
+    """Same clean-up as data_store.prepare_monthly, plus the YearMonth partition key."""
+    cols = {name: batch.column(name) for name in batch.schema.names}
+    for name in ("Company", "Brands", "shop", "shipping_country", "campaign_type_clean"):
+        if name in cols:
+            cols[name] = pc.utf8_trim_whitespace(cols[name])
+    if "campaign_type_clean" in cols:
+        cols["campaign_type_clean"] = pc.replace_substring_regex(
+            cols["campaign_type_clean"], pattern="(?i)^no coupon$", replacement="No campaign"
+        )
+    if "has_coupon" in cols:
+        cols["has_coupon"] = pc.fill_null(cols["has_coupon"], False)
+    cols[PARTITION_COL] = pc.utf8_slice_codeunits(cols["order_date"], 0, 7)
+    return pa.RecordBatch.from_arrays(list(cols.values()), names=list(cols))
+
+
+def open_order_csv(csv_path: Path, block_size: int = 64 << 20) -> Iterator[pa.RecordBatch]:
+    """Stream an order CSV as cleaned record batches (ORDER_COLUMNS plus YearMonth)."""
+    csv_path = Path(csv_path)
+    with open(csv_path, newline="", encoding="utf-8") as fh:
+        header = next(csv.reader(fh))
+    keep = [c for c in ORDER_COLUMNS if c in header]
+    if "order_date" not in keep:
+        raise ValueError(f"{csv_path.name} has no `order_date` column.")
+
+    reader = pacsv.open_csv(
+        csv_path,
+        read_options=pacsv.ReadOptions(block_size=block_size),
+        convert_options=pacsv.ConvertOptions(
+            include_columns=keep,
+            column_types={c: ORDER_COLUMNS[c] for c in keep},
+            true_values=["True", "true", "1"],
+            false_values=["False", "false", "0"],
+            strings_can_be_null=True,
+        ),
+    )
+    for batch in reader:
+        yield clean_batch(batch)
+
+
+def _write_tree(batches: Iterator[pa.RecordBatch], out: Path) -> bool:
+    """Write batches as a fresh hive-partitioned tree at `out`; False when there were none."""
+    batches = iter(batches)
+    first = next(batches, None)
+    if first is None:
+        return False
+
+    def all_batches() -> Iterator[pa.RecordBatch]:
+        yield first
+        yield from batches
+
+    shutil.rmtree(out, ignore_errors=True)
+    ds.write_dataset(
+        all_batches(),
+        str(out),
+        schema=first.schema,
+        format="parquet",
+        partitioning=_PARTITIONING,
+        existing_data_behavior="overwrite_or_ignore",
+        max_rows_per_group=128 * 1024,
+    )
+    return True
+
+
+def build_partitions(csv_path: Path, root: Optional[Path] = None, block_size: int = 64 << 20) -> Path:
+    """
+    Stream the order CSV into `root` (default: orders_parquet/ next to it),
+    one Parquet partition per YearMonth. The CSV is read block by block, so
+    memory stays bounded by `block_size`. The new tree replaces the old one
+    only once it is complete.
+    """
+    csv_path = Path(csv_path)
+    root = Path(root) if root is not None else csv_path.parent / ORDERS_DIR_NAME
+    tmp = root.with_name(root.name + ".tmp")
+    if not _write_tree(open_order_csv(csv_path, block_size), tmp):
+        raise ValueError(f"{csv_path.name} has no rows.")
+    shutil.rmtree(root, ignore_errors=True)
+    tmp.rename(root)
+    return root
+
+
+def replace_months(batches: Iterator[pa.RecordBatch], root: Path) -> List[str]:
+    """
+    Replace the partitions of every YearMonth present in `batches` (a delta,
+    see open_order_csv) and leave all other months untouched. Returns the
+    months written.
+    """
+    root = Path(root)
+    tmp = root.with_name(root.name + ".delta")
+    if not _write_tree(batches, tmp):
+        return []
+    months = []
+    root.mkdir(parents=True, exist_ok=True)
+    # Replaced partitions move out of the dataset root, where no scan sees them.
+    old = root.with_name(root.name + ".old")
+    shutil.rmtree(old, ignore_errors=True)
+    old.mkdir()
+    for part in sorted(tmp.glob(f"{PARTITION_COL}=*")):
+        target = root / part.name
+        if target.exists():
+            target.rename(old / part.name)
+        part.rename(target)
+        months.append(part.name.split("=", 1)[1])
+    shutil.rmtree(old, ignore_errors=True)
+    shutil.rmtree(tmp, ignore_errors=True)
+    return months
+
+
+# ============================================================
+# Query
+# ============================================================
+class OrderStore:
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.dataset = ds.dataset(str(self.root), format="parquet", partitioning=_PARTITIONING)
+
+    @classmethod
+    def open(cls, root: Path) -> Optional["OrderStore"]:
+        """OrderStore for `root`, or None when no order partitions were built."""
+        root = Path(root)
+        if not root.is_dir() or not any(root.glob(f"{PARTITION_COL}=*")):
+            return None
+        return cls(root)
+
+    @property
+    def columns(self) -> List[str]:
+        return self.dataset.schema.names
+
+    def expression(self, filters: Optional[Mapping[str, object]] = None) -> Optional[ds.Expression]:
+        """Dataset expression for a sidebar filter dict ({"YearMonth": (from, to), col: [values]})."""
+        expr = None
+        names = set(self.columns)
+        for col, value in (filters or {}).items():
+            if col not in names or value is None or len(value) == 0:
+                continue
+            if col == PARTITION_COL and isinstance(value, tuple):
+                part = (ds.field(col) >= str(value[0])) & (ds.field(col) <= str(value[1]))
+            else:
+                part = ds.field(col).isin(list(value))
+            expr = part if expr is None else expr & part
+        return expr
+
+    def _scanner(
+        self,
+        filters: Optional[Mapping[str, object]] = None,
+        columns: Optional[Sequence[str]] = None,
+        where: Optional[Mapping[str, object]] = None,
+    ) -> ds.Scanner:
+        expr = self.expression(filters)
+        for col, value in (where or {}).items():
+            part = ds.field(col) == value
+            expr = part if expr is None else expr & part
+        cols = [c for c in columns if c in self.columns] if columns else None
+        return self.dataset.scanner(columns=cols, filter=expr)
+
+    def scan(
+        self,
+        filters: Optional[Mapping[str, object]] = None,
+        columns: Optional[Sequence[str]] = None,
+        where: Optional[Mapping[str, object]] = None,
+    ) -> Iterator[pa.RecordBatch]:
+        yield from self._scanner(filters, columns, where).to_batches()
+
+    def count_rows(self, filters: Optional[Mapping[str, object]] = None) -> int:
+        return self.dataset.count_rows(filter=self.expression(filters))
+
+    def distinct_orders(self, filters: Optional[Mapping[str, object]] = None) -> int:
+        """
+        DISTINCTCOUNT(boss_order_id) for the filter selection. The rows of an
+        order share its order_date, so an id never spans two YearMonth
+        partitions: the count is summed per partition, streaming its batches
+        into that partition's distinct ids only.
+        """
+        expr = self.expression(filters)
+        months: Dict[str, List[ds.Fragment]] = {}
+        for fragment in self.dataset.get_fragments(filter=expr):
+            key = ds.get_partition_keys(fragment.partition_expression).get(PARTITION_COL)
+            months.setdefault(key, []).append(fragment)
+        total = 0
+        for fragments in months.values():
+            seen = pa.array([], type=pa.string())
+            for fragment in fragments:
+                for batch in fragment.to_batches(schema=self.dataset.schema, columns=[ORDER_ID], filter=expr):
+                    ids = pc.unique(batch.column(ORDER_ID).cast(pa.string()).drop_null())
+                    seen = pc.unique(pa.concat_arrays([seen, ids]))
+            total += len(seen)
+        return total
+
+    def top_orders(
+        self,
+        filters: Optional[Mapping[str, object]] = None,
+        n: int = 200,
+        by: str = "Order Total (GBP)",
+        columns: Optional[Sequence[str]] = None,
+    ) -> pd.DataFrame:
+        """Top-n orders by `by`, kept as a running top-n per scanned batch (memory ~ n rows)."""
+        if columns and by not in columns:
+            columns = [*columns, by]
+        best: Optional[pa.Table] = None
+        for batch in self.scan(filters, columns):
+            if batch.num_rows == 0:
+                continue
+            cand = pa.Table.from_batches([batch])
+            if best is not None:
+                cand = pa.concat_tables([best, cand])
+            idx = pc.select_k_unstable(cand, k=min(n, cand.num_rows), sort_keys=[(by, "descending")])
+            best = cand.take(idx)
+        if best is None:
+            return pd.DataFrame(columns=list(columns or self.columns))
+        best = best.take(pc.sort_indices(best, sort_keys=[(by, "descending")]))
+        return best.to_pandas()
+
+    def drill(
+        self,
+        filters: Optional[Mapping[str, object]] = None,
+        where: Optional[Mapping[str, object]] = None,
+        limit: int = 1000,
+        columns: Optional[Sequence[str]] = None,
+    ) -> pd.DataFrame:
+        """Drill-through: orders matching the filters plus `where` (col -> value), first `limit` rows."""
+        return self._scanner(filters, columns, where).head(limit).to_pandas()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Order-level Parquet backend.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build", help="Partition an order CSV into Parquet by YearMonth.")
+    b.add_argument("csv", type=Path)
+    b.add_argument("--out", type=Path, default=None)
+    args = ap.parse_args()
+
+    if args.cmd == "build":
+        root = build_partitions(args.csv, args.out)
+        store = OrderStore(root)
+        print(f"{store.count_rows():,} orders -> {root} ({len(store.dataset.files)} files)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,434 @@
+"""
+RFM scoring and k-means segmentation of customers.
+
+Produces the two Tab 4 inputs from order-level data:
+
+    python rfm_pipeline.py build                  # from orders_parquet/
+    python rfm_pipeline.py build --csv orders.csv # straight from the order export
+    python rfm_pipeline.py build --incremental    # only orders after the last run
+
+Output goes to rfm_output/ (git-ignored) unless `--out` says otherwise; pass
+`--out .` to replace the CSVs the dashboard reads.
+
+Orders are streamed in record batches and reduced with Arrow group-bys, first
+to one row per (Customer_ID, order id), so an order with several rows counts
+once in Frequency, then per Customer_ID. An order never spans two months, so
+with orders_parquet/ (read partition by partition) the order rows are folded
+into the customer aggregates month by month and memory is bounded by the
+customers plus one month of orders; an order export CSV keeps its order rows
+until the end. Scores are vectorised rank
+quintiles; clusters come from mini-batch k-means in NumPy on standardised
+log R/F/M.
+
+The customer aggregates, the order_date watermark (with the ids of the
+orders already counted on that day), the feature scaling and the centroids
+are kept in rfm_state/. An incremental run aggregates only orders dated on
+or after the watermark, skipping those ids, so orders that land late on the
+watermark day are still counted. It merges them into the customers they touch,
+re-scores everyone (cheap, vectorised) and refines the previous centroids on
+the changed customers. It assumes orders are append-only; use a full build
+after corrections to past months.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from orders_backend import ORDER_ID, ORDERS_DIR_NAME, PARTITION_COL, OrderStore, open_order_csv
+
+RFM_TABLE = "rfm_customer_table.csv"
+RFM_TARGETS = "rfm_target_list.csv"
+OUTPUT_DIR_NAME = "rfm_output"
+STATE_DIR_NAME = "rfm_state"
+
+CUSTOMER_ID = "Customer_ID"
+DATE_COL = "order_date"
+MONEY_COL = "net_revenue_gbp"
+
+RFM_COLUMNS = [
+    "Customer_ID",
+    "last_order_date",
+    "frequency",
+    "monetary",
+    "recency_days",
+    "R_score",
+    "F_score",
+    "M_score",
+    "RFM_Score",
+    "RFM_Segment",
+    "kmeans_cluster",
+]
+
+# (segment, R range, F range), first match wins.
+SEGMENTS = [
+    ("Champions", (4, 5), (4, 5)),
+    ("Loyal Customers", (3, 3), (4, 5)),
+    ("Potential Loyalists", (4, 5), (2, 3)),
+    ("New Customers", (5, 5), (1, 1)),
+    ("Promising", (4, 4), (1, 1)),
+    ("Need Attention", (3, 3), (3, 3)),
+    ("About to Sleep", (3, 3), (1, 2)),
+    ("At Risk", (1, 2), (3, 5)),
+    ("Hibernating", (1, 2), (1, 2)),
+]
+
+# Win-back list: valuable customers (M_score >= 4) in these segments, by monetary.
+TARGET_SEGMENTS = ["At Risk", "Hibernating"]
+TARGET_MIN_M = 4
+TARGET_SIZE = 2000
+
+N_CLUSTERS = 4
+
+# Rows of partial aggregates held before they are merged.
+MERGE_ROWS = 4_000_000
+
+# Applied to one row per (customer, order): the count is the number of distinct orders.
+_AGGS = [(DATE_COL, "max"), (ORDER_ID, "count"), (MONEY_COL, "sum")]
+_NAMES = {f"{DATE_COL}_max": "last_order_date", f"{ORDER_ID}_count": "frequency", f"{MONEY_COL}_sum": "monetary"}
+
+
+# ============================================================
+# Streaming aggregation
+# ============================================================
+def _reduce(parts: List[pa.Table]) -> pa.Table:
+    """Merge partial (Customer_ID, last_order_date, frequency, monetary) tables."""
+    t = pa.concat_tables(parts).group_by(CUSTOMER_ID).aggregate(
+        [("last_order_date", "max"), ("frequency", "sum"), ("monetary", "sum")]
+    )
+    return t.rename_columns([c.rsplit("_", 1)[0] if c != CUSTOMER_ID else c for c in t.column_names])
+
+
+def _orders(parts: List[pa.Table]) -> pa.Table:
+    """Merge partial order rows into one row per (Customer_ID, order id)."""
+    t = pa.concat_tables(parts).group_by([CUSTOMER_ID, ORDER_ID]).aggregate([(DATE_COL, "max"), (MONEY_COL, "sum")])
+    return t.rename_columns([c.rsplit("_", 1)[0] if c not in (CUSTOMER_ID, ORDER_ID) else c for c in t.column_names])
+
+
+def _customers(orders: pa.Table) -> pa.Table:
+    """One row per (customer, order) -> (Customer_ID, last_order_date, frequency, monetary)."""
+    t = orders.group_by(CUSTOMER_ID).aggregate(_AGGS)
+    t = t.rename_columns([_NAMES.get(c, c) for c in t.column_names])
+    return t.select([CUSTOMER_ID, "last_order_date", "frequency", "monetary"])
+
+
+def aggregate_customers(
+    batches: Iterator[pa.RecordBatch], month_ordered: bool = False
+) -> Tuple[pa.Table, Optional[str], Set[str]]:
+    """
+    Per-customer last order date, distinct order count and net revenue over a
+    stream of order batches, plus the latest order date and the ids of the
+    orders on it. `month_ordered`: the batches come month by month
+    (orders_parquet/), so each month's orders are complete once the next starts.
+    """
+    parts: List[pa.Table] = []  # customer aggregates of finished months
+    orders: List[pa.Table] = []  # order rows of the open month(s)
+    held, month = 0, None
+    last, last_ids = None, set()
+    for batch in batches:
+        t = pa.Table.from_batches([batch])
+        ids = pc.utf8_trim_whitespace(t.column(CUSTOMER_ID))
+        t = t.set_column(t.schema.get_field_index(CUSTOMER_ID), CUSTOMER_ID, ids)
+        t = t.filter(pc.and_(pc.is_valid(ids), pc.not_equal(ids, "")))
+        if t.num_rows == 0:
+            continue
+        day = pc.max(t.column(DATE_COL)).as_py()
+        if day is not None and (last is None or day >= last):
+            if day != last:
+                last, last_ids = day, set()
+            last_ids.update(t.filter(pc.equal(t.column(DATE_COL), day)).column(ORDER_ID).to_pylist())
+        if month_ordered and t.column(PARTITION_COL)[0].as_py() != month:
+            if orders:
+                parts.append(_customers(_orders(orders)))
+                orders, held = [], 0
+                if sum(p.num_rows for p in parts) > MERGE_ROWS:
+                    parts = [_reduce(parts)]
+            month = t.column(PARTITION_COL)[0].as_py()
+        orders.append(_orders([t.select([CUSTOMER_ID, ORDER_ID, DATE_COL, MONEY_COL])]))
+        held += orders[-1].num_rows
+        if held > MERGE_ROWS:
+            orders = [_orders(orders)]
+            held = orders[0].num_rows
+    if orders:
+        parts.append(_customers(_orders(orders)))
+    if not parts:
+        schema = pa.schema(
+            [(CUSTOMER_ID, pa.string()), ("last_order_date", pa.string()), ("frequency", pa.int64()), ("monetary", pa.float64())]
+        )
+        return schema.empty_table(), last, last_ids
+    return _reduce(parts), last, last_ids
+
+
+def order_batches(
+    orders_root: Optional[Path] = None,
+    csv_path: Optional[Path] = None,
+    since: Optional[str] = None,
+    skip: Sequence[str] = (),
+) -> Iterator[pa.RecordBatch]:
+    """
+    Order batches (Customer_ID, order id, date, net revenue, YearMonth),
+    optionally only from a date on and without the order ids in `skip`.
+    """
+    cols = [CUSTOMER_ID, ORDER_ID, DATE_COL, MONEY_COL, PARTITION_COL]
+    skip = pa.array(list(skip), pa.string())
+    if csv_path is not None:
+        for batch in open_order_csv(csv_path):
+            t = pa.Table.from_batches([batch]).select(cols)
+            if since is not None:
+                t = t.filter(pc.greater_equal(t.column(DATE_COL), since))
+            if len(skip):
+                t = t.filter(pc.invert(pc.is_in(t.column(ORDER_ID), value_set=skip)))
+            yield from t.to_batches()
+        return
+    store = OrderStore.open(orders_root)
+    if store is None:
+        raise FileNotFoundError(f"No order partitions in {orders_root}; pass --csv or build them first.")
+    expr = None
+    if since is not None:
+        # Partition pruning on YearMonth, then the exact date predicate.
+        expr = (ds.field(PARTITION_COL) >= since[:7]) & (ds.field(DATE_COL) >= since)
+    if len(skip):
+        expr = ~ds.field(ORDER_ID).isin(skip) if expr is None else expr & ~ds.field(ORDER_ID).isin(skip)
+    yield from store.dataset.to_batches(columns=cols, filter=expr)
+
+
+# ============================================================
+# Scoring
+# ============================================================
+def quintile_scores(values: np.ndarray, higher_is_better: bool = True) -> np.ndarray:
+    """1-5 scores from rank quintiles (ties broken by position, like qcut on rank(method="first"))."""
+    n = len(values)
+    if n == 0:
+        return np.empty(0, dtype=np.int8)
+    order = np.argsort(values if higher_is_better else -values, kind="stable")
+    rank = np.empty(n, dtype=np.int64)
+    rank[order] = np.arange(n)
+    return (rank * 5 // n + 1).astype(np.int8)
+
+
+def segment(r: np.ndarray, f: np.ndarray) -> np.ndarray:
+    conds = [(r >= r0) & (r <= r1) & (f >= f0) & (f <= f1) for _, (r0, r1), (f0, f1) in SEGMENTS]
+    return np.select(conds, [name for name, _, _ in SEGMENTS], default="Others")
+
+
+def score(customers: pd.DataFrame, as_of: pd.Timestamp) -> pd.DataFrame:
+    """Add recency_days, R/F/M scores, RFM_Score and RFM_Segment."""
+    last = pd.to_datetime(customers["last_order_date"], errors="coerce")
+    recency = (as_of - last).dt.days.to_numpy()
+    r = quintile_scores(recency.astype(np.float64), higher_is_better=False)
+    f = quintile_scores(customers["frequency"].to_numpy(np.float64))
+    m = quintile_scores(customers["monetary"].to_numpy(np.float64))
+    return customers.assign(
+        recency_days=recency,
+        R_score=r,
+        F_score=f,
+        M_score=m,
+        RFM_Score=r.astype(np.int32) * 100 + f.astype(np.int32) * 10 + m,
+        RFM_Segment=segment(r, f),
+    )
+
+
+def filter_rfm(rfm: pd.DataFrame, seg_sel: tuple, clu_sel: tuple, rec_rng: Optional[tuple]) -> pd.DataFrame:
+    """RFM table rows in the selected segments, clusters and recency range (the Tab 4 controls)."""
+    rf = rfm
+    if seg_sel and "RFM_Segment" in rf.columns:
+        rf = rf[rf["RFM_Segment"].isin(seg_sel)]
+    if clu_sel and "kmeans_cluster" in rf.columns:
+        rf = rf[rf["kmeans_cluster"].isin(clu_sel)]
+    if rec_rng and "recency_days" in rf.columns:
+        rf = rf[(rf["recency_days"] >= rec_rng[0]) & (rf["recency_days"] <= rec_rng[1])]
+    return rf
+
+
+# ============================================================
+# Mini-batch k-means
+# ============================================================
+def features(customers: pd.DataFrame) -> np.ndarray:
+    cols = ["recency_days", "frequency", "monetary"]
+    return np.log1p(np.clip(customers[cols].to_numpy(np.float64), 0, None))
+
+
+def _nearest(x: np.ndarray, centroids: np.ndarray, chunk: int = 1 << 18) -> np.ndarray:
+    out = np.empty(len(x), dtype=np.int32)
+    c2 = (centroids ** 2).sum(axis=1)
+    for s in range(0, len(x), chunk):
+        b = x[s:s + chunk]
+        out[s:s + chunk] = np.argmin(c2 - 2.0 * b @ centroids.T, axis=1)
+    return out
+
+
+def _kmeans_pp(x: np.ndarray, k: int, rng: np.random.Generator) -> np.ndarray:
+    sample = x[rng.choice(len(x), size=min(len(x), 20_000), replace=False)]
+    centroids = [sample[rng.integers(len(sample))]]
+    d2 = ((sample - centroids[0]) ** 2).sum(axis=1)
+    for _ in range(1, k):
+        p = d2 / d2.sum() if d2.sum() > 0 else None
+        centroids.append(sample[rng.choice(len(sample), p=p)])
+        d2 = np.minimum(d2, ((sample - centroids[-1]) ** 2).sum(axis=1))
+    return np.array(centroids)
+
+
+def minibatch_kmeans(
+    x: np.ndarray,
+    k: int = N_CLUSTERS,
+    batch_size: int = 4096,
+    n_iter: int = 200,
+    init: Optional[np.ndarray] = None,
+    counts: Optional[np.ndarray] = None,
+    seed: int = 0,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Mini-batch k-means (Sculley 2010) with per-centre learning rates.
+    Returns (centroids, per-centre counts); pass both back in to keep refining.
+    """
+    rng = np.random.default_rng(seed)
+    if len(x) == 0:
+        return init, counts
+    centroids = _kmeans_pp(x, k, rng) if init is None else init.copy()
+    counts = np.zeros(len(centroids)) if counts is None else counts.astype(np.float64).copy()
+    for _ in range(n_iter):
+        batch = x[rng.integers(0, len(x), size=min(batch_size, len(x)))]
+        labels = _nearest(batch, centroids)
+        n_b = np.bincount(labels, minlength=len(centroids)).astype(np.float64)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, batch)
+        hit = n_b > 0
+        counts[hit] += n_b[hit]
+        eta = n_b[hit] / counts[hit]
+        centroids[hit] += eta[:, None] * (sums[hit] / n_b[hit][:, None] - centroids[hit])
+    return centroids, counts
+
+
+# ============================================================
+# Pipeline
+# ============================================================
+def _state_paths(state_dir: Path) -> Tuple[Path, Path]:
+    return state_dir / "customers.parquet", state_dir / "state.json"
+
+
+def _merge(old: pa.Table, new: pa.Table) -> Tuple[pa.Table, np.ndarray]:
+    """Fold new per-customer aggregates into the state; returns (state, ids of touched customers)."""
+    touched = new.column(CUSTOMER_ID)
+    keep = old.filter(pc.invert(pc.is_in(old.column(CUSTOMER_ID), value_set=touched)))
+    prev = old.filter(pc.is_in(old.column(CUSTOMER_ID), value_set=touched))
+    merged = _reduce([prev.select(new.column_names), new]) if prev.num_rows else new
+    return pa.concat_tables([keep.select(merged.column_names), merged]), touched.to_numpy(zero_copy_only=False)
+
+
+def build(
+    out_dir: Path,
+    orders_root: Optional[Path] = None,
+    csv_path: Optional[Path] = None,
+    incremental: bool = False,
+    k: int = N_CLUSTERS,
+    seed: int = 0,
+) -> dict:
+    """Run the pipeline and write rfm_customer_table.csv and rfm_target_list.csv to `out_dir`."""
+    out_dir = Path(out_dir)
+    orders_root = Path(orders_root) if orders_root is not None else out_dir / ORDERS_DIR_NAME
+    state_dir = out_dir / STATE_DIR_NAME
+    table_path, meta_path = _state_paths(state_dir)
+    state = json.loads(meta_path.read_text()) if incremental and meta_path.exists() else None
+
+    since = state["watermark"] if state else None
+    # Orders already counted on the watermark day; later ones on that day are new.
+    seen = state.get("watermark_orders", []) if state else []
+    new, last, last_ids = aggregate_customers(
+        order_batches(orders_root, csv_path, since, seen), month_ordered=csv_path is None
+    )
+    if state is not None:
+        customers_t, touched = _merge(pq.read_table(table_path), new)
+    else:
+        customers_t, touched = new, None
+    # Sorted so quintile ties break the same way on full and incremental runs.
+    customers = customers_t.to_pandas().sort_values(CUSTOMER_ID, ignore_index=True)
+    if customers.empty:
+        raise ValueError("No orders with a Customer_ID were found.")
+
+    watermark = str(customers["last_order_date"].max())
+    watermark_orders = set(seen) if watermark == since else set()
+    if last == watermark:
+        watermark_orders |= last_ids
+    # Recency is measured from the day after the latest order.
+    as_of = pd.Timestamp(watermark) + pd.Timedelta(days=1)
+    scored = score(customers, as_of)
+
+    x_raw = features(scored)
+    if state is not None:
+        mean, std = np.array(state["mean"]), np.array(state["std"])
+        x = (x_raw - mean) / std
+        changed = scored[CUSTOMER_ID].isin(touched).to_numpy()
+        centroids, counts = minibatch_kmeans(
+            x[changed], k=len(state["centroids"]), n_iter=50,
+            init=np.array(state["centroids"]), counts=np.array(state["counts"]), seed=seed,
+        )
+    else:
+        mean, std = x_raw.mean(axis=0), x_raw.std(axis=0)
+        std[std == 0] = 1.0
+        x = (x_raw - mean) / std
+        centroids, counts = minibatch_kmeans(x, k=k, seed=seed)
+    scored["kmeans_cluster"] = _nearest(x, centroids)
+
+    table = scored[RFM_COLUMNS]
+    targets = (
+        table[table["RFM_Segment"].isin(TARGET_SEGMENTS) & (table["M_score"] >= TARGET_MIN_M)]
+        .sort_values("monetary", ascending=False)
+        .head(TARGET_SIZE)
+    )
+    state_dir.mkdir(parents=True, exist_ok=True)
+    table.to_csv(out_dir / RFM_TABLE, index=False)
+    targets.to_csv(out_dir / RFM_TARGETS, index=False)
+    pq.write_table(customers_t, table_path)
+    meta_path.write_text(
+        json.dumps(
+            {
+                "watermark": watermark,
+                "watermark_orders": sorted(watermark_orders),
+                "mean": mean.tolist(),
+                "std": std.tolist(),
+                "centroids": centroids.tolist(),
+                "counts": counts.tolist(),
+            },
+            indent=1,
+        )
+    )
+    return {
+        "customers": len(table),
+        "reprocessed": len(touched) if touched is not None else len(table),
+        "targets": len(targets),
+        "watermark": watermark,
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="RFM scoring and k-means segmentation.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build", help="Write rfm_customer_table.csv and rfm_target_list.csv.")
+    b.add_argument("--csv", type=Path, default=None, help="Order export CSV (default: orders_parquet/).")
+    b.add_argument("--orders", type=Path, default=None, help="Order partitions (default: ./orders_parquet).")
+    b.add_argument("--out", type=Path, default=None, help=f"Output folder (default: ./{OUTPUT_DIR_NAME}).")
+    b.add_argument("--incremental", action="store_true", help="Only process orders after the last run.")
+    b.add_argument("--k", type=int, default=N_CLUSTERS)
+    args = ap.parse_args()
+
+    if args.cmd == "build":
+        base = Path(__file__).resolve().parent
+        out = args.out if args.out is not None else base / OUTPUT_DIR_NAME
+        orders = args.orders if args.orders is not None else base / ORDERS_DIR_NAME
+        res = build(out, orders, args.csv, args.incremental, args.k)
+        print(
+            f"{res['customers']:,} customers ({res['reprocessed']:,} reprocessed), "
+            f"{res['targets']:,} targets, orders up to {res['watermark']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+"""
+Server-side paging for large tables.
+
+A pager answers "rows [offset, offset + limit) of this table, sorted by
+column X, restricted to rows whose text contains Y". The row order for a
+(sort, search) pair is computed once with Arrow compute kernels and
+memoised as an index array, so turning pages only takes `limit` rows and
+the browser receives one page at a time.
+
+    TablePager  in-memory Arrow table (zero-copy from the SharedStore, or a
+                converted frame)
+    OrderPager  the order-level Parquet dataset (orders_backend.OrderStore):
+                the order is computed from the order id, partition and sort
+                column only; a page is then read with the filters plus
+                `YearMonth in months(page) and boss_order_id in ids(page)`,
+                so it prunes to a few partitions. A key is (order id,
+                partition, line of the row within its order), so orders
+                with several rows page row by row. The first PUSHDOWN_ROWS
+                keys come from one streaming pass that keeps a running
+                top-n (and stops early when unsorted); only deeper pages
+                materialise the key order of every matching row.
+"""
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Hashable, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from cube import filter_key
+from orders_backend import ORDER_ID, PARTITION_COL, OrderStore
+
+PAGE_SIZE = 50
+PAGER_MEMO_SIZE = 16
+PUSHDOWN_ROWS = 20 * PAGE_SIZE
+
+# Columns of the OrderPager key tables.
+KEY_COLUMNS = [ORDER_ID, PARTITION_COL, "line"]
+
+
+class Page(NamedTuple):
+    rows: pd.DataFrame
+    total: int  # rows matching the search, across all pages
+
+
+def _is_text(t: pa.DataType) -> bool:
+    return pa.types.is_string(t) or pa.types.is_large_string(t) or pa.types.is_dictionary(t)
+
+
+def _as_text(arr: pa.ChunkedArray) -> pa.ChunkedArray:
+    return arr if pa.types.is_string(arr.type) or pa.types.is_large_string(arr.type) else pc.cast(arr, pa.string())
+
+
+def _sort_key(arr: pa.ChunkedArray) -> pa.ChunkedArray:
+    # Sort dictionary (category) columns by their labels, not their codes.
+    return pc.cast(arr, arr.type.value_type) if pa.types.is_dictionary(arr.type) else arr
+
+
+def search_mask(table: pa.Table, text: str, columns: Optional[Sequence[str]] = None) -> np.ndarray:
+    """Rows where any of `columns` (default: every text column) contains `text`, case-insensitively."""
+    cols = list(columns) if columns else [f.name for f in table.schema if _is_text(f.type)]
+    mask = np.zeros(table.num_rows, dtype=bool)
+    for col in cols:
+        hit = pc.match_substring(_as_text(table.column(col)), text, ignore_case=True)
+        mask |= pc.fill_null(hit, False).to_numpy(zero_copy_only=False)
+    return mask
+
+
+def sorted_order(
+    table: pa.Table, sort_by: Optional[str], descending: bool, mask: Optional[np.ndarray]
+) -> Optional[np.ndarray]:
+    """Row positions in display order (None = all rows, source order)."""
+    if sort_by is None:
+        return None if mask is None else np.flatnonzero(mask)
+    keyed = pa.table({"k": _sort_key(table.column(sort_by))})
+    # Nulls go last in either direction (Arrow's default).
+    idx = pc.sort_indices(keyed, sort_keys=[("k", "descending" if descending else "ascending")]).to_numpy()
+    return idx if mask is None else idx[mask[idx]]
+
+
+def _line_numbers(ids: pa.ChunkedArray) -> np.ndarray:
+    """Line of each row within its order id, in scan order (all zeros when no id repeats)."""
+    if pc.count_distinct(ids, mode="all").as_py() == len(ids):
+        return np.zeros(len(ids), dtype=np.int64)
+    s = pd.Series(ids.to_numpy())
+    return s.groupby(s, sort=False, dropna=False).cumcount().to_numpy()
+
+
+class _Memo:
+    def __init__(self, size: int):
+        self.size = size
+        self._items: "OrderedDict[Hashable, object]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, build):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return self._items[key]
+        value = build()
+        with self._lock:
+            self._items[key] = value
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+        return value
+
+
+class TablePager:
+    """Pages of an Arrow table with memoised sort/search orders."""
+
+    def __init__(self, table: pa.Table, memo_size: int = PAGER_MEMO_SIZE):
+        self.table = table
+        self._memo = _Memo(memo_size)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "TablePager":
+        return cls(pa.Table.from_pandas(df, preserve_index=False))
+
+    @property
+    def columns(self) -> List[str]:
+        return self.table.column_names
+
+    def _order(self, sort_by: Optional[str], descending: bool, search: str) -> Optional[np.ndarray]:
+        def build():
+            mask = search_mask(self.table, search) if search else None
+            return sorted_order(self.table, sort_by, descending, mask)
+
+        return self._memo.get((sort_by, descending, search), build)
+
+    def count(self, sort_by: Optional[str] = None, descending: bool = False, search: str = "") -> int:
+        order = self._order(sort_by, descending, search)
+        return self.table.num_rows if order is None else len(order)
+
+    def page(
+        self,
+        sort_by: Optional[str] = None,
+        descending: bool = False,
+        search: str = "",
+        offset: int = 0,
+        limit: int = PAGE_SIZE,
+    ) -> Page:
+        order = self._order(sort_by, descending, search)
+        total = self.table.num_rows if order is None else len(order)
+        stop = min(offset + limit, total)
+        rows = np.arange(offset, stop) if order is None else order[offset:stop]
+        return Page(self.table.take(pa.array(rows, type=pa.int64())).to_pandas(), total)
+
+
+class OrderPager:
+    """Pages of the filtered order dataset; only page rows are read in full."""
+
+    def __init__(self, store: OrderStore, memo_size: int = PAGER_MEMO_SIZE):
+        self.store = store
+        self._memo = _Memo(memo_size)
+
+    @property
+    def columns(self) -> List[str]:
+        return self.store.columns
+
+    def _scan_columns(self, sort_by: Optional[str], search: str) -> Tuple[List[str], List[str]]:
+        """(columns to scan, text columns to search)."""
+        schema = self.store.dataset.schema
+        text = [f.name for f in schema if _is_text(f.type)] if search else []
+        return list(dict.fromkeys([ORDER_ID, PARTITION_COL, *([sort_by] if sort_by else []), *text])), text
+
+    def _keys(
+        self, filters: Optional[Mapping[str, object]], sort_by: Optional[str], descending: bool, search: str
+    ) -> pa.Table:
+        """(order id, YearMonth, line) of the matching rows, in display order."""
+
+        def build():
+            cols, text = self._scan_columns(sort_by, search)
+            t = self.store.dataset.to_table(columns=cols, filter=self.store.expression(filters))
+            mask = search_mask(t, search, text) if search else None
+            order = sorted_order(t, sort_by, descending, mask)
+            keys = t.select([ORDER_ID, PARTITION_COL]).append_column("line", pa.array(_line_numbers(t.column(ORDER_ID))))
+            return keys if order is None else keys.take(pa.array(order, type=pa.int64()))
+
+        return self._memo.get((filter_key(filters), sort_by, descending, search), build)
+
+    def _head(
+        self, filters: Optional[Mapping[str, object]], sort_by: Optional[str], descending: bool, search: str
+    ) -> pa.Table:
+        """
+        The first PUSHDOWN_ROWS keys of `_keys`, from one streaming pass that
+        holds at most that many candidates. Ties keep scan order, as in the
+        stable sort of `_keys`.
+        """
+
+        def build():
+            cols, text = self._scan_columns(sort_by, search)
+            n, seen = PUSHDOWN_ROWS, 0
+            best: Optional[pa.Table] = None
+            direction = "descending" if descending else "ascending"
+            month, month_start, month_ids = None, 0, []
+
+            def recount(t: Optional[pa.Table]) -> Optional[pa.Table]:
+                # Candidates are kept with line 0; once a month is scanned, an order
+                # id repeated in it (orders never span two months) gets its lines.
+                if t is None or not month_ids:
+                    return t
+                lines = _line_numbers(pa.chunked_array(month_ids))
+                if not lines.any():
+                    return t
+                at = t.column("pos").to_numpy() - month_start
+                inside = (at >= 0) & (at < len(lines))
+                line = t.column("line").to_numpy().copy()
+                line[inside] = lines[at[inside]]
+                return t.set_column(t.schema.get_field_index("line"), "line", pa.array(line))
+
+            for batch in self.store.scan(filters, cols):
+                if batch.num_rows == 0:
+                    continue
+                if batch.column(PARTITION_COL)[0] != month:
+                    best = recount(best)
+                    month, month_start, month_ids = batch.column(PARTITION_COL)[0], seen, []
+                month_ids.append(batch.column(ORDER_ID))
+                t = pa.Table.from_batches([batch])
+                pos = np.arange(seen, seen + t.num_rows)
+                seen += t.num_rows
+                if search:
+                    mask = search_mask(t, search, text)
+                    t, pos = t.filter(mask), pos[mask]
+                if t.num_rows == 0:
+                    continue
+                cand = t.select([ORDER_ID, PARTITION_COL])
+                cand = cand.append_column("line", pa.array(np.zeros(t.num_rows, dtype=np.int64)))
+                cand = cand.append_column("pos", pa.array(pos))
+                if sort_by is None:
+                    best = cand if best is None else pa.concat_tables([best, cand])
+                    if best.num_rows >= n:
+                        break
+                    continue
+                cand = cand.append_column("k", _sort_key(t.column(sort_by)))
+                if best is not None:
+                    cand = pa.concat_tables([best, cand])
+                idx = pc.select_k_unstable(cand, k=min(n, cand.num_rows), sort_keys=[("k", direction), ("pos", "ascending")])
+                best = cand.take(idx)
+            best = recount(best)
+            if best is None:
+                empty = self.store.dataset.schema.empty_table().select([ORDER_ID, PARTITION_COL])
+                return empty.append_column("line", pa.array([], type=pa.int64()))
+            if sort_by is not None:
+                best = best.take(pc.sort_indices(best, sort_keys=[("k", direction), ("pos", "ascending")]))
+            return best.select(KEY_COLUMNS).slice(0, n)
+
+        return self._memo.get(("head", filter_key(filters), sort_by, descending, search), build)
+
+    def count(
+        self,
+        filters: Optional[Mapping[str, object]] = None,
+        sort_by: Optional[str] = None,
+        descending: bool = False,
+        search: str = "",
+    ) -> int:
+        if not search:
+            return self.store.count_rows(filters)
+
+        def build():
+            _, text = self._scan_columns(None, search)
+            if not text:
+                return 0
+            return sum(int(search_mask(pa.Table.from_batches([b]), search, text).sum()) for b in self.store.scan(filters, text))
+
+        return self._memo.get(("count", filter_key(filters), search), build)
+
+    def page(
+        self,
+        filters: Optional[Mapping[str, object]] = None,
+        sort_by: Optional[str] = None,
+        descending: bool = False,
+        search: str = "",
+        offset: int = 0,
+        limit: int = PAGE_SIZE,
+    ) -> Page:
+        total = self.count(filters, sort_by, descending, search)
+        if offset + limit <= PUSHDOWN_ROWS:
+            keys = self._head(filters, sort_by, descending, search)
+        else:
+            keys = self._keys(filters, sort_by, descending, search)
+        part = keys.slice(offset, limit)
+        if part.num_rows == 0:
+            return Page(pd.DataFrame(columns=self.columns), total)
+        ids = part.column(ORDER_ID).combine_chunks()
+        months = pc.unique(part.column(PARTITION_COL)).to_pylist()
+        expr = ds.field(PARTITION_COL).isin(months) & ds.field(ORDER_ID).isin(ids)
+        base = self.store.expression(filters)
+        rows = self.store.dataset.to_table(filter=expr if base is None else base & expr)
+        # Back into page order: every page key is one (order id, line) of the fetched orders.
+        fetched = pd.DataFrame({"id": rows.column(ORDER_ID).to_numpy(zero_copy_only=False)})
+        fetched["line"] = _line_numbers(rows.column(ORDER_ID))
+        fetched["row"] = np.arange(rows.num_rows)
+        wanted = pd.DataFrame({"id": ids.to_numpy(zero_copy_only=False), "line": part.column("line").to_numpy()})
+        take = wanted.merge(fetched, on=["id", "line"], how="inner")["row"].to_numpy()
+        return Page(rows.take(pa.array(take, type=pa.int64())).to_pandas(), total)
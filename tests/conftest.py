@@ -0,0 +1,114 @@
+"""
+Shared fixtures: small hand-built frames in the layout of the shipped data.
+
+The modules live flat in the repo root (like the app imports them), so the
+root goes on sys.path here, as the benchmarks do.
+"""
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import data_store  # noqa: E402
+
+
+def monthly_rows() -> pd.DataFrame:
+    """Eight monthly_aggregates.csv rows over three months, in the raw CSV layout."""
+    rows = [
+        # YearMonth, Company, Brands, shop, country, has_coupon, campaign, orders, net, total, refund, discount
+        ("2024-01", "Wolfson", "BrandA", "ShopA1", "GB", True, "Email", 10, 900.0, 1000.0, 100.0, 0.10),
+        ("2024-01", "Wolfson", "BrandA", "ShopA1", "GB", False, "No campaign", 20, 2000.0, 2000.0, 0.0, 0.0),
+        ("2024-01", "Wolfson", "BrandB", "ShopB1", "US", True, "Affiliate", 5, 400.0, 500.0, 100.0, np.nan),
+        ("2024-02", "Wolfson", "BrandA", "ShopA1", "GB", True, "Email", 12, 1150.0, 1200.0, 50.0, 0.20),
+        ("2024-02", "Wolfson", "BrandB", "ShopB1", "US", False, "No campaign", 8, 800.0, 800.0, 0.0, 0.0),
+        ("2024-03", "Wolfson", "BrandA", "ShopA2", "FR", False, "No campaign", 6, 600.0, 600.0, 0.0, 0.0),
+        ("2024-03", "Wolfson", "BrandB", "ShopB1", "US", True, "Email", 4, 300.0, 400.0, 100.0, 0.25),
+        ("2024-03", "Wolfson", "BrandB", "ShopB1", "GB", False, "No campaign", 2, 250.0, 250.0, 0.0, 0.0),
+    ]
+    df = pd.DataFrame(
+        rows,
+        columns=[
+            "YearMonth",
+            "Company",
+            "Brands",
+            "shop",
+            "shipping_country",
+            "has_coupon",
+            "campaign_type_clean",
+            "orders",
+            "net_revenue_gbp",
+            "order_total_gbp",
+            "refund_gbp",
+            "avg_discount_rate",
+        ],
+    )
+    df["aov_gbp"] = df["net_revenue_gbp"] / df["orders"]
+    df["refund_rate"] = df["refund_gbp"] / df["order_total_gbp"]
+    return df
+
+
+@pytest.fixture
+def monthly() -> pd.DataFrame:
+    return monthly_rows()
+
+
+@pytest.fixture
+def prepared(monthly) -> pd.DataFrame:
+    return data_store.prepare_monthly(data_store.typed_frame(monthly, "monthly_aggregates.csv"))
+
+
+@pytest.fixture
+def data_dir(tmp_path, monthly) -> Path:
+    """A data folder with monthly_aggregates.csv and a dim_shop.csv listing one shop with no sales."""
+    monthly.to_csv(tmp_path / "monthly_aggregates.csv", index=False)
+    shops = sorted(monthly["shop"].unique().tolist() + ["ShopZ9"])
+    pd.DataFrame({"shop": shops}).to_csv(tmp_path / "dim_shop.csv", index=False)
+    return tmp_path
+
+
+def order_rows(n: int = 120, seed: int = 0) -> pd.DataFrame:
+    """`n` order lines over three months in the order export layout; every fourth order has two lines."""
+    rng = np.random.default_rng(seed)
+    ids = [f"B{i}" for i in range(n)]
+    month = rng.choice(["2024-01", "2024-02", "2024-03"], n)
+    # A second line of an order shares its id and its date.
+    for i in range(3, n, 4):
+        ids[i], month[i] = ids[i - 1], month[i - 1]
+    total = rng.integers(1, 40, n) * 5.0  # coarse, so sorts have ties
+    return pd.DataFrame(
+        {
+            "boss_order_id": ids,
+            "order_date": [f"{m}-{d:02d}" for m, d in zip(month, rng.integers(1, 28, n))],
+            "Company": "Wolfson",
+            "Brands": rng.choice(["BrandA", "BrandB"], n),
+            "shop": rng.choice(["ShopA1", "ShopB1", "ShopX"], n),
+            "shipping_country": rng.choice(["GB", "US"], n),
+            "campaign_type_clean": rng.choice(["Email", "no coupon"], n),
+            "has_coupon": rng.random(n) < 0.3,
+            "Customer_ID": [f"C{c}" for c in rng.integers(0, 30, n)],
+            "Order Total (GBP)": total,
+            "Refund (GBP)": 0.0,
+            "net_revenue_gbp": total,
+            "Discount_rate": 0.0,
+        }
+    )
+
+
+@pytest.fixture
+def orders() -> pd.DataFrame:
+    return order_rows()
+
+
+@pytest.fixture
+def order_store(tmp_path, orders):
+    from orders_backend import OrderStore, build_partitions
+
+    orders.to_csv(tmp_path / "orders.csv", index=False)
+    return OrderStore(build_partitions(tmp_path / "orders.csv", tmp_path / "orders_parquet"))
@@ -0,0 +1,86 @@
+import pandas as pd
+import pytest
+
+import aggregate_store
+from aggregate_store import AggregateStore, ingest, init_store
+
+MEASURES = ["orders", "net_revenue_gbp", "aov_gbp", "avg_discount_rate"]
+
+
+@pytest.fixture
+def store_root(data_dir):
+    root = data_dir / aggregate_store.AGGREGATES_DIR_NAME
+    init_store(data_dir / "monthly_aggregates.csv", root)
+    return root
+
+
+def delta_rows(monthly: pd.DataFrame) -> pd.DataFrame:
+    """March restated (revenue doubled) and a new April with a shop the dims have never seen."""
+    march = monthly[monthly["YearMonth"] == "2024-03"].assign(net_revenue_gbp=lambda d: d["net_revenue_gbp"] * 2)
+    april = monthly[monthly["YearMonth"] == "2024-03"].head(1).assign(YearMonth="2024-04", shop="ShopNew", orders=7)
+    return pd.concat([march, april], ignore_index=True)
+
+
+def rollups(cube):
+    return {
+        tuple(dims): cube.rollup(dims, {}, MEASURES).sort_values(dims or ["orders"], ignore_index=True)
+        for dims in ([], ["YearMonth"], ["shop"], ["YearMonth", "Brands"])
+    }
+
+
+def test_snapshot_matches_the_csv(store_root, prepared):
+    version, frame, cube = AggregateStore(store_root).snapshot()
+    assert version.startswith("agg-1-")
+    assert len(frame) == len(prepared)
+    assert cube.rollup([], {}, ["orders"]).iloc[0]["orders"] == 67
+    # The frame is coded against the dim tables next to the store.
+    assert "ShopZ9" in frame["shop"].cat.categories
+
+
+def test_incremental_snapshot_equals_a_fresh_one(store_root, data_dir, monthly):
+    reader = AggregateStore(store_root)
+    before = reader.snapshot()
+    assert reader.snapshot() is before
+
+    delta = data_dir / "delta.csv"
+    delta_rows(monthly).to_csv(delta, index=False)
+    summary = ingest(delta, store_root, data_dir)
+    assert sorted(summary["written"]) == ["2024-03", "2024-04"]
+    assert summary["dims"] == {"dim_shop.csv": 1}
+
+    version, frame, cube = reader.snapshot()
+    assert version != before[0]
+    fresh_version, fresh_frame, fresh_cube = AggregateStore(store_root).snapshot()
+    assert version == fresh_version
+    pd.testing.assert_frame_equal(
+        frame.sort_values(["ym_key", "shop", "Brands", "shipping_country"], ignore_index=True),
+        fresh_frame.sort_values(["ym_key", "shop", "Brands", "shipping_country"], ignore_index=True),
+    )
+    a, b = rollups(cube), rollups(fresh_cube)
+    for dims in a:
+        pd.testing.assert_frame_equal(a[dims], b[dims])
+    assert cube.rollup([], {"shop": ["ShopNew"]}, ["orders"]).iloc[0]["orders"] == 7
+    # The older snapshot is untouched.
+    assert before[2].rollup([], {}, ["orders"]).iloc[0]["orders"] == 67
+
+
+def test_unchanged_months_are_not_rewritten(store_root, data_dir, monthly):
+    delta = data_dir / "delta.csv"
+    monthly[monthly["YearMonth"] == "2024-02"].to_csv(delta, index=False)
+    summary = ingest(delta, store_root, data_dir)
+    assert summary["written"] == [] and summary["unchanged"] == ["2024-02"]
+    assert aggregate_store.read_manifest(store_root)["version"] == 1
+
+
+def test_undated_delta_rows_are_counted_not_ingested(store_root, data_dir, orders):
+    delta = orders.assign(order_date=orders["order_date"].str.replace("2024-", "2025-"))
+    delta.loc[0, "order_date"] = None
+    delta.loc[1, "order_date"] = "garbage"
+    delta.loc[2, "order_date"] = "2025-13-40"
+    delta.to_csv(data_dir / "delta.csv", index=False)
+    with pytest.warns(UserWarning, match="3 rows without a valid date"):
+        summary = ingest(data_dir / "delta.csv", store_root, data_dir)
+    assert summary["undated"] == 3
+    assert sorted(summary["written"]) == ["2025-01", "2025-02", "2025-03"]
+    _, _, cube = AggregateStore(store_root).snapshot()
+    assert cube.rollup([], {}, ["orders"]).iloc[0]["orders"] == 67 + len(orders) - 3
@@ -0,0 +1,146 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from basket import RULE_COLUMNS, BasketIndex, RuleIndex, filter_rules
+
+# Order -> SKUs. X and Y are bought together in 3 of 5 orders.
+BASKETS = {
+    "o1": ["X", "Y"],
+    "o2": ["X", "Y", "Z"],
+    "o3": ["X", "Y"],
+    "o4": ["X"],
+    "o5": ["Z", "Z"],  # a repeated line counts once
+}
+
+
+def lines():
+    ids = [o for o, skus in BASKETS.items() for _ in skus]
+    skus = [s for skus in BASKETS.values() for s in skus]
+    return pa.array(ids), pa.array(skus)
+
+
+def orders_table():
+    return pa.table(
+        {
+            "boss_order_id": ["o1", "o2", "o3", "o4", "o5"],
+            "YearMonth": ["2024-01", "2024-01", "2024-02", "2024-02", "2024-02"],
+            "Brands": ["A", "A", "B", "A", "B"],
+        }
+    )
+
+
+@pytest.fixture
+def index() -> BasketIndex:
+    return BasketIndex(*lines())
+
+
+def rule(rules, a, b):
+    hit = rules[(rules["antecedent"].astype(str) == a) & (rules["consequent"].astype(str) == b)]
+    assert len(hit) == 1, (a, b)
+    return hit.iloc[0]
+
+
+def test_pair_rules_support_confidence_lift(index):
+    rules = index.rules()
+    assert list(rules.columns) == RULE_COLUMNS
+    xy = rule(rules, "X", "Y")
+    assert xy["pair_order_count"] == 3
+    assert xy["support"] == pytest.approx(3 / 5)
+    assert xy["confidence"] == pytest.approx(3 / 4)  # X in 4 orders
+    assert xy["lift"] == pytest.approx((3 / 4) / (3 / 5))  # Y in 3 orders
+    assert rule(rules, "Y", "X")["confidence"] == pytest.approx(1.0)
+    # Sorted by lift, then confidence, then support.
+    assert rules["lift"].is_monotonic_decreasing
+
+
+def test_thresholds(index):
+    assert len(index.rules(min_count=2)) == 2  # X->Y and Y->X
+    kept = index.rules(min_confidence=0.9)
+    assert set(zip(kept["antecedent"].astype(str), kept["consequent"].astype(str))) == {("Y", "X")}
+
+
+def test_filter_rules_applies_every_threshold(index):
+    rules = index.rules()
+    kept = filter_rules(rules, min_support=0.5, min_conf=0.0, min_lift=1.0)
+    assert kept[["antecedent", "consequent"]].astype(str).values.tolist() == [["Y", "X"], ["X", "Y"]]
+    assert filter_rules(rules, min_support=0.0, min_conf=0.0, min_lift=10.0).empty
+
+
+def test_filters_select_orders_through_the_order_table():
+    index = BasketIndex(*lines(), orders=orders_table())
+    assert index.filtered
+    rules = index.rules({"YearMonth": ("2024-02", "2024-02")})
+    # Orders o3, o4, o5: X-Y once in 3 orders.
+    assert rule(rules, "X", "Y")["support"] == pytest.approx(1 / 3)
+    rules = index.rules({"Brands": ["A"]})
+    assert rule(rules, "X", "Y")["pair_order_count"] == 2
+
+
+def test_order_lines_count_as_one_order():
+    # o2 has a second line in the order table.
+    table = orders_table()
+    table = pa.concat_tables([table, table.slice(1, 1)])
+    index = BasketIndex(*lines(), orders=table)
+    assert index.n_orders == 5
+    assert rule(index.rules(), "X", "Y")["support"] == pytest.approx(3 / 5)
+    assert len(index.select({"Brands": ["A"]})) == 3
+
+
+def test_n_orders_from_the_order_store(order_store, orders):
+    ids, skus = pa.array(orders["boss_order_id"]), pa.array(["X"] * len(orders))
+    index = BasketIndex(ids, skus, orders=order_store.dataset.to_table(columns=["boss_order_id", "YearMonth", "Brands"]))
+    assert index.n_orders == orders["boss_order_id"].nunique()
+
+
+def test_empty_selection_gives_empty_rules():
+    index = BasketIndex(*lines(), orders=orders_table())
+    rules = index.rules({"Brands": ["Nope"]})
+    assert rules.empty
+    assert list(rules.columns) == RULE_COLUMNS
+    ri = index.rule_index({"Brands": ["Nope"]})
+    assert ri.skus == []
+    assert ri.related("X").empty
+    assert ri.recommend(["X"]).empty
+
+
+def test_itemsets(index):
+    sets = index.itemsets(min_support=0.4, max_len=3)
+    found = {tuple(sorted(s)): c for s, c in zip(sets["itemset"], sets["order_count"])}
+    assert found[("X",)] == 4
+    assert found[("X", "Y")] == 3
+    assert ("X", "Y", "Z") not in found  # one order only
+
+
+def test_rule_index_lookups(index):
+    ri = RuleIndex(index.rules())
+    assert ri.skus == ["X", "Y", "Z"]
+    # X->Y has lift 1.25, X->Z 0.625.
+    assert ri.related("X", k=1)["consequent"].astype(str).tolist() == ["Y"]
+    assert ri.degree("Z") == len(ri.neighbours("Z"))
+    rec = ri.recommend(["X", "Y"])
+    assert "X" not in rec["sku"].astype(str).tolist()
+    assert "Y" not in rec["sku"].astype(str).tolist()
+    assert ri.related("unknown").empty
+
+
+def test_rule_index_matches_a_scan():
+    rng = np.random.default_rng(0)
+    skus = [f"S{i}" for i in range(12)]
+    rules = pd.DataFrame(
+        {
+            "antecedent": rng.choice(skus, 60),
+            "consequent": rng.choice(skus, 60),
+            "pair_order_count": rng.integers(1, 50, 60),
+            "support": rng.random(60),
+            "confidence": rng.random(60),
+            "lift": rng.random(60) * 5,
+        }
+    )
+    ri = RuleIndex(rules)
+    for sku in skus:
+        scan = rules[rules["antecedent"] == sku].sort_values(
+            ["lift", "confidence", "support"], ascending=False, kind="stable"
+        )
+        pd.testing.assert_frame_equal(ri.related(sku, k=5), scan.head(5))
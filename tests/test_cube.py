@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_store
+from cube import Cube, filter_key
+
+
+@pytest.fixture
+def cube(prepared) -> Cube:
+    return Cube.from_frame(prepared)
+
+
+def test_filter_key_ignores_order_and_empty_selections():
+    a = filter_key({"Brands": ["B", "A"], "shop": [], "YearMonth": ("2024-01", "2024-02")})
+    b = filter_key({"YearMonth": ("2024-01", "2024-02"), "Brands": ["A", "B"]})
+    assert a == b
+    assert filter_key(None) == filter_key({}) == ()
+
+
+def test_rollup_total_matches_the_fact(cube, monthly):
+    out = cube.rollup([], {}, ["orders", "net_revenue_gbp", "aov_gbp", "refund_rate"]).iloc[0]
+    assert out["orders"] == monthly["orders"].sum() == 67
+    assert out["net_revenue_gbp"] == pytest.approx(monthly["net_revenue_gbp"].sum())
+    # DAX: DIVIDE(SUM(net_revenue_gbp), SUM(orders)), not a mean of the cell AOVs.
+    assert out["aov_gbp"] == pytest.approx(6400.0 / 67)
+    assert out["refund_rate"] == pytest.approx(350.0 / 6750.0)
+
+
+def test_rollup_by_dims_with_filters(cube, monthly):
+    flt = {"YearMonth": ("2024-02", "2024-03"), "shipping_country": ["US", "GB"]}
+    out = cube.rollup(["Brands"], flt, ["orders", "net_revenue_gbp"]).set_index("Brands")
+    rows = monthly[monthly["YearMonth"].between("2024-02", "2024-03") & monthly["shipping_country"].isin(["US", "GB"])]
+    expected = rows.groupby("Brands")[["orders", "net_revenue_gbp"]].sum()
+    assert out["orders"].to_dict() == expected["orders"].to_dict()
+    np.testing.assert_allclose(out.loc[expected.index, "net_revenue_gbp"], expected["net_revenue_gbp"])
+
+
+def test_weighted_discount_skips_cells_without_a_rate(cube):
+    out = cube.rollup(["Brands"], {}, ["avg_discount_rate"]).set_index("Brands")["avg_discount_rate"]
+    # BrandA: (0.10*1000 + 0*2000 + 0.20*1200 + 0*600) / 4800
+    assert out["BrandA"] == pytest.approx(340.0 / 4800.0)
+    # BrandB: the 500 GBP cell has no rate and is out of the denominator too.
+    assert out["BrandB"] == pytest.approx(100.0 / 1450.0)
+
+
+def test_coupon_ratios(cube):
+    out = cube.rollup([], {"Brands": ["BrandA"]}, ["coupon_usage", "aov_coupon", "aov_nocoupon"]).iloc[0]
+    assert out["coupon_usage"] == pytest.approx(22 / 48)
+    assert out["aov_coupon"] == pytest.approx(2050.0 / 22)
+    assert out["aov_nocoupon"] == pytest.approx(2600.0 / 26)
+
+
+def test_empty_selection(cube):
+    total = cube.rollup([], {"Brands": ["NoSuchBrand"]}, ["orders", "aov_gbp"])
+    assert total["orders"].tolist() == [0]
+    assert np.isnan(total["aov_gbp"].iloc[0])
+    grouped = cube.rollup(["shop"], {"YearMonth": ("2030-01", "2030-12")}, ["orders", "aov_gbp"])
+    assert grouped.empty
+    assert list(grouped.columns) == ["shop", "orders", "aov_gbp"]
+
+
+def test_rollup_is_memoised(cube):
+    a = cube.rollup(["Brands"], {"shop": ["ShopA1"]}, ["orders"])
+    b = cube.rollup(["Brands"], {"shop": ["ShopA1"]}, ["orders"])
+    assert a is b
+
+
+def test_replace_months_matches_a_full_rebuild(cube, monthly):
+    changed = monthly.copy()
+    march = changed["YearMonth"] == "2024-03"
+    changed.loc[march, "net_revenue_gbp"] *= 2
+    # A label the old cube has never seen.
+    changed.loc[changed.index[march][0], "shop"] = "ShopNew"
+    prepared = data_store.prepare_monthly(data_store.typed_frame(changed, "monthly_aggregates.csv"))
+
+    spliced = cube.replace_months(prepared[prepared["YearMonth"] == "2024-03"], ["2024-03"])
+    rebuilt = Cube.from_frame(prepared)
+    assert spliced.n_cells == rebuilt.n_cells
+    assert "ShopNew" in spliced.labels("shop")
+    for dims in ([], ["shop"], ["YearMonth", "Brands"]):
+        a = spliced.rollup(dims, {}, ["orders", "net_revenue_gbp", "aov_gbp"]).sort_values(dims or ["orders"])
+        b = rebuilt.rollup(dims, {}, ["orders", "net_revenue_gbp", "aov_gbp"]).sort_values(dims or ["orders"])
+        pd.testing.assert_frame_equal(a.reset_index(drop=True), b.reset_index(drop=True))
+
+
+def test_replace_months_can_drop_a_month(cube):
+    out = cube.replace_months(cube.cells.iloc[:0], ["2024-03"])
+    assert "2024-03" not in set(out.cells["YearMonth"].astype(str))
+    assert out.rollup([], {}, ["orders"]).iloc[0]["orders"] == 67 - 12
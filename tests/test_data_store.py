@@ -0,0 +1,67 @@
+import os
+
+import pandas as pd
+
+from data_store import SharedStore, _stage_fresh, load_prepared
+
+NAME = "monthly_aggregates.csv"
+
+
+def test_prepared_frame_is_coded_against_the_dim_tables(data_dir, tmp_path):
+    df = load_prepared(data_dir / NAME, tmp_path / "cache")
+    assert "ShopZ9" in df["shop"].cat.categories
+    assert df["orders"].sum() == 67
+    assert df["ym_key"].is_monotonic_increasing
+
+
+def test_cache_stages_go_stale_with_their_sources(data_dir, tmp_path):
+    path, cache = data_dir / NAME, tmp_path / "cache"
+    load_prepared(path, cache)
+    assert _stage_fresh(path, cache, "") and _stage_fresh(path, cache, "prepared")
+
+    # A new dim member: the prepared stage is rebuilt, the typed CSV cache is not.
+    pd.DataFrame({"shop": ["ShopA1", "ShopA2", "ShopB1", "ShopZ9", "ShopZ8"]}).to_csv(data_dir / "dim_shop.csv", index=False)
+    assert _stage_fresh(path, cache, "")
+    assert not _stage_fresh(path, cache, "prepared")
+    assert "ShopZ8" in load_prepared(path, cache)["shop"].cat.categories
+    assert _stage_fresh(path, cache, "prepared")
+
+
+def test_touching_a_file_keeps_the_cache(data_dir, tmp_path):
+    path, cache = data_dir / NAME, tmp_path / "cache"
+    load_prepared(path, cache)
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert _stage_fresh(path, cache, "prepared")
+
+
+def test_editing_the_fact_invalidates_both_stages(data_dir, tmp_path):
+    path, cache = data_dir / NAME, tmp_path / "cache"
+    load_prepared(path, cache)
+    df = pd.read_csv(path)
+    df.loc[0, "orders"] = 1000
+    df.to_csv(path, index=False)
+    assert not _stage_fresh(path, cache, "")
+    assert not _stage_fresh(path, cache, "prepared")
+    assert load_prepared(path, cache)["orders"].sum() == 67 - 10 + 1000
+
+
+def test_warm_maps_fresh_caches_on_the_next_start(data_dir, tmp_path):
+    datasets = [(NAME, ""), (NAME, "prepared")]
+    first = SharedStore(data_dir, tmp_path / "cache").warm(datasets)
+    assert first["source"].tolist() == ["parsed", "parsed"]
+    # A new process (store) on the same cache directory.
+    second = SharedStore(data_dir, tmp_path / "cache").warm(datasets)
+    assert second["source"].tolist() == ["mapped", "mapped"]
+    assert second["error"].isna().all()
+
+
+def test_shared_store_hands_out_one_frame_per_version(data_dir, tmp_path):
+    store = SharedStore(data_dir, tmp_path / "cache")
+    a = store.frame(NAME, "prepared")
+    assert store.frame(NAME, "prepared") is a
+    assert store.frame("missing.csv") is None
+    df = pd.read_csv(data_dir / NAME)
+    df.loc[0, "orders"] = 1000
+    df.to_csv(data_dir / NAME, index=False)
+    assert store.frame(NAME, "prepared") is not a
@@ -0,0 +1,157 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import dq_profiler
+from dq_profiler import DQProfile, SketchSet, weighted_quantiles
+
+
+def test_weighted_quantiles_match_numpy_with_unit_weights():
+    v = np.sort(np.random.default_rng(0).normal(size=101))
+    qs = [0.0, 0.01, 0.25, 0.5, 0.75, 0.99, 1.0]
+    np.testing.assert_allclose(weighted_quantiles(v, np.ones_like(v), qs), np.quantile(v, qs))
+    assert np.isnan(weighted_quantiles(np.empty(0), np.empty(0), [0.5])).all()
+
+
+def test_small_groups_stay_exact():
+    s = SketchSet(k=8)
+    s.add(np.array([0, 0, 1, 0]), np.array([3.0, 1.0, 7.0, 2.0]))
+    assert (s.levels == 0).all()
+    assert sorted(s.values[s.keys == 0]) == [1.0, 2.0, 3.0]
+
+
+def test_compaction_keeps_the_count_and_the_quantiles():
+    rng = np.random.default_rng(1)
+    values = rng.exponential(10.0, 200_000)
+    keys = (np.arange(len(values)) % 2).astype(np.int64)
+    s = SketchSet(k=128)
+    for lo in range(0, len(values), 10_000):
+        s.add(keys[lo:lo + 10_000], values[lo:lo + 10_000])
+    assert len(s.values) < 5_000
+    for key in (0, 1):
+        at = s.keys == key
+        assert s.weights[at].sum() == (keys == key).sum()
+        order = np.argsort(s.values[at])
+        est = weighted_quantiles(s.values[at][order], s.weights[at][order], [0.25, 0.5, 0.99])
+        # Rank error, not value error: where the estimates fall among the true values.
+        ranks = np.searchsorted(np.sort(values[keys == key]), est) / (keys == key).sum()
+        np.testing.assert_allclose(ranks, [0.25, 0.5, 0.99], atol=0.02)
+
+
+def test_sketches_merge_by_concatenation():
+    rng = np.random.default_rng(2)
+    a, b = rng.normal(size=5_000), rng.normal(size=7_000)
+    left, right = SketchSet(k=64, seed=1), SketchSet(k=64, seed=2)
+    left.add(np.zeros(len(a), np.int64), a)
+    right.add(np.zeros(len(b), np.int64), b)
+    merged = SketchSet(k=64, seed=3)
+    merged.add(np.r_[left.keys, right.keys], np.r_[left.values, right.values], np.r_[left.levels, right.levels])
+    assert merged.weights.sum() == len(a) + len(b)
+    order = np.argsort(merged.values)
+    est = weighted_quantiles(merged.values[order], merged.weights[order], [0.5])[0]
+    assert abs((np.r_[a, b] < est).mean() - 0.5) < 0.03
+
+
+ORDERS = pd.DataFrame(
+    {
+        "boss_order_id": [f"o{i}" for i in range(8)],
+        "order_date": ["2024-01-03", "2024-01-09", "2024-01-20", "2024-02-02", "2024-02-14", "2024-02-20", "", ""],
+        "Brands": ["A", "A", "B", "A", "B", "B", "A", "B"],
+        "shop": ["S1", "S1", "S2", "S1", "S2", "S2", "S1", "S2"],
+        "has_coupon": [True, False, False, True, False, False, False, True],
+        "net_revenue_gbp": [10.0, 20.0, 30.0, 40.0, None, 1000.0, 5.0, 6.0],
+        "Discount_rate": [0.1, 0.0, None, 0.2, 0.0, 0.0, 0.0, None],
+    }
+)
+
+
+@pytest.fixture
+def profile(tmp_path) -> DQProfile:
+    csv = tmp_path / "orders.csv"
+    ORDERS.to_csv(csv, index=False)
+    dq_profiler.build(csv, tmp_path / "dq")
+    return DQProfile.open(tmp_path / "dq")
+
+
+def test_missing_counts(profile):
+    assert profile.rows() == 8
+    missing = profile.missing().set_index("column_name")["missing_count"]
+    assert missing["Discount_rate"] == 2
+    assert missing["net_revenue_gbp"] == 1
+    assert missing["order_date"] == 2
+    sel = profile.select({"Brands": ["B"], "YearMonth": ("2024-02", "2024-02")})
+    assert profile.rows(sel) == 2
+    assert profile.missing(sel).set_index("column_name").loc["net_revenue_gbp", "missing_count"] == 1
+
+
+def test_exact_quantiles_and_outliers(profile):
+    out = profile.outliers(columns=["net_revenue_gbp"]).iloc[0]
+    values = ORDERS["net_revenue_gbp"].dropna()
+    assert out["n_non_null"] == 7
+    assert out["median"] == pytest.approx(values.median())
+    assert out["q1"] == pytest.approx(values.quantile(0.25))
+    assert out["max"] == 1000.0
+    assert out["n_outliers_iqr"] == 1  # the 1000 GBP order
+    assert out["mean_raw"] == pytest.approx(values.mean())
+    assert out["mean_without_outliers"] == pytest.approx(values[values < 1000].mean())
+
+
+def test_month_ranges_exclude_undated_rows(profile):
+    assert profile.undated() == 2
+    assert profile.undated({"Brands": ["A"], "YearMonth": ("2024-01", "2024-01")}) == 1
+    assert profile.rows(profile.select({"YearMonth": ("2024-01", "2024-12")})) == 6
+    assert profile.rows(profile.select({})) == 8
+
+
+def test_inexact_filters(profile):
+    assert profile.inexact({"YearMonth": ("2024-01", "2024-02"), "has_coupon": [True]}) == []
+    assert profile.inexact({"Brands": ["A"], "shop": []}) == ["Brands"]
+
+
+def test_empty_selection(profile):
+    sel = profile.select({"Brands": ["Nope"]})
+    assert profile.rows(sel) == 0
+    assert profile.missing(sel)["missing_pct"].isna().all()
+    assert profile.outliers(sel).empty
+
+
+def test_ingest_replaces_a_month(profile, tmp_path):
+    delta = tmp_path / "delta.csv"
+    ORDERS.iloc[3:6].assign(net_revenue_gbp=[1.0, 2.0, 3.0]).to_csv(delta, index=False)
+    dq_profiler.ingest(delta, tmp_path / "dq")
+    after = DQProfile.open(tmp_path / "dq")
+    assert after.version == profile.version + 1
+    feb = after.select({"YearMonth": ("2024-02", "2024-02")})
+    assert after.missing(feb).set_index("column_name").loc["net_revenue_gbp", "missing_count"] == 0
+    assert after.outliers(feb, ["net_revenue_gbp"]).iloc[0]["max"] == 3.0
+    assert after.rows() == 8
+
+
+def test_ingest_adds_undated_rows(profile, tmp_path):
+    more = pd.DataFrame(
+        {
+            "boss_order_id": ["o8", "o9"],
+            "order_date": ["", ""],
+            "Brands": ["A", "C"],
+            "shop": ["S1", "S3"],
+            "has_coupon": [False, False],
+            "net_revenue_gbp": [7.0, None],
+            "Discount_rate": [0.0, 0.3],
+        }
+    )
+    delta = tmp_path / "delta.csv"
+    pd.concat([ORDERS.iloc[3:6], more]).to_csv(delta, index=False)
+    dq_profiler.ingest(delta, tmp_path / "dq")
+    after = DQProfile.open(tmp_path / "dq")
+    assert after.undated() == 4
+    assert after.undated({"Brands": ["A"]}) == 2
+    assert after.rows() == 10
+
+    full = tmp_path / "full.csv"
+    pd.concat([ORDERS, more]).to_csv(full, index=False)
+    dq_profiler.build(full, tmp_path / "dq_full")
+    expect = DQProfile.open(tmp_path / "dq_full")
+    pd.testing.assert_frame_equal(after.missing(), expect.missing())
+    pd.testing.assert_frame_equal(after.outliers(), expect.outliers())
+    undated = [np.flatnonzero(p.cells["ym_key"].to_numpy() < 0) for p in (after, expect)]
+    pd.testing.assert_frame_equal(after.outliers(undated[0]), expect.outliers(undated[1]))
@@ -0,0 +1,90 @@
+import gzip
+import io
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from export import FORMATS, ExportCache, encode, file_name, iter_csv
+
+
+@pytest.fixture
+def frame() -> pd.DataFrame:
+    n = 2_500
+    return pd.DataFrame(
+        {
+            "shop": pd.Categorical(np.where(np.arange(n) % 3, "ShopA1", "ShopB1")),
+            "orders": np.arange(n),
+            "net_revenue_gbp": np.arange(n) * 1.5,
+        }
+    )
+
+
+@pytest.mark.parametrize("fmt", list(FORMATS))
+def test_encode_round_trips_in_chunks(frame, fmt):
+    out = io.BytesIO()
+    encode(frame, fmt, out, chunk_rows=1_000)
+    raw = out.getvalue()
+    if fmt == "Parquet":
+        assert pq.ParquetFile(io.BytesIO(raw)).metadata.num_row_groups == 3
+        back = pd.read_parquet(io.BytesIO(raw))
+    else:
+        back = pd.read_csv(io.BytesIO(gzip.decompress(raw) if fmt == "CSV (gzip)" else raw))
+    assert back["orders"].tolist() == frame["orders"].tolist()
+    assert back["shop"].astype(str).tolist() == frame["shop"].astype(str).tolist()
+    np.testing.assert_allclose(back["net_revenue_gbp"], frame["net_revenue_gbp"])
+
+
+def test_csv_has_one_header_and_empty_frames_keep_it(frame):
+    text = b"".join(iter_csv(frame, chunk_rows=700)).decode()
+    assert text.count("shop,orders") == 1
+    assert b"".join(iter_csv(frame.iloc[:0])).decode().strip() == "shop,orders,net_revenue_gbp"
+    assert file_name("orders", "CSV (gzip)") == "orders.csv.gz"
+
+
+def test_cache_encodes_once_per_key(frame, tmp_path):
+    cache = ExportCache(directory=tmp_path)
+    calls = []
+
+    def build():
+        calls.append(1)
+        return frame
+
+    a = cache.get("k", "CSV", build)
+    assert cache.get("k", "CSV", build) == a
+    assert len(calls) == 1
+    assert pd.read_csv(io.BytesIO(a))["orders"].tolist() == frame["orders"].tolist()
+    cache.get("k", "Parquet", build)
+    assert len(calls) == 2
+
+
+def test_cache_evicts_to_its_budget(frame, tmp_path):
+    cache = ExportCache(max_bytes=1, directory=tmp_path)
+    cache.get("a", "CSV", lambda: frame)
+    # Evicting "a" while its bytes are read still returns the whole file.
+    b = cache.get("b", "CSV", lambda: frame)
+    assert pd.read_csv(io.BytesIO(b))["orders"].sum() == frame["orders"].sum()
+    assert len(list(cache.dir.iterdir())) == 1
+    calls = []
+    cache.get("a", "CSV", lambda: calls.append(1) or frame)
+    assert calls == [1]
+
+
+def test_failed_encode_leaves_no_file(tmp_path):
+    cache = ExportCache(directory=tmp_path)
+
+    def broken():
+        raise RuntimeError("query failed")
+
+    with pytest.raises(RuntimeError):
+        cache.get("k", "CSV", broken)
+    assert list(cache.dir.iterdir()) == []
+
+
+def test_cache_directory_is_removed_with_the_cache(tmp_path):
+    cache = ExportCache(directory=tmp_path)
+    cache.get("k", "CSV", lambda: pd.DataFrame({"a": [1]}))
+    folder = cache.dir
+    del cache
+    assert not folder.exists()
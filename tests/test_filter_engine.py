@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_store import ym_to_key
+from filter_engine import FilterIndex
+
+
+@pytest.fixture
+def frame() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "ym_key": [24288, 24288, 24289, 24289, 24290, 24290],  # 2024-01 .. 2024-03
+            "Brands": pd.Categorical(["A", "B", "A", None, "B", "A"]),
+            "has_coupon": [True, False, True, True, False, False],
+        }
+    )
+
+
+def naive(frame, ym, **sel):
+    keep = frame["ym_key"].between(*(ym_to_key(m) for m in ym)) if ym else frame["ym_key"].notna()
+    for col, values in sel.items():
+        keep &= frame[col].isin(values)
+    return np.flatnonzero(keep.to_numpy())
+
+
+def test_month_range_is_a_slice(frame):
+    index = FilterIndex(frame, ["Brands", "has_coupon"])
+    assert index.month_slice(("2024-02", "2024-03")) == (2, 6)
+    assert index.month_slice(("2025-01", "2025-12")) == (6, 6)
+    assert index.month_slice(None) == (0, 6)
+
+
+def test_select_matches_a_boolean_scan(frame):
+    index = FilterIndex(frame, ["Brands", "has_coupon"])
+    cases = [
+        (None, {}),
+        (("2024-01", "2024-02"), {"Brands": ["A"]}),
+        (None, {"Brands": ["A", "B"], "has_coupon": [False]}),
+        (("2024-02", "2024-03"), {"Brands": ["B"], "has_coupon": [True, False]}),
+    ]
+    for ym, sel in cases:
+        np.testing.assert_array_equal(index.select(ym, sel), naive(frame, ym, **sel))
+
+
+def test_empty_list_means_no_filter(frame):
+    index = FilterIndex(frame, ["Brands"])
+    np.testing.assert_array_equal(index.select(None, {"Brands": []}), np.arange(6))
+
+
+def test_unknown_label_selects_nothing(frame):
+    index = FilterIndex(frame, ["Brands"])
+    assert len(index.select(None, {"Brands": ["Z"]})) == 0
+    assert len(index.select(("2030-01", "2030-02"), {"Brands": ["A"]})) == 0
+
+
+def test_rows_must_be_sorted_by_month(frame):
+    with pytest.raises(ValueError):
+        FilterIndex(frame.iloc[::-1], ["Brands"])
+
+
+@pytest.mark.parametrize("ym,key", [("2024-01", 2024 * 12), ("1999-12", 1999 * 12 + 11)])
+def test_ym_to_key(ym, key):
+    assert ym_to_key(ym) == key
+
@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_store
+from cube import Cube
+from forecast import Forecast, holt_winters, seasonal_naive, series_matrix
+
+MONTHS = [f"{y}-{m:02d}" for y in (2022, 2023, 2024) for m in range(1, 13)][:27]  # 2022-01 .. 2024-03
+SEASON = np.array([5.0, -3.0, 0.0, 2.0, 8.0, -6.0, 1.0, 0.0, -4.0, 3.0, -2.0, -4.0])
+
+
+def seasonal(n: int, level: float = 50.0, slope: float = 0.0) -> np.ndarray:
+    t = np.arange(n)
+    return level + slope * t + SEASON[t % 12]
+
+
+@pytest.mark.parametrize(
+    "y",
+    [
+        np.arange(30, dtype=float) * 2 + 10,  # linear
+        seasonal(30),  # flat with a season
+        seasonal(30, slope=1.5),  # both
+    ],
+    ids=["linear", "seasonal", "trend-seasonal"],
+)
+def test_holt_winters_is_exact_on_noiseless_series(y):
+    mean, var = holt_winters(y[None, :24], horizon=6)
+    np.testing.assert_allclose(mean[0], y[24:], atol=1e-9)
+    np.testing.assert_allclose(var, 0, atol=1e-9)
+
+
+def test_holt_winters_chunks_do_not_change_the_fit():
+    y = np.random.default_rng(0).gamma(2.0, 20.0, (5, 30)) + seasonal(30)
+    full = holt_winters(y, horizon=4)
+    chunked = holt_winters(y, horizon=4, chunk=2)
+    np.testing.assert_allclose(chunked[0], full[0])
+    np.testing.assert_allclose(chunked[1], full[1])
+
+
+def test_holt_winters_needs_two_seasons():
+    with pytest.raises(ValueError):
+        holt_winters(np.ones((1, 23)))
+
+
+def test_seasonal_naive_repeats_the_last_season():
+    y = seasonal(26, slope=1.0)[None, :]
+    mean, var = seasonal_naive(y, horizon=14)
+    np.testing.assert_allclose(mean[0], y[0, np.r_[14:26, 14:16]])
+    # Year-on-year differences are all 12, so sigma^2 = 144, doubled in the second year.
+    np.testing.assert_allclose(var[0], 144.0 * np.r_[np.ones(12), 2, 2])
+
+
+def series_cube() -> Cube:
+    """Two brands over 27 months; BrandA net revenue has a trend and a season, split across two campaigns."""
+    net_a = seasonal(len(MONTHS), level=100.0, slope=2.0)
+    rows = []
+    for i, ym in enumerate(MONTHS):
+        rows.append((ym, "Co1", "BrandA", "Email", 1, net_a[i] - 10))
+        rows.append((ym, "Co1", "BrandA", "No campaign", 1, 10.0))
+        rows.append((ym, "Co2", "BrandB", "No campaign", 1, 40.0))
+    raw = pd.DataFrame(
+        rows, columns=["YearMonth", "Company", "Brands", "campaign_type_clean", "orders", "net_revenue_gbp"]
+    )
+    return Cube.from_frame(data_store.prepare_monthly(raw))
+
+
+@pytest.fixture
+def fitted():
+    cube = series_cube()
+    return cube, Forecast.fit(cube, horizon=3, dims=["Brands"])
+
+
+def test_series_matrix_is_dense_by_month():
+    keys, y, first, series = series_matrix(series_cube(), ["Brands"])
+    assert keys["Brands"].astype(str).tolist() == ["BrandA", "BrandB"]
+    assert first == data_store.ym_to_key("2022-01")
+    assert y.shape == (2, 27)
+    np.testing.assert_allclose(y[1], 40.0)
+
+
+def test_forecast_batch(fitted):
+    cube, fc = fitted
+    assert fc.months == ["2024-04", "2024-05", "2024-06"]
+    assert fc.last_month == "2024-03"
+    expected_a = seasonal(30, level=100.0, slope=2.0)[27:]
+    np.testing.assert_allclose(fc.mean[0], expected_a, atol=1e-6)
+    np.testing.assert_allclose(fc.mean[1], 40.0, atol=1e-6)
+
+    total = fc.total()
+    np.testing.assert_allclose(total["forecast"], expected_a + 40.0, atol=1e-6)
+    assert (total["lower"] <= total["forecast"]).all() and (total["forecast"] <= total["upper"]).all()
+
+    table = fc.table()
+    assert len(table) == 2 * 3
+    assert table.groupby("YearMonth")["forecast"].sum().tolist() == pytest.approx(total["forecast"].tolist())
+
+
+def test_select_and_inexact_filters(fitted):
+    cube, fc = fitted
+    assert fc.select(cube, {"Company": ["Co2"]}).tolist() == [1]
+    assert fc.select(cube, {"Brands": ["Nope"]}).tolist() == []
+    assert fc.total(fc.select(cube, {"Brands": ["Nope"]}))["forecast"].eq(0).all()
+    # Company is constant per brand, the campaign is not.
+    assert fc.inexact({"Company": ["Co1"], "YearMonth": ("2022-01", "2022-12")}) == []
+    assert fc.inexact({"campaign_type_clean": ["Email"]}) == ["campaign_type_clean"]
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from metrics import RATIOS, add_masked_columns, coupon_metrics_by, derive_ratios, required_sums
+
+
+def test_required_sums_expands_ratios_once():
+    assert required_sums(["orders", "aov_gbp", "net_revenue_gbp"]) == ["orders", "net_revenue_gbp"]
+    assert required_sums(["avg_discount_rate"]) == list(RATIOS["avg_discount_rate"])
+
+
+def test_derive_ratios_divides_by_zero_as_blank():
+    sums = pd.DataFrame({"net_revenue_gbp": [100.0, 50.0], "orders": [4, 0]})
+    out = derive_ratios(sums, ["aov_gbp", "refund_rate"])
+    assert out["aov_gbp"].iloc[0] == pytest.approx(25.0)
+    assert np.isnan(out["aov_gbp"].iloc[1])
+    # Missing parts: the ratio is skipped, not raised.
+    assert "refund_rate" not in out.columns
+
+
+def test_masked_columns_split_by_coupon():
+    df = pd.DataFrame({"has_coupon": [True, False, True], "orders": [1, 2, 3], "net_revenue_gbp": [10.0, 20.0, 30.0]})
+    out = add_masked_columns(df)
+    assert out["coupon_orders"].tolist() == [1, 0, 3]
+    assert out["nocoupon_net_revenue_gbp"].tolist() == [0.0, 20.0, 0.0]
+
+
+def test_coupon_metrics_by_matches_the_dax_definitions(monthly):
+    out = coupon_metrics_by(monthly, ["Brands"]).set_index("Brands")
+    a = monthly[monthly["Brands"] == "BrandA"]
+    coupon = a[a["has_coupon"]]
+    assert out.loc["BrandA", "coupon_usage"] == pytest.approx(coupon["orders"].sum() / a["orders"].sum())
+    assert out.loc["BrandA", "coupon_revenue_share"] == pytest.approx(
+        coupon["net_revenue_gbp"].sum() / a["net_revenue_gbp"].sum()
+    )
+    assert out.loc["BrandA", "aov_coupon"] == pytest.approx(coupon["net_revenue_gbp"].sum() / coupon["orders"].sum())
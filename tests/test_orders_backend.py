@@ -0,0 +1,72 @@
+import shutil
+
+import pandas as pd
+import pytest
+
+import orders_backend
+from orders_backend import OrderStore, replace_months
+
+
+def test_partitions_hold_every_row_cleaned(order_store, orders):
+    df = pd.concat([b.to_pandas() for b in order_store.scan()], ignore_index=True)
+    assert len(df) == len(orders)
+    assert sorted(df["YearMonth"].unique()) == ["2024-01", "2024-02", "2024-03"]
+    assert (df["YearMonth"] == df["order_date"].str[:7]).all()
+    assert "no coupon" not in set(df["campaign_type_clean"])
+
+
+@pytest.mark.parametrize(
+    "filters",
+    [
+        {},
+        {"YearMonth": ("2024-02", "2024-03")},
+        {"Brands": ["BrandA"], "has_coupon": [True]},
+        {"shop": ["ShopX"], "YearMonth": ("2024-01", "2024-01")},
+        {"Brands": ["Nope"]},
+    ],
+)
+def test_counts_match_pandas(order_store, orders, filters):
+    keep = pd.Series(True, index=orders.index)
+    for col, value in filters.items():
+        if col == "YearMonth":
+            keep &= orders["order_date"].str[:7].between(*value)
+        else:
+            keep &= orders[col].isin(value)
+    assert order_store.count_rows(filters) == keep.sum()
+    # Multi-line orders count once.
+    assert order_store.distinct_orders(filters) == orders.loc[keep, "boss_order_id"].nunique()
+
+
+def test_top_orders(order_store, orders):
+    top = order_store.top_orders(n=5, columns=["boss_order_id"])
+    assert top["Order Total (GBP)"].tolist() == sorted(orders["Order Total (GBP)"], reverse=True)[:5]
+    assert order_store.top_orders({"Brands": ["Nope"]}, columns=["boss_order_id"]).empty
+
+
+def test_replace_months_keeps_other_months(order_store, orders):
+    delta = order_store.dataset.to_table(filter=order_store.expression({"YearMonth": ("2024-02", "2024-02")}))
+    delta = delta.slice(0, 2)
+    assert replace_months(iter(delta.to_batches()), order_store.root) == ["2024-02"]
+    store = OrderStore(order_store.root)
+    assert store.count_rows({"YearMonth": ("2024-02", "2024-02")}) == 2
+    jan = (orders["order_date"].str[:7] == "2024-01").sum()
+    assert store.count_rows({"YearMonth": ("2024-01", "2024-01")}) == jan
+
+
+def test_replaced_partitions_leave_the_dataset_root(order_store, orders, monkeypatch):
+    seen = []
+    rmtree = shutil.rmtree
+
+    def spy(path, *args, **kwargs):
+        # The old partitions are only deleted once the new ones are in place.
+        seen.append(sorted(p.name for p in order_store.root.iterdir()))
+        rmtree(path, *args, **kwargs)
+
+    monkeypatch.setattr(orders_backend.shutil, "rmtree", spy)
+    delta = order_store.dataset.to_table(filter=order_store.expression({"YearMonth": ("2024-03", "2024-03")}))
+    replace_months(iter(delta.to_batches()), order_store.root)
+    assert all(names == [f"YearMonth={m}" for m in ("2024-01", "2024-02", "2024-03")] for names in seen)
+    assert OrderStore(order_store.root).count_rows() == len(orders)
+    assert sorted(p.name for p in order_store.root.parent.iterdir() if p.name.startswith("orders_parquet")) == [
+        "orders_parquet"
+    ]
@@ -0,0 +1,55 @@
+import pandas as pd
+
+import rfm_pipeline
+from orders_backend import build_partitions
+
+
+def order_lines() -> pd.DataFrame:
+    """Three customers; C1's order B1 has two lines."""
+    rows = [
+        ("B1", "2024-01-05", "C1", 10.0),
+        ("B1", "2024-01-05", "C1", 15.0),
+        ("B2", "2024-02-01", "C1", 5.0),
+        ("B3", "2024-01-20", "C2", 40.0),
+        ("B4", "2024-02-10", "C3", 8.0),
+        ("B5", "2024-03-02", "C3", 12.0),
+    ]
+    df = pd.DataFrame(rows, columns=["boss_order_id", "order_date", "Customer_ID", "net_revenue_gbp"])
+    return df.assign(**{"Order Total (GBP)": df["net_revenue_gbp"]})
+
+
+def customers(res_dir) -> pd.DataFrame:
+    return pd.read_csv(res_dir / rfm_pipeline.RFM_TABLE).set_index("Customer_ID").sort_index()
+
+
+def test_frequency_counts_orders_not_lines(tmp_path):
+    csv = tmp_path / "orders.csv"
+    order_lines().to_csv(csv, index=False)
+    root = build_partitions(csv, tmp_path / "orders_parquet")
+    rfm_pipeline.build(tmp_path / "from_csv", csv_path=csv, k=2)
+    rfm_pipeline.build(tmp_path / "from_parquet", orders_root=root, k=2)
+    for out in ("from_csv", "from_parquet"):
+        got = customers(tmp_path / out)
+        assert got["frequency"].to_dict() == {"C1": 2, "C2": 1, "C3": 2}
+        assert got["monetary"].to_dict() == {"C1": 30.0, "C2": 40.0, "C3": 20.0}
+        assert got.loc["C1", "last_order_date"] == "2024-02-01"
+
+
+def test_incremental_counts_late_orders_on_the_watermark_day(tmp_path):
+    first = order_lines().iloc[:5]  # up to B4 on 2024-02-10
+    csv = tmp_path / "orders.csv"
+    first.to_csv(csv, index=False)
+    out = tmp_path / "rfm"
+    assert rfm_pipeline.build(out, csv_path=csv, k=2)["watermark"] == "2024-02-10"
+
+    # B6 lands late on the watermark day; B4 is exported again.
+    late = pd.DataFrame(
+        [("B6", "2024-02-10", "C2", 7.0, 7.0)], columns=first.columns
+    )
+    pd.concat([first, late, order_lines().iloc[5:]], ignore_index=True).to_csv(csv, index=False)
+    res = rfm_pipeline.build(out, csv_path=csv, incremental=True, k=2)
+    assert res["watermark"] == "2024-03-02"
+    rfm_pipeline.build(tmp_path / "full", csv_path=csv, k=2)
+    cols = ["frequency", "monetary", "last_order_date"]
+    pd.testing.assert_frame_equal(customers(out)[cols], customers(tmp_path / "full")[cols])
+    assert customers(out).loc["C2", "frequency"] == 2
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import table_view
+from table_view import OrderPager, TablePager
+
+
+def test_table_pager_sorts_searches_and_pages():
+    df = pd.DataFrame({"name": ["b", "a", "c", "ab"], "value": [2, 2, 1, 3]})
+    pager = TablePager.from_frame(df)
+    page = pager.page(sort_by="value", descending=True, offset=1, limit=2)
+    # Ties keep their original order.
+    assert page.rows["name"].tolist() == ["b", "a"]
+    assert page.total == 4
+    assert pager.count(search="A") == 2
+    assert pager.page(search="zzz").rows.empty
+
+
+@pytest.fixture
+def pager(order_store, monkeypatch) -> OrderPager:
+    # Small enough that the streaming head stops before the end of the scan.
+    monkeypatch.setattr(table_view, "PUSHDOWN_ROWS", 30)
+    return OrderPager(order_store)
+
+
+CASES = [
+    ({}, None, False, ""),
+    ({}, "Order Total (GBP)", True, ""),
+    ({"Brands": ["BrandB"]}, "Order Total (GBP)", False, ""),
+    ({"YearMonth": ("2024-02", "2024-03")}, "Customer_ID", False, "shopx"),
+    ({}, None, False, "brandA"),
+]
+
+
+@pytest.mark.parametrize("filters,sort_by,descending,search", CASES)
+def test_streaming_head_matches_the_full_sort(pager, filters, sort_by, descending, search):
+    head = pager._head(filters, sort_by, descending, search)
+    keys = pager._keys(filters, sort_by, descending, search)
+    assert head.num_rows == min(30, keys.num_rows)
+    assert head.to_pylist() == keys.slice(0, 30).to_pylist()
+
+
+def test_pages_across_the_pushdown_limit(pager, orders):
+    seen = []
+    for offset in range(0, 60, 20):
+        page = pager.page(sort_by="Order Total (GBP)", descending=True, offset=offset, limit=20)
+        seen.append(page.rows)
+        assert len(page.rows) == 20 and page.total == len(orders)
+    got = pd.concat(seen)
+    # Orders with two rows show each row once.
+    assert not got.duplicated().any()
+    got = got["Order Total (GBP)"].to_numpy()
+    np.testing.assert_array_equal(got, np.sort(orders["Order Total (GBP)"].to_numpy())[::-1][:60])
+
+
+def test_search_count(pager, orders):
+    assert pager.count(search="shopx") == (orders["shop"] == "ShopX").sum()
+    assert pager.count({"Brands": ["Nope"]}) == 0
+    page = pager.page({"Brands": ["Nope"]}, sort_by="Order Total (GBP)")
+    assert page.rows.empty and page.total == 0
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_store
+from cube import Cube
+from time_intel import MonthPrefix, month_label, quarter_map
+
+MONTHS = [f"{y}-{m:02d}" for y in (2023, 2024) for m in range(1, 13)][:15]  # 2023-01 .. 2024-03
+
+
+def series_cube() -> Cube:
+    """Brand A sells i + 1 GBP in the i-th month (one order); brand B sells 100 GBP every month."""
+    rows = []
+    for i, ym in enumerate(MONTHS):
+        rows.append((ym, "A", 1, float(i + 1), float(i + 1), 0.0))
+        rows.append((ym, "B", 1, 100.0, 100.0, 10.0))
+    raw = pd.DataFrame(
+        rows, columns=["YearMonth", "Brands", "orders", "net_revenue_gbp", "order_total_gbp", "refund_gbp"]
+    )
+    return Cube.from_frame(data_store.prepare_monthly(raw))
+
+
+@pytest.fixture
+def prefix() -> MonthPrefix:
+    return MonthPrefix(series_cube())
+
+
+def test_month_label_round_trips():
+    assert month_label(data_store.ym_to_key("2024-02")) == "2024-02"
+
+
+def test_monthly_comparisons(prefix):
+    out = prefix.monthly({"Brands": ["A"]}).set_index("YearMonth")
+    feb = out.loc["2024-02"]  # 14 GBP
+    assert feb["net_revenue_gbp"] == pytest.approx(14)
+    assert feb["net_revenue_gbp_mom"] == pytest.approx(14 / 13 - 1)
+    assert feb["net_revenue_gbp_yoy"] == pytest.approx(14 / 2 - 1)
+    assert feb["net_revenue_gbp_ytd"] == pytest.approx(13 + 14)
+    assert feb["net_revenue_gbp_r3"] == pytest.approx(12 + 13 + 14)
+    assert feb["net_revenue_gbp_r12"] == pytest.approx(sum(range(3, 15)))
+    # No history before the first month.
+    first = out.iloc[0]
+    assert np.isnan(first["net_revenue_gbp_mom"]) and np.isnan(first["net_revenue_gbp_yoy"])
+
+
+def test_ratios_divide_windowed_sums(prefix):
+    out = prefix.monthly({}, ["aov_gbp", "refund_rate"]).set_index("YearMonth")
+    assert out.loc["2024-02", "aov_gbp"] == pytest.approx((14 + 100) / 2)
+    assert out.loc["2024-02", "aov_gbp_r3"] == pytest.approx((12 + 13 + 14 + 300) / 6)
+    assert out.loc["2024-02", "refund_rate_ytd"] == pytest.approx(20 / (13 + 14 + 200))
+
+
+def test_month_range_keeps_history_for_comparisons(prefix):
+    out = prefix.monthly({"Brands": ["A"], "YearMonth": ("2024-01", "2024-03")})
+    assert out["YearMonth"].tolist() == ["2024-01", "2024-02", "2024-03"]
+    assert out["net_revenue_gbp_yoy"].iloc[0] == pytest.approx(13 / 1 - 1)
+
+
+def test_quarterly(prefix):
+    out = prefix.quarterly({"Brands": ["A"]}).set_index("Quarter")
+    assert out.loc["2024Q1", "net_revenue_gbp"] == pytest.approx(13 + 14 + 15)
+    assert out.loc["2024Q1", "net_revenue_gbp_qoq"] == pytest.approx(42 / (10 + 11 + 12) - 1)
+    assert out.loc["2024Q1", "net_revenue_gbp_yoy"] == pytest.approx(42 / (1 + 2 + 3) - 1)
+    assert out["months"].tolist() == [3, 3, 3, 3, 3]
+
+
+def test_quarter_labels_from_dim_date(prefix):
+    dim_date = pd.DataFrame({"YearMonth": MONTHS, "Quarter": [f"FY{m[:4]}-Q{(int(m[5:]) - 1) // 3 + 1}" for m in MONTHS]})
+    out = prefix.quarterly({}, ["orders"], quarter_map(dim_date))
+    assert out["Quarter"].iloc[-1] == "FY2024-Q1"
+    assert out["orders"].iloc[-1] == 6
+
+
+def test_empty_selection(prefix):
+    out = prefix.monthly({"Brands": ["Nope"]}, ["net_revenue_gbp", "aov_gbp"])
+    assert len(out) == len(MONTHS)
+    assert (out["net_revenue_gbp"] == 0).all()
+    assert out["aov_gbp"].isna().all()
+    assert out["net_revenue_gbp_mom"].isna().all()
+
+
+def test_prefix_is_memoised_per_filter(prefix):
+    assert prefix.prefix({"Brands": ["A"]}) is prefix.prefix({"Brands": ["A"], "YearMonth": ("2024-01", "2024-02")})
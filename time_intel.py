@@ -0,0 +1,187 @@
+"""
+Time intelligence over the cube: MoM, YoY, YTD and rolling windows.
+
+The additive cube measures are laid out per series (a cube cell without its
+YearMonth) along a dense month axis and accumulated into prefix sums once
+per data version. For a filter selection the prefix rows of the selected
+series are summed once (memoised per filter key); after that the sum over
+any month window is P[stop] - P[start], so every comparison is two array
+lookups per month instead of a groupby plus `shift`. Ratios (AOV, refund
+rate) divide windowed numerator and denominator sums, as in metrics.RATIOS.
+
+Windows look past the sidebar month range: the YoY of the first selected
+month still compares with the year before, and YTD starts in January.
+
+Quarters come from dim_date (YearMonth -> Quarter); months it does not
+list fall back to the calendar quarter.
+"""
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from cube import Cube, filter_key
+from data_store import ym_to_key
+from metrics import RATIOS
+
+# Measures with time intelligence: sums, and ratios of sums.
+TI_MEASURES = ["net_revenue_gbp", "orders", "aov_gbp", "refund_rate"]
+ROLLING = (3, 12)
+
+PREFIX_CACHE_SIZE = 64
+
+
+def month_label(key: int) -> str:
+    """Inverse of data_store.ym_to_key."""
+    return f"{key // 12:04d}-{key % 12 + 1:02d}"
+
+
+def quarter_map(dim_date: Optional[pd.DataFrame]) -> Dict[str, str]:
+    """YearMonth -> Quarter label from dim_date (empty when it is missing)."""
+    if dim_date is None or not {"YearMonth", "Quarter"}.issubset(dim_date.columns):
+        return {}
+    pairs = dim_date[["YearMonth", "Quarter"]].astype(str).drop_duplicates("YearMonth")
+    return dict(zip(pairs["YearMonth"], pairs["Quarter"]))
+
+
+def _change(cur: np.ndarray, base: np.ndarray) -> np.ndarray:
+    """Relative change cur / base - 1 (NaN where base is 0 or missing)."""
+    return cur / np.where(base != 0, base, np.nan) - 1
+
+
+def _sums_for(measures: Sequence[str]) -> list:
+    out = []
+    for m in measures:
+        for col in RATIOS.get(m, (m,)):
+            if col not in out:
+                out.append(col)
+    return out
+
+
+class MonthPrefix:
+    """Prefix sums of cube measures per series along a dense month axis."""
+
+    def __init__(self, cube: Cube, measures: Sequence[str] = TI_MEASURES):
+        self.cube = cube
+        cells = cube.cells
+        ym = cells["ym_key"].to_numpy() if "ym_key" in cells.columns else np.full(len(cells), -1)
+        ok = ym >= 0
+        self.first = int(ym[ok].min()) if ok.any() else 0
+        self.n_months = int(ym[ok].max()) - self.first + 1 if ok.any() else 0
+        self.keys = np.arange(self.first, self.first + self.n_months)
+        self.labels = [month_label(k) for k in self.keys]
+
+        other = [d for d in cube.dims if d != "YearMonth"]
+        if other:
+            series = cells.groupby(other, observed=True, dropna=False, sort=False).ngroup().to_numpy()
+        else:
+            series = np.zeros(len(cells), dtype=np.int64)
+        self._series = series
+        n_series = int(series.max()) + 1 if len(series) else 0
+
+        self.measures = [m for m in measures if all(c in cells.columns for c in RATIOS.get(m, (m,)))]
+        self._prefix: Dict[str, np.ndarray] = {}
+        t = ym[ok] - self.first + 1
+        for col in _sums_for(self.measures):
+            dense = np.zeros((n_series, self.n_months + 1))
+            np.add.at(dense, (series[ok], t), cells[col].to_numpy(dtype=np.float64)[ok])
+            self._prefix[col] = np.cumsum(dense, axis=1)
+        self._cache: "OrderedDict[Tuple, Dict[str, np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def prefix(self, filters: Optional[Mapping[str, object]] = None) -> Dict[str, np.ndarray]:
+        """Prefix sums (length n_months + 1) of the series selected by the non-month filters."""
+        flt = {k: v for k, v in (filters or {}).items() if k != "YearMonth"}
+        key = filter_key(flt)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        sel = np.unique(self._series[self.cube.select(flt)])
+        out = {col: p[sel].sum(axis=0) for col, p in self._prefix.items()}
+        with self._lock:
+            self._cache[key] = out
+            while len(self._cache) > PREFIX_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return out
+
+    def _window(self, p: Dict[str, np.ndarray], measure: str, start: np.ndarray, stop: np.ndarray) -> np.ndarray:
+        """Measure over months [start, stop) of the dense axis; NaN where start < 0."""
+        valid = start >= 0
+        s, e = np.where(valid, start, 0), np.where(valid, stop, 0)
+        if measure in RATIOS:
+            num, den = RATIOS[measure]
+            n, d = p[num][e] - p[num][s], p[den][e] - p[den][s]
+            value = n / np.where(d != 0, d, np.nan)
+        else:
+            value = p[measure][e] - p[measure][s]
+        return np.where(valid, value, np.nan)
+
+    def _range(self, ym_range: Optional[Tuple[str, str]]) -> Tuple[int, int]:
+        if not ym_range or self.n_months == 0:
+            return 0, self.n_months
+        lo = max(ym_to_key(ym_range[0]) - self.first, 0)
+        hi = min(ym_to_key(ym_range[1]) - self.first + 1, self.n_months)
+        return lo, max(hi, lo)
+
+    def monthly(self, filters: Optional[Mapping[str, object]] = None, measures: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """
+        One row per month of the selected range: each measure plus its
+        `_mom` / `_yoy` relative changes, `_ytd` and rolling `_r3` / `_r12`.
+        """
+        p = self.prefix(filters)
+        lo, hi = self._range((filters or {}).get("YearMonth"))
+        t = np.arange(lo, hi)
+        out = {"YearMonth": [self.labels[i] for i in t]}
+        for m in [m for m in (measures or self.measures) if m in self.measures]:
+            cur = self._window(p, m, t, t + 1)
+            out[m] = cur
+            out[f"{m}_mom"] = _change(cur, self._window(p, m, t - 1, t))
+            out[f"{m}_yoy"] = _change(cur, self._window(p, m, t - 12, t - 11))
+            ytd_start = np.maximum(t - (self.keys[t] % 12), 0)
+            out[f"{m}_ytd"] = self._window(p, m, ytd_start, t + 1)
+            for n in ROLLING:
+                out[f"{m}_r{n}"] = self._window(p, m, t - n + 1, t + 1)
+        return pd.DataFrame(out)
+
+    def quarterly(
+        self,
+        filters: Optional[Mapping[str, object]] = None,
+        measures: Optional[Sequence[str]] = None,
+        quarters: Optional[Mapping[str, str]] = None,
+    ) -> pd.DataFrame:
+        """
+        One row per quarter overlapping the selected range (whole quarters):
+        each measure plus `_qoq` / `_yoy` relative changes; `months` counts the
+        quarter's months on the data axis.
+        """
+        quarters = quarters or {}
+        labels = np.array(
+            [quarters.get(ym) or f"{k // 12}Q{(k % 12) // 3 + 1}" for ym, k in zip(self.labels, self.keys)]
+        )
+        if len(labels) == 0:
+            return pd.DataFrame(columns=["Quarter", "months"])
+        # Quarters are contiguous runs of months on the dense axis.
+        starts = np.flatnonzero(np.r_[True, labels[1:] != labels[:-1]])
+        stops = np.r_[starts[1:], len(labels)]
+        q = labels[starts]
+        lo, hi = self._range((filters or {}).get("YearMonth"))
+        shown = (stops > lo) & (starts < hi)
+
+        p = self.prefix(filters)
+        # Last year's quarter holds the month 12 before this quarter's last (any label format).
+        quarter_of = np.repeat(np.arange(len(q)), stops - starts)
+        prev_year = np.where(stops > 12, quarter_of[np.maximum(stops - 13, 0)], -1)
+        prev = np.arange(len(q)) - 1
+        out = {"Quarter": q, "months": stops - starts}
+        for m in [m for m in (measures or self.measures) if m in self.measures]:
+            cur = self._window(p, m, starts, stops)
+            out[m] = cur
+            out[f"{m}_qoq"] = _change(cur, np.where(prev >= 0, cur[np.maximum(prev, 0)], np.nan))
+            out[f"{m}_yoy"] = _change(cur, np.where(prev_year >= 0, cur[np.maximum(prev_year, 0)], np.nan))
+        frame = pd.DataFrame(out)
+        return frame[shown].reset_index(drop=True)